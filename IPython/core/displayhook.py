@@ -9,19 +9,256 @@
 
 from __future__ import print_function
 
+import os
+import shutil
 import sys
 import io as _io
+import tempfile
 import tokenize
+import weakref
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 
 from traitlets.config.configurable import Configurable
-from IPython.utils.py3compat import builtin_mod, cast_unicode_py2
-from traitlets import Instance, Float
+from IPython.utils.py3compat import builtin_mod, cast_unicode_py2, iteritems
+from traitlets import Any, Bool, Instance, Integer, Float, Unicode
 from warnings import warn
 
 # TODO: Move the various attributes (cache_size, [others now moved]). Some
 # of these are also attributes of InteractiveShell. They should be on ONE object
 # only and the other objects should ask that one object for their values.
 
+
+def approximate_sizeof(obj, max_items=10000):
+    """Return the approximate memory footprint of obj, in bytes.
+
+    This is the default sizer for the output cache. Arrays and data frames
+    are measured with their ``nbytes`` attribute or ``memory_usage()``
+    method; builtin containers add the size of their items, one level deep,
+    extrapolating from the first `max_items` items.
+    """
+    try:
+        size = sys.getsizeof(obj, 0)
+    except Exception:
+        size = 0
+    try:
+        nbytes = obj.nbytes
+    except Exception:
+        nbytes = None
+    if isinstance(nbytes, int) and not isinstance(nbytes, bool):
+        return max(size, nbytes)
+    try:
+        usage = obj.memory_usage
+    except Exception:
+        usage = None
+    if callable(usage):
+        try:
+            usage = usage(deep=False)
+            # DataFrame.memory_usage returns a Series
+            return max(size, int(getattr(usage, 'sum', lambda: usage)()))
+        except Exception:
+            pass
+    if isinstance(obj, dict):
+        items = iteritems(obj)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        items = obj
+    else:
+        return size
+    n = len(obj)
+    items_size = 0
+    for i, item in enumerate(items):
+        if i >= max_items:
+            items_size = items_size * n // max_items
+            break
+        if isinstance(obj, dict):
+            items_size += sys.getsizeof(item[0], 0) + sys.getsizeof(item[1], 0)
+        else:
+            items_size += sys.getsizeof(item, 0)
+    return size + items_size
+
+
+class OutputSpill(object):
+    """A directory of pickles holding outputs evicted from the output cache."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.keys = set()
+
+    def _path(self, key):
+        return os.path.join(self.directory, '%d.pickle' % key)
+
+    def dump(self, key, obj):
+        """Store obj under key. Returns False if it could not be pickled."""
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        path = self._path(key)
+        try:
+            with open(path, 'wb') as f:
+                pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return False
+        self.keys.add(key)
+        return True
+
+    def load(self, key):
+        """Load the object stored under key."""
+        if key not in self.keys:
+            raise KeyError(key)
+        with open(self._path(key), 'rb') as f:
+            return pickle.load(f)
+
+    def discard(self, key):
+        """Remove the output stored under key, if there is one."""
+        if key in self.keys:
+            self.keys.discard(key)
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove all stored outputs, and the directory."""
+        self.keys.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __contains__(self, key):
+        return key in self.keys
+
+
+class OutputCache(dict):
+    """The output history (``Out`` and ``_oh``).
+
+    A dict, except that entries which the displayhook only holds weakly (see
+    :meth:`make_weak`) or evicted to an :class:`OutputSpill` are still part
+    of the mapping: ``Out[n]``, ``get``, ``in``, ``len()``, iteration,
+    ``keys``, ``values``, ``items``, ``del`` and ``pop`` see them too, and
+    load spilled entries back from disk where needed. Only the entries held
+    in memory are shown by ``repr`` and counted by the plain dict methods
+    (e.g. ``dict.__len__``), which the displayhook uses to manage the cache.
+    """
+    spill = None
+    weak = None
+
+    def make_weak(self, key):
+        """Only keep a weak reference to entry key.
+
+        Returns False, leaving the entry alone, if its type doesn't support
+        weak references.
+        """
+        if self.weak is None:
+            self.weak = weakref.WeakValueDictionary()
+        try:
+            self.weak[key] = self[key]
+        except TypeError:
+            return False
+        dict.__delitem__(self, key)
+        return True
+
+    def __missing__(self, key):
+        if self.weak is not None:
+            try:
+                return self.weak[key]
+            except KeyError:
+                pass
+        if self.spill is not None and key in self.spill:
+            return self.spill.load(key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return (dict.__contains__(self, key)
+                or (self.weak is not None and key in self.weak)
+                or (self.spill is not None and key in self.spill))
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __delitem__(self, key):
+        found = dict.__contains__(self, key)
+        if found:
+            dict.__delitem__(self, key)
+        if self.weak is not None and self.weak.pop(key, None) is not None:
+            found = True
+        if self.spill is not None and key in self.spill:
+            self.spill.discard(key)
+            found = True
+        if not found:
+            raise KeyError(key)
+
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return value
+
+    def keys(self):
+        """All the keys, in memory first, then weakly held, then spilled."""
+        keys = list(dict.keys(self))
+        more = []
+        if self.weak is not None:
+            more.extend(self.weak.keys())
+        if self.spill is not None:
+            more.extend(sorted(self.spill.keys))
+        seen = set(keys)
+        for key in more:
+            if key not in seen:
+                seen.add(key)
+                keys.append(key)
+        return keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def held_items(self):
+        """(key, value) pairs of the entries held in memory, strongly or
+        weakly, without loading spilled ones."""
+        items = list(dict.items(self))
+        if self.weak is not None:
+            items.extend((k, v) for k, v in list(self.weak.items())
+                         if not dict.__contains__(self, k))
+        return items
+
+    def items(self):
+        items = []
+        for key in self.keys():
+            try:
+                items.append((key, self[key]))
+            except KeyError:
+                # A weakly held entry went away
+                pass
+        return items
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+    def clear(self):
+        super(OutputCache, self).clear()
+        if self.weak is not None:
+            self.weak.clear()
+        if self.spill is not None:
+            self.spill.clear()
+
+# Results at least this big which can't be weakly referenced trigger a
+# warning with DisplayHook.cache_weakrefs
+_WEAK_WARN_SIZE = 2**20
+
+
 class DisplayHook(Configurable):
     """The custom IPython displayhook to replace sys.displayhook.
 
@@ -35,6 +272,45 @@ class DisplayHook(Configurable):
                            allow_none=True)
     cull_fraction = Float(0.2)
 
+    cache_max_bytes = Integer(0,
+        help="""Approximate memory budget of the output cache, in bytes.
+
+        When the results held in ``Out`` and ``_N`` exceed this, the oldest
+        ones are evicted (or spilled to disk, see `cache_spill`). The most
+        recent result is always kept. Set to 0 to only limit the number of
+        entries (see ``InteractiveShell.cache_size``).
+        """
+    ).tag(config=True)
+    cache_sizer = Any(approximate_sizeof,
+        help="""Callable returning the approximate size of a result in bytes,
+        used with `cache_max_bytes`.
+        """
+    ).tag(config=True)
+    cache_spill = Bool(False,
+        help="""Pickle results evicted because of `cache_max_bytes` to disk,
+        instead of dropping them. ``Out[n]`` loads them back on access.
+        """
+    ).tag(config=True)
+    cache_spill_dir = Unicode('',
+        help="""Directory under which evicted results are spilled.
+        Defaults to ``output_cache`` in the profile directory.
+        """
+    ).tag(config=True)
+
+    cache_weakrefs = Bool(False,
+        help="""Only keep weak references to results older than the last
+        `cache_strong_size` ones, so that they are freed once the user drops
+        their own references. ``Out[n]`` still works while the result is
+        alive, but the ``_N`` variable is removed. Results which don't
+        support weak references are kept, with a warning if they are large.
+        """
+    ).tag(config=True)
+    cache_strong_size = Integer(3,
+        help="""Number of most recent results kept alive with `cache_weakrefs`.
+        ``_``, ``__`` and ``___`` always refer to the last three results.
+        """
+    ).tag(config=True)
+
     def __init__(self, shell=None, cache_size=1000, **kwargs):
         super(DisplayHook, self).__init__(shell=shell, **kwargs)
         cache_size_min = 3
@@ -50,6 +326,12 @@ def __init__(self, shell=None, cache_size=1000, **kwargs):
             self.do_full_cache = 1
 
         self.cache_size = cache_size
+        # approximate sizes of the entries in the output cache, see
+        # cache_max_bytes
+        self.cache_sizes = {}
+        self._spill = None
+        # outputs which couldn't be made weak, see cache_weakrefs
+        self._strong_outputs = set()
 
         # we need a reference to the user-level namespace
         self.shell = shell
@@ -193,7 +475,8 @@ def update_user_ns(self, result):
 
         # Avoid recursive reference when displaying _oh/Out
         if result is not self.shell.user_ns['_oh']:
-            if len(self.shell.user_ns['_oh']) >= self.cache_size and self.do_full_cache:
+            # Only the entries held in memory count towards cache_size
+            if dict.__len__(self.shell.user_ns['_oh']) >= self.cache_size and self.do_full_cache:
                 self.cull_cache()
             # Don't overwrite '_' and friends if '_' is in __builtin__ (otherwise
             # we cause buggy behavior for things like gettext).
@@ -213,6 +496,85 @@ def update_user_ns(self, result):
                 to_main[new_result] = result
                 self.shell.push(to_main, interactive=False)
                 self.shell.user_ns['_oh'][self.prompt_count] = result
+                if self.cache_max_bytes:
+                    self.account_cache_entry(self.prompt_count, result)
+                if self.cache_weakrefs:
+                    self.weaken_cache_entries()
+
+    def weaken_cache_entries(self):
+        """Replace all but the last `cache_strong_size` entries of the output
+        cache by weak references, see `cache_weakrefs`."""
+        oh = self.shell.user_ns['_oh']
+        if not isinstance(oh, OutputCache):
+            return
+        keys = sorted(k for k in dict.keys(oh) if k not in self._strong_outputs)
+        for n in keys[:-max(self.cache_strong_size, 1)]:
+            obj = oh[n]
+            if oh.make_weak(n):
+                self._drop_output_var(n)
+                continue
+            self._strong_outputs.add(n)
+            try:
+                size = int(self.cache_sizer(obj))
+            except Exception:
+                size = 0
+            if size >= _WEAK_WARN_SIZE:
+                warn('Out[{n}] ({typ}, about {mb} MB) does not support weak '
+                     'references and is kept in the output cache.\n'
+                     'Use %xdel or %reset out to release it.'.format(
+                        n=n, typ=type(obj).__name__, mb=size // 2**20))
+
+    def account_cache_entry(self, n, result):
+        """Record the size of output n, evicting old outputs if the cache
+        goes over `cache_max_bytes`."""
+        oh = self.shell.user_ns['_oh']
+        try:
+            size = int(self.cache_sizer(result))
+        except Exception:
+            size = 0
+        sizes = self.cache_sizes
+        # forget entries removed behind our back, e.g. by cull_cache or %xdel
+        for key in [k for k in sizes if not dict.__contains__(oh, k)]:
+            del sizes[key]
+        sizes[n] = size
+        total = sum(sizes.values())
+        for key in sorted(sizes):
+            if total <= self.cache_max_bytes or key == n:
+                break
+            total -= sizes.pop(key)
+            self.evict_cache_entry(key)
+
+    def evict_cache_entry(self, n):
+        """Remove output n from ``Out`` and ``_n``, spilling it to disk if
+        `cache_spill` is enabled."""
+        oh = self.shell.user_ns['_oh']
+        obj = dict.pop(oh, n, None)
+        self._drop_output_var(n)
+        self.cache_sizes.pop(n, None)
+        if self.cache_spill and obj is not None and isinstance(oh, OutputCache):
+            spill = self._get_spill()
+            if spill.dump(n, obj):
+                oh.spill = spill
+
+    def _drop_output_var(self, n):
+        """Remove the ``_n`` variable from the user namespace."""
+        key = '_%i' % n
+        self.shell.user_ns.pop(key, None)
+        # push(interactive=False) also records it there
+        self.shell.user_ns_hidden.pop(key, None)
+
+    def _get_spill(self):
+        if self._spill is None:
+            base = self.cache_spill_dir
+            if not base:
+                profile_dir = getattr(self.shell, 'profile_dir', None)
+                if profile_dir is not None:
+                    base = os.path.join(profile_dir.location, 'output_cache')
+                else:
+                    base = tempfile.gettempdir()
+            directory = os.path.join(base, 'session-%d' % os.getpid())
+            self._spill = OutputSpill(directory)
+        return self._spill
 
     def fill_exec_result(self, result):
         if self.exec_result is not None:
@@ -254,16 +616,17 @@ def __call__(self, result=None):
     def cull_cache(self):
         """Output cache is full, cull the oldest entries"""
         oh = self.shell.user_ns.get('_oh', {})
-        sz = len(oh)
+        sz = dict.__len__(oh)
         cull_count = max(int(sz * self.cull_fraction), 2)
         warn('Output cache limit (currently {sz} entries) hit.\n'
              'Flushing oldest {cull_count} entries.'.format(sz=sz, cull_count=cull_count))
         
-        for i, n in enumerate(sorted(oh)):
+        for i, n in enumerate(sorted(dict.keys(oh))):
             if i >= cull_count:
                 break
-            self.shell.user_ns.pop('_%i' % n, None)
-            oh.pop(n, None)
+            self._drop_output_var(n)
+            dict.pop(oh, n, None)
+            self.cache_sizes.pop(n, None)
         
 
     def flush(self):
@@ -273,15 +636,16 @@ def flush(self):
         # delete auto-generated vars from global namespace
 
         for n in range(1,self.prompt_count + 1):
-            key = '_'+repr(n)
-            try:
-                del self.shell.user_ns[key]
-            except: pass
+            self._drop_output_var(n)
         # In some embedded circumstances, the user_ns doesn't have the
         # '_oh' key set up.
         oh = self.shell.user_ns.get('_oh', None)
         if oh is not None:
             oh.clear()
+        self.cache_sizes.clear()
+        self._strong_outputs.clear()
+        if self._spill is not None:
+            self._spill.clear()
 
         # Release our own references to objects:
         self._, self.__, self.___ = '', '', ''
@@ -129,3 +129,19 @@ def shell_initialized(ip):
       The newly initialised shell.
     """
     pass
+
+@_define_event
+def exception_recorded(record):
+    """Fires after the shell has shown the traceback of an exception.
+
+    The exception record is only built if at least one callback is registered
+    for this event.
+
+    Parameters
+    ----------
+    record : dict
+      The JSON-serializable exception record, as returned by
+      :meth:`IPython.core.ultratb.VerboseTB.exception_record`, with the
+      ``execution_count`` of the cell that raised it.
+    """
+    pass
@@ -15,6 +15,7 @@
 import sys
 import traceback
 import warnings
+import weakref
 
 from decorator import decorator
 
@@ -26,7 +27,7 @@
 from traitlets import (
     Bool, Dict, Integer, Unicode, CUnicode, ObjectName, List,
     ForwardDeclaredInstance,
-    default, observe,
+    default, observe, validate,
 )
 from IPython.utils.py3compat import (
     with_metaclass, string_types, unicode_type,
@@ -130,7 +131,9 @@ def format(self, obj, include=None, exclude=None):
         format_dict = {}
         md_dict = {}
         
-        if self.ipython_display_formatter(obj):
+        idf = self.ipython_display_formatter
+        if (not isinstance(idf, BaseFormatter) or idf._is_applicable(obj)) \
+                and idf(obj):
             # object handled itself, don't proceed
             return {}, {}
         
@@ -139,6 +142,10 @@ def format(self, obj, include=None, exclude=None):
                 continue
             if exclude and format_type in exclude:
                 continue
+            if isinstance(formatter, BaseFormatter) and \
+                    not formatter._is_applicable(obj):
+                # nothing registered or defined that could format obj
+                continue
             
             md = None
             try:
@@ -250,6 +257,54 @@ def _get_type(obj):
 """)
 
 
+def _may_define_method(typ, name):
+    """Return whether instances of a type might provide a method ``name``.
+
+    This is False only if no class in the MRO defines ``name`` and attribute
+    access on the type is not customized, in which case the method can only
+    come from the instance ``__dict__``.
+    """
+    if not isinstance(typ, type):
+        # old-style classes and other oddities: always probe
+        return True
+    if typ.__getattribute__ is not object.__getattribute__ or \
+            getattr(typ, '__getattr__', None) is not None:
+        return True
+    for cls in pretty._get_mro(typ):
+        if name in getattr(cls, '__dict__', ()):
+            return True
+    return False
+
+
+class _PrinterDict(dict):
+    """A dict of printers which calls ``on_change`` when it is modified.
+
+    Copies and pickles are plain dicts.
+    """
+    def __init__(self, printers, on_change):
+        super(_PrinterDict, self).__init__(printers)
+        self.on_change = on_change
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+def _calls_on_change(method):
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.on_change()
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+for _name in ['__setitem__', '__delitem__', 'clear', 'pop', 'popitem',
+              'setdefault', 'update']:
+    setattr(_PrinterDict, _name, _calls_on_change(getattr(dict, _name)))
+del _name
+
+
 class BaseFormatter(Configurable):
     """A base formatter class that is configurable.
 
@@ -293,6 +348,73 @@ class BaseFormatter(Configurable):
     # The deferred-import type-specific printers.
     # Map (modulename, classname) pairs to the format functions.
     deferred_printers = Dict().tag(config=True)
+
+    def __init__(self, **kwargs):
+        # Per-type resolution cache, mapping a class to a tuple
+        # (printer or None, whether instances may have print_method).
+        # Cleared whenever the registrations change, including changes
+        # made to type_printers and deferred_printers in place.
+        self._type_cache = weakref.WeakKeyDictionary()
+        super(BaseFormatter, self).__init__(**kwargs)
+        self._custom_call = type(self).__call__ != BaseFormatter.__call__
+
+    @observe('singleton_printers', 'type_printers', 'deferred_printers',
+             'print_method')
+    def _registrations_changed(self, change):
+        self._clear_type_cache()
+
+    @validate('type_printers', 'deferred_printers')
+    def _watch_printers(self, proposal):
+        # so that the cache is also cleared by formatter.type_printers[t] = f
+        return _PrinterDict(proposal['value'], self._clear_type_cache)
+
+    def _clear_type_cache(self):
+        """Forget all cached per-type lookups."""
+        self._type_cache = weakref.WeakKeyDictionary()
+
+    def _resolve_type(self, typ):
+        """Return ``(printer, may_have_method)`` for a class, cached.
+
+        ``printer`` is the registered printer found along the MRO, or None.
+        """
+        try:
+            return self._type_cache[typ]
+        except (KeyError, TypeError):
+            pass
+        printer = None
+        for cls in pretty._get_mro(typ):
+            if cls in self.type_printers or self._in_deferred_types(cls):
+                printer = self.type_printers[cls]
+                break
+        resolved = (printer, _may_define_method(typ, self.print_method))
+        try:
+            self._type_cache[typ] = resolved
+        except TypeError:
+            # not weakref-able, don't cache
+            pass
+        return resolved
+
+    def _is_applicable(self, obj):
+        """Return whether calling this formatter on obj could produce output.
+
+        Used by :class:`DisplayFormatter` to skip formatters without calling
+        them. Formatters overriding ``__call__`` are always considered
+        applicable, since their logic is unknown.
+        """
+        if not self.enabled:
+            return False
+        if self._custom_call:
+            return True
+        return self._has_printer_or_method(obj)
+
+    def _has_printer_or_method(self, obj):
+        if id(obj) in self.singleton_printers:
+            return True
+        printer, may_have_method = self._resolve_type(_get_type(obj))
+        if printer is not None or may_have_method:
+            return True
+        # plain attribute access: the method can only be on the instance
+        return self.print_method in (getattr(obj, '__dict__', None) or ())
     
     @catch_format_error
     def __call__(self, obj):
@@ -387,9 +509,9 @@ def lookup_by_type(self, typ):
             else:
                 return self.deferred_printers[typ_key]
         else:
-            for cls in pretty._get_mro(typ):
-                if cls in self.type_printers or self._in_deferred_types(cls):
-                    return self.type_printers[cls]
+            printer = self._resolve_type(typ)[0]
+            if printer is not None:
+                return printer
         
         # If we have reached here, the lookup failed.
         raise KeyError("No registered printer for {0!r}".format(typ))
@@ -430,6 +552,7 @@ def for_type(self, typ, func=None):
         
         if func is not None:
             self.type_printers[typ] = func
+            self._clear_type_cache()
         
         return oldfunc
 
@@ -470,6 +593,7 @@ def for_type_by_name(self, type_module, type_name, func=None):
         
         if func is not None:
             self.deferred_printers[key] = func
+            self._clear_type_cache()
         return oldfunc
     
     def pop(self, typ, default=_raise_key_error):
@@ -511,6 +635,7 @@ def pop(self, typ, default=_raise_key_error):
                 old = self.deferred_printers.pop(_mod_name_key(typ), default)
         if old is _raise_key_error:
             raise KeyError("No registered value for {0!r}".format(typ))
+        self._clear_type_cache()
         return old
 
     def _in_deferred_types(self, cls):
@@ -567,7 +692,32 @@ def dtype_pprinter(obj, p, cycle):
         Set to 0 to disable truncation.
         """
     ).tag(config=True)
+
+    max_chars = Integer(0,
+        help="""Stop pretty-printing once the output reaches this many characters.
+
+        When the budget is exhausted, the rest of the object is not walked,
+        a truncation marker is appended and the metadata for the output
+        contains ``truncated: True``. Set to 0 to disable.
+        """
+    ).tag(config=True)
+
+    max_lines = Integer(0,
+        help="""Stop pretty-printing once the output reaches this many lines.
+
+        Works like `max_chars`. Set to 0 to disable.
+        """
+    ).tag(config=True)
     
+    iterative = Bool(False,
+        help="""Walk nested lists, tuples, dicts and sets with an explicit stack
+        instead of recursion.
+
+        The output is the same, but deeply nested structures can be displayed
+        without hitting the recursion limit.
+        """
+    ).tag(config=True)
+
     # Look for a _repr_pretty_ methods to use for pretty printing.
     print_method = ObjectName('_repr_pretty_')
 
@@ -652,7 +802,11 @@ def _deferred_printers_default(self):
 
     @catch_format_error
     def __call__(self, obj):
-        """Compute the pretty representation of the object."""
+        """Compute the pretty representation of the object.
+
+        If the output had to be truncated because of `max_chars` or
+        `max_lines`, a ``(text, {'truncated': True})`` tuple is returned.
+        """
         if not self.pprint:
             return repr(obj)
         else:
@@ -666,9 +820,13 @@ def __call__(self, obj):
                 max_seq_length=self.max_seq_length,
                 singleton_pprinters=self.singleton_printers,
                 type_pprinters=self.type_printers,
-                deferred_pprinters=self.deferred_printers)
+                deferred_pprinters=self.deferred_printers,
+                max_chars=self.max_chars, max_lines=self.max_lines,
+                iterative=self.iterative)
             printer.pretty(obj)
             printer.flush()
+            if printer.truncated:
+                return stream.getvalue(), {'truncated': True}
             return stream.getvalue()
 
 
@@ -880,6 +1038,9 @@ def __call__(self, obj):
                 method()
                 return True
 
+    def _is_applicable(self, obj):
+        return self.enabled and self._has_printer_or_method(obj)
+
 
 FormatterABC.register(BaseFormatter)
 FormatterABC.register(PlainTextFormatter)
@@ -20,6 +20,7 @@
 
 from traitlets.config.configurable import LoggingConfigurable
 from decorator import decorator
+from IPython.core.displayhook import OutputCache
 from IPython.utils.decorators import undoc
 from IPython.utils.path import locate_profile
 from IPython.utils import py3compat
@@ -495,6 +496,9 @@ def _dir_hist_default(self):
     # A dict of output history, keyed with ints from the shell's
     # execution count.
     output_hist = Dict()
+    @default('output_hist')
+    def _output_hist_default(self):
+        return OutputCache()
     # The text/plain repr of outputs.
     output_hist_reprs = Dict()
 
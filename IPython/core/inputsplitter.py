@@ -34,6 +34,7 @@
                                            assign_from_magic,
                                            assign_from_system,
                                            assemble_python_lines,
+                                           TokenState,
                                            )
 
 # These are available in this module for backwards compatibility.
@@ -66,6 +67,9 @@
 # before pure comments
 comment_line_re = re.compile('^\s*\#')
 
+# regexp to match the clauses that continue a compound statement at its level
+statement_continuation_re = re.compile(r'(else|elif|except|finally)\b')
+
 
 def num_ini_spaces(s):
     """Return the number of initial spaces in a string.
@@ -190,17 +194,16 @@ class InputSplitter(object):
     # at initialization time via get_input_encoding(), but it can be reset by a
     # client with specific knowledge of the encoding.
     encoding = ''
-    # String where the current full source input is stored, properly encoded.
-    # Reading this attribute is the normal way of querying the currently pushed
-    # source code, that has been properly encoded.
-    source = ''
-    # Code object corresponding to the current source.  It is automatically
-    # synced to the source, so it can be queried at any time to obtain the code
-    # object; it will be None if the source doesn't compile to valid Python.
-    code = None
-
     # Private attributes
 
+    # Code object for the statements compiled by the last push.  Statements
+    # that were already complete before are not compiled again, so this covers
+    # the source pushed since the last complete top-level statement.  It is
+    # None if that source isn't complete or doesn't compile to valid Python.
+    _code = None
+    # Length of the source _code was compiled from, or None if it was set
+    # from outside
+    _code_length = None
     # List with lines of input accumulated so far
     _buffer = None
     # Command compiler
@@ -211,14 +214,68 @@ class InputSplitter(object):
     _is_complete = None
     # Boolean indicating whether the current block has an unrecoverable syntax error
     _is_invalid = False
+    # TokenState for the lines in _buffer
+    _tokens = None
+    # Indices in _buffer up to which the source compiled as complete
+    _checkpoints = None
+    # Whether lines were stored without being checked for completeness
+    _unchecked = False
+    # Whether the source was inside brackets or a string at the last check
+    _was_open = False
+    # Cached ''.join(_buffer), or None
+    _source = None
+    # Source of the last incremental check_complete() whose state was kept
+    _checked = None
 
     def __init__(self):
         """Create a new InputSplitter instance.
         """
         self._buffer = []
+        self._checkpoints = []
+        self._tokens = TokenState()
         self._compile = codeop.CommandCompiler()
         self.encoding = get_input_encoding()
 
+    @property
+    def source(self):
+        """The current full source input, properly encoded.
+
+        Reading this attribute is the normal way of querying the currently
+        pushed source code.
+        """
+        if self._source is None:
+            self._source = self._set_source(self._buffer)
+        return self._source
+
+    @source.setter
+    def source(self, value):
+        self._source = value
+
+    @property
+    def code(self):
+        """Code object for the current full source.
+
+        None if the source isn't complete or doesn't compile to valid Python.
+        Pushing only compiles the statements since the last complete one, so
+        the full source is compiled when this is read.
+        """
+        code = self._code
+        if (code is not None and self._code_length is not None
+                and self._code_length != len(self.source)):
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('error', SyntaxWarning)
+                    code = self._compile(self.source, symbol="exec")
+            except (SyntaxError, OverflowError, ValueError, TypeError,
+                    MemoryError, SyntaxWarning):
+                code = None
+            self._code, self._code_length = code, len(self.source)
+        return code
+
+    @code.setter
+    def code(self, value):
+        self._code, self._code_length = value, None
+
     def reset(self):
         """Reset the input buffer and associated state."""
         self.indent_spaces = 0
@@ -228,6 +285,11 @@ def reset(self):
         self._is_complete = False
         self._is_invalid = False
         self._full_dedent = False
+        self._tokens.reset()
+        self._checkpoints[:] = []
+        self._unchecked = False
+        self._was_open = False
+        self._checked = None
 
     def source_reset(self):
         """Return the input source and perform a full reset.
@@ -236,15 +298,23 @@ def source_reset(self):
         self.reset()
         return out
 
-    def check_complete(self, source):
+    def check_complete(self, source, incremental=False):
         """Return whether a block of code is ready to execute, or should be continued
         
-        This is a non-stateful API, and will reset the state of this InputSplitter.
+        Unless `incremental` is given, this is a non-stateful API, and will
+        reset the state of this InputSplitter.
         
         Parameters
         ----------
         source : string
           Python input code, which can be multiline.
+        incremental : bool
+          For frontends that check the same growing buffer on every newline.
+          If True and the result is 'incomplete', the state is kept instead of
+          reset, and a following incremental call whose source extends the
+          previous one by whole lines only pushes the new lines. Any other
+          call or :meth:`reset` discards the kept state, and a source ending
+          in a backslash continuation is always checked in full.
         
         Returns
         -------
@@ -255,9 +325,26 @@ def check_complete(self, source):
           The number of spaces by which to indent the next line of code. If
           status is not 'incomplete', this is None.
         """
-        self.reset()
+        checked, self._checked = self._checked, None
+        # push() skips the indentation of a chunk ending in a backslash
+        # continuation, so such a source is always checked from the start,
+        # as the full check does.
+        continued = source.endswith('\\\n')
+        resume = (incremental and checked is not None and not continued
+                  and source.startswith(checked))
+        if not resume:
+            self.reset()
+        keep = False
         try:
-            self.push(source)
+            if not resume:
+                self.push(source)
+            elif len(source) > len(checked):
+                self.push(source[len(checked):])
+            if not (self._is_complete or self._tokens.at_boundary
+                    or self._buffer[-1].endswith('\\\n')):
+                # push() doesn't compile inside brackets or strings; compile
+                # anyway to report syntax errors there.
+                self._compile_pending()
         except SyntaxError:
             # Transformers in IPythonInputSplitter can raise SyntaxError,
             # which push() will not catch.
@@ -266,11 +353,16 @@ def check_complete(self, source):
             if self._is_invalid:
                 return 'invalid', None
             elif self.push_accepts_more():
+                keep = (incremental and source.endswith('\n')
+                        and not continued)
                 return 'incomplete', self.indent_spaces
             else:
                 return 'complete', None
         finally:
-            self.reset()
+            if keep:
+                self._checked = source
+            else:
+                self.reset()
 
     def push(self, lines):
         """Push one or more lines of input.
@@ -294,24 +386,64 @@ def push(self, lines):
           this value is also stored as a private attribute (``_is_complete``), so it
           can be queried at any time.
         """
+        self._append(lines)
+        return self._check()
+
+    def _append(self, lines, scanned=False):
+        """Store lines and update the indentation and tokenizer state.
+
+        `scanned` tells that the lines are complete Python lines without
+        errors, already scanned by the caller: if the source before them ends
+        cleanly, so do they, and the tokenizer state stays the same.
+        """
         self._store(lines)
-        source = self.source
+        tokens = self._tokens
+        if not (scanned and tokens.at_boundary and not tokens.error):
+            tokens.feed(lines)
+        self._unchecked = True
+        if not self._buffer[-1].endswith('\\\n'):
+            self._update_indent(lines)
+
+    def _check(self):
+        """Decide whether the stored source is complete, compiling if needed."""
+        self._unchecked = False
+        was_invalid = self._is_invalid
 
         # Before calling _compile(), reset the code object to None so that if an
         # exception is raised in compilation, we don't mislead by having
         # inconsistent code/source attributes.
-        self.code, self._is_complete = None, None
+        self._code, self._is_complete = None, None
         self._is_invalid = False
 
         # Honor termination lines properly
-        if source.endswith('\\\n'):
+        if self._buffer[-1].endswith('\\\n'):
             return False
 
-        self._update_indent(lines)
+        # Inside brackets or a multi-line string, no statement can end yet.
+        # The source is compiled once on entering them, to catch errors
+        # before that point, and then not again until they are closed
+        # (unless it was already invalid: then it still is).
+        was_open, self._was_open = self._was_open, not self._tokens.at_boundary
+        if was_open and self._was_open and not was_invalid:
+            self._is_complete = False
+            return False
+
+        return self._compile_pending()
+
+    def _compile_pending(self):
+        """Compile the source pushed since the last complete statement."""
+        # Start from the latest point after which a new statement begins
+        start = 0
+        for index in reversed(self._checkpoints):
+            if self._starts_statement(index):
+                start = index
+                break
+        source = self._set_source(self._buffer[start:])
         try:
             with warnings.catch_warnings():
                 warnings.simplefilter('error', SyntaxWarning)
-                self.code = self._compile(source, symbol="exec")
+                self._code = self._compile(source, symbol="exec")
+                self._code_length = len(source)
         # Invalid syntax can produce any of a number of different errors from
         # inside the compiler, so we have to catch them all.  Syntax errors
         # immediately produce a 'ready' block, so the invalid Python can be
@@ -324,10 +456,29 @@ def push(self, lines):
         else:
             # Compilation didn't produce any exceptions (though it may not have
             # given a complete code object)
-            self._is_complete = self.code is not None
+            self._is_complete = self._code is not None
+            if self._is_complete and self._tokens.at_boundary:
+                # What we have compiles, so the next push only needs to
+                # compile what follows, if it starts a new statement.
+                self._checkpoints.append(len(self._buffer))
 
         return self._is_complete
 
+    def _starts_statement(self, index):
+        """Whether the lines from _buffer[index] on start a new top-level
+        statement, so that they compile the same with or without the lines
+        before them."""
+        for lines in self._buffer[index:]:
+            for line in lines.splitlines():
+                if not line or line.isspace() or comment_line_re.match(line):
+                    continue
+                if line[0] in ' \t' or statement_continuation_re.match(line):
+                    return False
+                # __future__ imports are only allowed at the top
+                return '__future__' not in self._set_source(
+                    self._buffer[index:])
+        return False
+
     def push_accepts_more(self):
         """Return whether a block of interactive input can accept more input.
 
@@ -446,7 +597,11 @@ def _store(self, lines, buffer=None, store='source'):
             buffer.append(lines)
         else:
             buffer.append(lines+'\n')
-        setattr(self, store, self._set_source(buffer))
+        if store == 'source':
+            # Joined when read, so pushing line by line stays linear
+            self._source = None
+        else:
+            setattr(self, store, self._set_source(buffer))
 
     def _set_source(self, buffer):
         return u''.join(buffer)
@@ -636,14 +791,21 @@ def push(self, lines):
         # flush the buffer.
         self._store(lines, self._buffer_raw, 'source_raw')
 
-        for line in lines_list:
-            out = self.push_line(line)
+        # Only the last line's result is returned, so only then is the source
+        # checked for completeness.
+        last = len(lines_list) - 1
+        for i, line in enumerate(lines_list):
+            out = self._push_line(line, check=(i == last))
+        if self._unchecked:
+            self._check()
 
         return out
-    
+
     def push_line(self, line):
-        buf = self._buffer
-        
+        return self._push_line(line)
+
+    def _push_line(self, line, check=True):
+
         def _accumulating(dbg):
             #print(dbg)
             self.transformer_accumulating = True
@@ -678,4 +840,10 @@ def _accumulating(dbg):
 
         #print("transformers clear") #debug
         self.transformer_accumulating = False
-        return super(IPythonInputSplitter, self).push(line)
+        # The line was just scanned by assemble_python_lines
+        scanned = (self.assemble_python_lines.clean and
+                   not self.python_line_transforms)
+        self._append(line, scanned)
+        if not check:
+            return False
+        return self._check()
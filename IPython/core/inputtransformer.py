@@ -10,7 +10,7 @@
 from IPython.core.splitinput import LineInfo
 from IPython.utils import tokenize2
 from IPython.utils.openpy import cookie_comment_re
-from IPython.utils.py3compat import with_metaclass, PY3
+from IPython.utils.py3compat import with_metaclass, string_types, PY3
 from IPython.utils.tokenize2 import generate_tokens, untokenize, TokenError
 
 if PY3:
@@ -68,20 +68,35 @@ def reset(self):
         pass
     
     @classmethod
-    def wrap(cls, func):
+    def wrap(cls, func=None, **defaults):
         """Can be used by subclasses as a decorator, to return a factory that
         will allow instantiation with the decorated object.
+
+        Used as ``@wrap(name=value)``, the keyword arguments are defaults for
+        the arguments passed to the factory.
         """
+        if func is None:
+            return functools.partial(cls.wrap, **defaults)
+
         @functools.wraps(func)
         def transformer_factory(**kwargs):
-            return cls(func, **kwargs)
+            options = dict(defaults, **kwargs)
+            return cls(func, **options)
         
         return transformer_factory
 
 class StatelessInputTransformer(InputTransformer):
-    """Wrapper for a stateless input transformer implemented as a function."""
-    def __init__(self, func):
+    """Wrapper for a stateless input transformer implemented as a function.
+
+    If `trigger` is given, it is a regular expression that func can only
+    change lines containing; other lines are passed through without calling
+    func.
+    """
+    def __init__(self, func, trigger=None):
         self.func = func
+        if isinstance(trigger, string_types):
+            trigger = re.compile(trigger)
+        self.trigger = trigger
     
     def __repr__(self):
         return "StatelessInputTransformer(func={0!r})".format(self.func)
@@ -89,6 +104,8 @@ def __repr__(self):
     def push(self, line):
         """Send a line of input to the transformer, returning the
         transformed input."""
+        if self.trigger is not None and self.trigger.search(line) is None:
+            return line
         return self.func(line)
     
     def reset(self):
@@ -175,13 +192,140 @@ def reset(self):
         if l:
             return l.rstrip('\n')
 
+class TokenState(object):
+    """Lexical state of Python source, carried from one pushed line to the next.
+
+    Only the parts of tokenization that decide whether a statement can end
+    at the end of the source are tracked: the open brackets, an unterminated
+    string and a trailing backslash. Feeding a line costs time proportional
+    to that line, however much source came before it.
+    """
+    _special = re.compile(r'[#()\[\]{}"\'\\]')
+    _closing = {')': '(', ']': '[', '}': '{'}
+    _in_string = {}
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # Open brackets, innermost last
+        self.brackets = []
+        # Closing delimiter of the string the source ends in, if any
+        self.quote = None
+        self.continued = False
+        # Set on errors the tokenizer can see, like unbalanced brackets
+        self.error = False
+
+    @property
+    def at_boundary(self):
+        """Whether a statement could end here, or the source is broken."""
+        return self.error or not (self.brackets or self.quote or
+                                  self.continued)
+
+    def feed(self, lines):
+        for line in lines.splitlines() or ['']:
+            self._feed_line(line)
+
+    def _feed_line(self, line):
+        brackets, quote = self.brackets, self.quote
+        continued = False
+        pos, end = 0, len(line)
+        while pos < end:
+            if quote is not None:
+                m = self._string_re(quote).search(line, pos)
+                if m is None:
+                    break
+                if m.group() == '\\':
+                    if m.end() == end:
+                        continued = True
+                    pos = m.end() + 1
+                    continue
+                quote = None
+                pos = m.end()
+                continue
+            m = self._special.search(line, pos)
+            if m is None:
+                break
+            c = m.group()
+            pos = m.end()
+            if c == '#':
+                break
+            elif c in '([{':
+                brackets.append(c)
+            elif c in ')]}':
+                if not brackets or brackets.pop() != self._closing[c]:
+                    self.error = True
+            elif c == '\\':
+                if pos == end:
+                    continued = True
+                else:
+                    # Only allowed at the end of a line
+                    self.error = True
+            elif line.startswith(c * 3, m.start()):
+                quote = c * 3
+                pos += 2
+            else:
+                quote = c
+        if quote is not None and len(quote) == 1 and not continued:
+            # An unterminated single-quoted string is a syntax error; let
+            # the compiler report it.
+            quote = None
+            self.error = True
+        self.quote, self.continued = quote, continued
+
+    @classmethod
+    def _string_re(cls, quote):
+        try:
+            return cls._in_string[quote]
+        except KeyError:
+            regex = cls._in_string[quote] = re.compile(
+                r'\\|' + re.escape(quote))
+            return regex
+
+# Characters the tokenizer reports as errors, which change how
+# assemble_python_lines splits input; lines containing any of them are
+# assembled by tokenizing.
+_unusual_re = re.compile(r'[^\t\x0c -~]|[$?`]|!(?!=)')
+
 class assemble_python_lines(TokenInputTransformer):
+    """Join physical lines into complete Python lines.
+
+    Lines are scanned with a :class:`TokenState`, which is enough to find where
+    Python lines end unless the tokenizer would see an error. Lines where it
+    might are assembled by tokenizing, like other token transformers.
+    """
     def __init__(self):
         super(assemble_python_lines, self).__init__(None)
-    
+        self.state = TokenState()
+        self.tokenize = False
+        # Whether the last line returned was scanned without errors, so that
+        # it ends outside any brackets or strings.
+        self.clean = False
+
+    def push(self, line):
+        if not self.tokenize:
+            self.state.feed(line)
+            self.tokenize = (self.state.error or
+                             _unusual_re.search(line) is not None)
+        if self.tokenize:
+            return super(assemble_python_lines, self).push(line)
+
+        self.current_line += line + "\n"
+        if self.state.at_boundary:
+            line = self.reset()
+            self.clean = True
+            return line
+        return None
+
     def output(self, tokens):
         return self.reset()
 
+    def reset(self):
+        self.state.reset()
+        self.tokenize = False
+        self.clean = False
+        return super(assemble_python_lines, self).reset()
+
 @CoroutineInputTransformer.wrap
 def assemble_logical_lines():
     """Join lines following explicit line continuations (\)"""
@@ -268,7 +412,7 @@ def _tr_paren(line_info):
        ESC_QUOTE2 : _tr_quote2,
        ESC_PAREN  : _tr_paren }
 
-@StatelessInputTransformer.wrap
+@StatelessInputTransformer.wrap(trigger=r'^\s*[,;/%!?]')
 def escaped_commands(line):
     """Transform escaped commands - %magic, !system, ?help + various autocalls.
     """
@@ -344,7 +488,7 @@ def ends_in_comment_or_string(src):
     return (tokenize2.COMMENT in toktypes) or (_MULTILINE_STRING in toktypes)
         
 
-@StatelessInputTransformer.wrap
+@StatelessInputTransformer.wrap(trigger=r'\?')
 def help_end(line):
     """Translate lines with ?/?? at the end"""
     m = _help_end_re.search(line)
@@ -540,7 +684,7 @@ def strip_encoding_cookie():
 
 assign_system_re = re.compile(r'{}!\s*(?P<cmd>.*)'.format(_assign_pat), re.VERBOSE)
 assign_system_template = '%s = get_ipython().getoutput(%r)'
-@StatelessInputTransformer.wrap
+@StatelessInputTransformer.wrap(trigger=r'=\s*!')
 def assign_from_system(line):
     """Transform assignment from system commands (e.g. files = !ls)"""
     m = assign_system_re.match(line)
@@ -551,7 +695,7 @@ def assign_from_system(line):
 
 assign_magic_re = re.compile(r'{}%\s*(?P<cmd>.*)'.format(_assign_pat), re.VERBOSE)
 assign_magic_template = '%s = get_ipython().magic(%r)'
-@StatelessInputTransformer.wrap
+@StatelessInputTransformer.wrap(trigger=r'=\s*%')
 def assign_from_magic(line):
     """Transform assignment from magic commands (e.g. a = %who_ls)"""
     m = assign_magic_re.match(line)
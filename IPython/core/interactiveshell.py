@@ -28,7 +28,6 @@
 import warnings
 from io import open as io_open
 
-from pickleshare import PickleShareDB
 
 from traitlets.config.configurable import SingletonConfigurable
 from IPython.core import oinspect
@@ -44,7 +43,7 @@
 from IPython.core.compilerop import CachingCompiler, check_linecache_ipython
 from IPython.core.debugger import Pdb
 from IPython.core.display_trap import DisplayTrap
-from IPython.core.displayhook import DisplayHook
+from IPython.core.displayhook import DisplayHook, OutputCache
 from IPython.core.displaypub import DisplayPublisher
 from IPython.core.error import InputRejected, UsageError
 from IPython.core.extensions import ExtensionManager
@@ -56,6 +55,7 @@
 from IPython.core.payload import PayloadManager
 from IPython.core.prefilter import PrefilterManager
 from IPython.core.profiledir import ProfileDir
+from IPython.core.shelldb import ShellDB
 from IPython.core.usage import default_banner
 from IPython.testing.skipdoctest import skip_doctest_py2, skip_doctest
 from IPython.utils import PyColorize
@@ -67,7 +67,7 @@
 from IPython.utils.ipstruct import Struct
 from IPython.paths import get_ipython_dir
 from IPython.utils.path import get_home_dir, get_py_filename, ensure_dir_exists
-from IPython.utils.process import system, getoutput
+from IPython.utils.process import system, getoutput, getoutput_stream
 from IPython.utils.py3compat import (builtin_mod, unicode_type, string_types,
                                      with_metaclass, iteritems)
 from IPython.utils.strdispatch import StrDispatch
@@ -398,6 +398,21 @@ def _prompt_trait_changed(self, change):
         run interactively (displaying output from expressions)."""
     ).tag(config=True)
 
+    stream_system_output = Bool(False, help=
+        """
+        Return the output of commands captured with `x = !cmd` or %sx while
+        they run, as a list that fills in as lines are produced. Iterating
+        over it, grep() and fields() then start before the command finishes.
+        """
+    ).tag(config=True)
+
+    system_capture_limit = Integer(2**26, help=
+        """
+        With stream_system_output, the number of characters of command
+        output kept in memory. Further output is kept in a temporary file.
+        """
+    ).tag(config=True)
+
     # TODO: this part of prompt management should be moved to the frontends.
     # Use custom TraitTypes that convert '0'->'' and '\\n'->'\n'
     separate_in = SeparateUnicode('\n').tag(config=True)
@@ -406,6 +421,47 @@ def _prompt_trait_changed(self, change):
     wildcards_case_sensitive = Bool(True).tag(config=True)
     xmode = CaselessStrEnum(('Context','Plain', 'Verbose'),
                             default_value='Context').tag(config=True)
+    xmode_max_frames = Integer(0, help=
+        """
+        Maximum number of frames shown in Context and Verbose tracebacks.
+        Deeper tracebacks (e.g. from runaway recursion) show the first and last
+        frames and summarize the ones in between. 0 means no limit.
+        """).tag(config=True)
+
+    @observe('xmode_max_frames')
+    def _xmode_max_frames_changed(self, change):
+        if getattr(self, 'InteractiveTB', None) is not None:
+            self.InteractiveTB.max_frames = change['new']
+
+    xmode_deferred = Bool(False, help=
+        """
+        In the Context and Verbose exception modes, print a cheap Plain
+        traceback when an exception happens, and only build the slower full
+        traceback when asked to with %tb (or %tb -v, which includes local
+        variables).
+        """).tag(config=True)
+
+    @observe('xmode_deferred')
+    def _xmode_deferred_changed(self, change):
+        if getattr(self, 'InteractiveTB', None) is not None:
+            self.InteractiveTB.deferred = change['new']
+
+    exception_record_file = Unicode('', help=
+        """
+        File to which a JSON record of every exception shown in the shell is
+        appended, one per line. See the exception_recorded event for the
+        contents of the records. Empty to disable.
+        """).tag(config=True)
+
+    exception_record_locals = Bool(False, help=
+        """
+        Include the reprs of local variables in exception records.
+        """).tag(config=True)
+
+    @observe('exception_record_file')
+    def _exception_record_file_changed(self, change):
+        if getattr(self, 'events', None) is not None:
+            self._set_exception_record_writer()
 
     # Subcomponents of InteractiveShell
     alias_manager = Instance('IPython.core.alias.AliasManager', allow_none=True)
@@ -468,7 +524,7 @@ def __init__(self, ipython_dir=None, profile_dir=None,
         # While we're trying to have each part of the code directly access what
         # it needs without keeping redundant references to objects, we have too
         # much legacy code that expects ip.db to exist.
-        self.db = PickleShareDB(os.path.join(self.profile_dir.location, 'db'))
+        self.db = ShellDB(os.path.join(self.profile_dir.location, 'db'))
 
         self.init_history()
         self.init_encoding()
@@ -590,8 +646,10 @@ def init_encoding(self):
 
     def init_syntax_highlighting(self):
         # Python source parser/formatter for syntax highlighting
-        pyformat = PyColorize.Parser().format
-        self.pycolorize = lambda src: pyformat(src,'str',self.colors)
+        parser = PyColorize.Parser()
+        self.pycolorize = lambda src: parser.format(src,'str',self.colors)
+        self.pycolorize_lines = lambda lines: parser.format_lines(lines,
+                                                                  self.colors)
 
     def refresh_style(self):
         # No-op here, used in subclass
@@ -844,6 +902,10 @@ def init_events(self):
         self.events = EventManager(self, available_events)
 
         self.events.register("pre_execute", self._clear_warning_registry)
+        self.events.register("post_execute", self.db.flush)
+        self.events.register("post_execute",
+                             self.prefilter_manager.clear_ofind_cache)
+        self._set_exception_record_writer()
 
     def register_post_execute(self, func):
         """DEPRECATED: Use ip.events.register('post_run_cell', func)
@@ -1266,7 +1328,10 @@ def del_var(self, varname, by_name=False):
             # Also check in output history
             ns_refs.append(self.history_manager.output_hist)
             for ns in ns_refs:
-                to_delete = [n for n, o in iteritems(ns) if o is obj]
+                # Outputs spilled to disk are copies, don't load them
+                items = (ns.held_items() if isinstance(ns, OutputCache)
+                         else iteritems(ns))
+                to_delete = [n for n, o in items if o is obj]
                 for name in to_delete:
                     del ns[name]
 
@@ -1530,13 +1595,17 @@ def _inspect(self, meth, oname, namespaces=None, **kw):
             print('Object `%s` not found.' % oname)
             return 'not found'  # so callers can take other action
 
-    def object_inspect(self, oname, detail_level=0):
-        """Get object info about oname"""
+    def object_inspect(self, oname, detail_level=0, fields=None):
+        """Get object info about oname
+
+        If fields is given, only those info fields are computed, see
+        :data:`IPython.core.oinspect.info_fields` for the possible names.
+        """
         with self.builtin_trap:
             info = self._object_find(oname)
             if info.found:
                 return self.inspector.info(info.obj, oname, info=info,
-                            detail_level=detail_level
+                            detail_level=detail_level, fields=fields
                 )
             else:
                 return oinspect.object_info(name=oname, found=False)
@@ -1586,7 +1655,9 @@ def init_traceback_handlers(self, custom_exceptions):
                                                      color_scheme='NoColor',
                                                      tb_offset = 1,
                                    check_cache=check_linecache_ipython,
-                                   debugger_cls=self.debugger_cls)
+                                   debugger_cls=self.debugger_cls,
+                                   max_frames=self.xmode_max_frames,
+                                   deferred=self.xmode_deferred)
 
         # The instance will store a pointer to the system-wide exception hook,
         # so that runtime code (such as magics) can access it.  This is because
@@ -1816,6 +1887,8 @@ def showtraceback(self, exc_tuple=None, filename=None, tb_offset=None,
                                             value, tb, tb_offset=tb_offset)
 
                     self._showtraceback(etype, value, stb)
+                    if self.events.callbacks['exception_recorded']:
+                        self._record_exception(etype, value, tb, tb_offset)
                     if self.call_pdb:
                         # drop into debugger
                         self.debugger(force=True)
@@ -1827,6 +1900,36 @@ def showtraceback(self, exc_tuple=None, filename=None, tb_offset=None,
         except KeyboardInterrupt:
             print('\n' + self.get_exception_only(), file=sys.stderr)
 
+    def _record_exception(self, etype, evalue, tb, tb_offset=None):
+        """Build the record of an exception and fire exception_recorded."""
+        if self._recording_exception:
+            # A callback failed, don't record its own traceback
+            return
+        self._recording_exception = True
+        try:
+            record = self.InteractiveTB.exception_record(
+                etype, evalue, tb, tb_offset=tb_offset,
+                include_locals=self.exception_record_locals)
+            record['execution_count'] = self.execution_count
+            self.events.trigger('exception_recorded', record)
+        finally:
+            self._recording_exception = False
+
+    _recording_exception = False
+    _exception_record_writer = None
+
+    def _set_exception_record_writer(self):
+        """Register a writer for exception_record_file, replacing the old one."""
+        if self._exception_record_writer is not None:
+            self.events.unregister('exception_recorded',
+                                   self._exception_record_writer)
+            self._exception_record_writer = None
+        if self.exception_record_file:
+            writer = ultratb.ExceptionRecordWriter(
+                os.path.expanduser(self.exception_record_file))
+            self.events.register('exception_recorded', writer)
+            self._exception_record_writer = writer
+
     def _showtraceback(self, etype, evalue, stb):
         """Actually show a traceback.
 
@@ -2254,7 +2357,7 @@ def system_raw(self, cmd):
     # use piped system by default, because it is better behaved
     system = system_piped
 
-    def getoutput(self, cmd, split=True, depth=0):
+    def getoutput(self, cmd, split=True, depth=0, stream=None):
         """Get output (possibly including stderr) from a subprocess.
 
         Parameters
@@ -2272,10 +2375,20 @@ def getoutput(self, cmd, split=True, depth=0):
           How many frames above the caller are the local variables which should
           be expanded in the command string? The default (0) assumes that the
           expansion variables are in the stack frame calling this function.
+        stream : bool, optional
+          If True, and `split` is True, return the output lines while the
+          command runs, as a
+          :class:`~IPython.utils._process_common.StreamingSList`. Defaults to
+          the stream_system_output option.
         """
         if cmd.rstrip().endswith('&'):
             # this is *far* from a rigorous test
             raise OSError("Background processes not supported.")
+        if stream is None:
+            stream = self.stream_system_output
+        if split and stream:
+            return getoutput_stream(self.var_expand(cmd, depth=depth+1),
+                                    self.system_capture_limit)
         out = getoutput(self.var_expand(cmd, depth=depth+1))
         if split:
             out = SList(out.splitlines())
@@ -3166,7 +3279,8 @@ def find_user_code(self, target, raw=True, py_only=False, skip_encoding_cookie=T
 
         if search_ns:
             # Inspect namespace to load object source
-            object_info = self.object_inspect(target, detail_level=1)
+            object_info = self.object_inspect(target, detail_level=1,
+                                              fields=['source'])
             if object_info['found'] and object_info['source']:
                 return object_info['source']
 
@@ -3203,6 +3317,9 @@ def atexit_operations(self):
         # history db
         self.history_manager.end_session()
 
+        # Write out anything still cached for ip.db
+        self.db.flush()
+
         # Cleanup all tempfiles and folders left around
         for tfile in self.tempfiles:
             try:
@@ -447,8 +447,27 @@ def _debug_exec(self, code, breakpoint):
     def tb(self, s):
         """Print the last traceback with the currently active exception mode.
 
+        This always prints the full traceback, even if the shell was set up
+        to print a short one when the exception happened (see the
+        InteractiveShell.xmode_deferred option).
+
+        Options:
+
+          -v: print the traceback in Verbose mode, with the values of local
+          variables, whatever the current exception mode is.
+
         See %xmode for changing exception reporting modes."""
-        self.shell.showtraceback()
+        opts, args = self.parse_options(s, 'v')
+        handler = self.shell.InteractiveTB
+        mode, deferred = handler.mode, handler.deferred
+        handler.deferred = False
+        try:
+            if 'v' in opts:
+                handler.set_mode('Verbose')
+            self.shell.showtraceback()
+        finally:
+            handler.set_mode(mode)
+            handler.deferred = deferred
 
     @skip_doctest
     @line_magic
@@ -19,6 +19,7 @@
 from io import open as io_open
 
 # Our own packages
+from IPython.core import page
 from IPython.core.error import StdinNotImplementedError
 from IPython.core.magic import Magics, magics_class, line_magic
 from IPython.core.magic_arguments import (argument, magic_arguments,
@@ -195,27 +196,36 @@ def _format_lineno(session, line):
         # misalign.
         width = 4
 
-        for session, lineno, inline in hist:
-            # Print user history with tabs expanded to 4 spaces.  The GUI
-            # clients use hard tabs for easier usability in auto-indented code,
-            # but we want to produce PEP-8 compliant history for safe pasting
-            # into an editor.
-            if get_output:
-                inline, output = inline
-            inline = inline.expandtabs(4).rstrip()
-
-            multiline = "\n" in inline
-            line_sep = '\n' if multiline else ' '
-            if print_nums:
-                print(u'%s:%s' % (_format_lineno(session, lineno).rjust(width),
-                        line_sep),  file=outfile, end=u'')
-            if pyprompts:
-                print(u">>> ", end=u"", file=outfile)
-                if multiline:
-                    inline = "\n... ".join(inline.splitlines()) + "\n..."
-            print(inline, file=outfile)
-            if get_output and output:
-                print(cast_unicode_py2(output), file=outfile)
+        def format_hist():
+            for session, lineno, inline in hist:
+                # Print user history with tabs expanded to 4 spaces.  The GUI
+                # clients use hard tabs for easier usability in auto-indented
+                # code, but we want to produce PEP-8 compliant history for safe
+                # pasting into an editor.
+                if get_output:
+                    inline, output = inline
+                inline = inline.expandtabs(4).rstrip()
+
+                multiline = "\n" in inline
+                line_sep = '\n' if multiline else ' '
+                prefix = u''
+                if print_nums:
+                    prefix = u'%s:%s' % (
+                        _format_lineno(session, lineno).rjust(width), line_sep)
+                if pyprompts:
+                    prefix += u">>> "
+                    if multiline:
+                        inline = "\n... ".join(inline.splitlines()) + "\n..."
+                yield prefix + inline
+                if get_output and output:
+                    yield cast_unicode_py2(output)
+
+        if outfile is sys.stdout and sys.stdout.isatty():
+            # Page as the history is read, rather than all of it at the end
+            page.page_lines(format_hist())
+        else:
+            for entry in format_hist():
+                print(entry, file=outfile)
 
         if close_at_end:
             outfile.close()
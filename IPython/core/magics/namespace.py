@@ -170,6 +170,11 @@ def psearch(self, parameter_s=''):
           If this option is not specified in your configuration file, IPython's
           internal default is to do a case sensitive search.
 
+          -m: search the names defined at the top level of all imported
+          modules, by their full dotted name, instead of the namespaces below.
+          The names are kept in an index which is updated as modules get
+          imported, so this is fast even with many large packages loaded.
+
           -e/-s NAMESPACE: exclude/search a given namespace.  The pattern you
           specify can be searched in any of the following namespaces:
           'builtin', 'user', 'user_global','internal', 'alias', where
@@ -194,6 +199,8 @@ def psearch(self, parameter_s=''):
           %psearch re.e*         -> objects beginning with an e in module re
           %psearch r*.e*         -> objects that start with e in modules starting in r
           %psearch r*.* string   -> all strings in modules beginning with r
+          %psearch -m numpy.*.norm -> functions called norm in numpy's
+                                      submodules
 
         Case sensitive search::
 
@@ -213,7 +220,7 @@ def psearch(self, parameter_s=''):
         def_search = ['user_local', 'user_global', 'builtin']
 
         # Process options/args
-        opts,args = self.parse_options(parameter_s,'cias:e:',list_all=True)
+        opts,args = self.parse_options(parameter_s,'ciams:e:',list_all=True)
         opt = opts.get
         shell = self.shell
         psearch = shell.inspector.psearch
@@ -234,7 +241,8 @@ def psearch(self, parameter_s=''):
         # Call the actual search
         try:
             psearch(args,shell.ns_table,ns_search,
-                    show_all=opt('a'),ignore_case=ignore_case)
+                    show_all=opt('a'),ignore_case=ignore_case,
+                    modules='m' in opts)
         except:
             shell.showtraceback()
 
@@ -756,7 +756,8 @@ def pycat(self, parameter_s=''):
             print("Error: no such file, variable, URL, history range or macro")
             return
 
-        page.page(self.shell.pycolorize(source_to_unicode(cont)))
+        page.page_lines(self.shell.pycolorize_lines(
+            source_to_unicode(cont).splitlines()))
 
     @magic_arguments.magic_arguments()
     @magic_arguments.argument(
@@ -4,22 +4,31 @@
 # Copyright (c) IPython Development Team.
 # Distributed under the terms of the Modified BSD License.
 
+import codecs
 import errno
 import os
 import sys
 import signal
+import tempfile
+import threading
 import time
 from subprocess import Popen, PIPE
 import atexit
 
+try:
+    from queue import Queue, Empty, Full
+except ImportError: # Python 2
+    from Queue import Queue, Empty, Full
+
 from IPython.core import magic_arguments
 from IPython.core.magic import  (
     Magics, magics_class, line_magic, cell_magic
 )
 from IPython.lib.backgroundjobs import BackgroundJobManager
 from IPython.utils import py3compat
+from IPython.utils.encoding import DEFAULT_ENCODING
 from IPython.utils.process import arg_split
-from traitlets import List, Dict, default
+from traitlets import List, Dict, Integer, default
 
 #-----------------------------------------------------------------------------
 # Magic implementation classes
@@ -32,14 +41,18 @@ def script_args(f):
             '--out', type=str,
             help="""The variable in which to store stdout from the script.
             If the script is backgrounded, this will be the stdout *pipe*,
-            instead of the stderr text itself.
+            instead of the stderr text itself. If the output is larger than
+            ScriptMagics.capture_limit, this will be a temporary file holding
+            it.
             """
         ),
         magic_arguments.argument(
             '--err', type=str,
             help="""The variable in which to store stderr from the script.
             If the script is backgrounded, this will be the stderr *pipe*,
-            instead of the stderr text itself.
+            instead of the stderr text itself. If the output is larger than
+            ScriptMagics.capture_limit, this will be a temporary file holding
+            it.
             """
         ),
         magic_arguments.argument(
@@ -60,6 +73,56 @@ def script_args(f):
         f = arg(f)
     return f
 
+class _Echo(object):
+    """Write a script's output to a stream as it arrives.
+
+    An empty chunk marks the end of the output.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        if py3compat.PY3:
+            # Chunks may end in the middle of a character
+            decoder = codecs.getincrementaldecoder(DEFAULT_ENCODING)('replace')
+            self.decode = lambda data: decoder.decode(data, final=not data)
+        else:
+            self.decode = py3compat.bytes_to_str
+
+    def write(self, data):
+        text = self.decode(data)
+        if text:
+            self.stream.write(text)
+            self.stream.flush()
+
+
+class _Capture(object):
+    """Collect a script's output, in memory up to `limit` bytes, and in a
+    temporary file after that."""
+    def __init__(self, limit):
+        self.limit = limit
+        self.chunks = []
+        self.size = 0
+        self.file = None
+
+    def write(self, data):
+        if self.file is not None:
+            self.file.write(data)
+            return
+        self.chunks.append(data)
+        self.size += len(data)
+        if self.size > self.limit:
+            self.file = tempfile.TemporaryFile()
+            for chunk in self.chunks:
+                self.file.write(chunk)
+            self.chunks = []
+
+    def value(self):
+        """The output as text, or the temporary file holding it."""
+        if self.file is not None:
+            self.file.seek(0)
+            return self.file
+        return py3compat.bytes_to_str(b''.join(self.chunks))
+
+
 @magics_class
 class ScriptMagics(Magics):
     """Magics for talking to scripts
@@ -105,6 +168,15 @@ def _script_magics_default(self):
         find the right interpreter.
         """
     ).tag(config=True)
+
+    capture_limit = Integer(2**26,
+        help="""Bytes of output from each stream of a script to keep in memory
+        for --out and --err.
+
+        Above this, the output is saved to a temporary file, and the variable
+        is given the file instead of the text.
+        """
+    ).tag(config=True)
     
     def __init__(self, shell=None):
         super(ScriptMagics, self).__init__(shell=shell)
@@ -197,8 +269,10 @@ def shebang(self, line, cell):
                 self.shell.user_ns[args.proc] = p
             return
         
+        out = _Capture(self.capture_limit) if args.out else _Echo(sys.stdout)
+        err = _Capture(self.capture_limit) if args.err else _Echo(sys.stderr)
         try:
-            out, err = p.communicate(cell)
+            self._stream_script(p, cell, out, err)
         except KeyboardInterrupt:
             try:
                 p.send_signal(signal.SIGINT)
@@ -219,18 +293,73 @@ def shebang(self, line, cell):
                 print("Error while terminating subprocess (pid=%i): %s" \
                     % (p.pid, e))
             return
-        out = py3compat.bytes_to_str(out)
-        err = py3compat.bytes_to_str(err)
         if args.out:
-            self.shell.user_ns[args.out] = out
-        else:
-            sys.stdout.write(out)
-            sys.stdout.flush()
+            self.shell.user_ns[args.out] = out.value()
         if args.err:
-            self.shell.user_ns[args.err] = err
-        else:
-            sys.stderr.write(err)
-            sys.stderr.flush()
+            self.shell.user_ns[args.err] = err.value()
+
+    def _stream_script(self, p, cell, out, err):
+        """Send `cell` to the script, and its output to `out` and `err` as
+        soon as it is written, until the script exits.
+
+        Output from both pipes is handled in the order it arrives. Reading
+        only as fast as `out` and `err` take it keeps the script from
+        running ahead of them. If this is interrupted, the reader threads
+        stop at their next chunk and close the pipes.
+        """
+        # Bounded, so that the reader threads wait for slow output too
+        chunks = Queue(maxsize=16)
+        stopped = threading.Event()
+
+        def feed():
+            try:
+                p.stdin.write(cell)
+                p.stdin.close()
+            except (IOError, OSError):
+                # The script exited or closed stdin without reading it all
+                pass
+
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    chunks.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    pass
+            return False
+
+        def read(pipe, sink):
+            fd = pipe.fileno()
+            try:
+                while True:
+                    data = os.read(fd, 65536)
+                    if not put((sink, data)) or not data:
+                        break
+            finally:
+                pipe.close()
+
+        threads = [threading.Thread(target=feed),
+                   threading.Thread(target=read, args=(p.stdout, out)),
+                   threading.Thread(target=read, args=(p.stderr, err))]
+        for t in threads:
+            t.daemon = True
+            t.start()
+        open_pipes = 2
+        try:
+            while open_pipes:
+                try:
+                    # A timeout keeps the wait interruptible on Python 2
+                    sink, data = chunks.get(timeout=1)
+                except Empty:
+                    continue
+                sink.write(data)
+                if not data:
+                    open_pipes -= 1
+        finally:
+            stopped.set()
+        for t in threads[1:]:
+            t.join()
+        p.wait()
     
     def _run_script(self, p, cell):
         """callback for running the script in the background"""
@@ -17,7 +17,9 @@
 # stdlib modules
 import inspect
 import linecache
+import time
 import warnings
+import weakref
 import os
 from textwrap import dedent
 import types
@@ -38,12 +40,14 @@
 from IPython.utils.dir2 import safe_hasattr
 from IPython.utils.path import compress_user
 from IPython.utils.text import indent
-from IPython.utils.wildcard import list_namespace
+from IPython.utils.wildcard import list_namespace, module_index
 from IPython.utils.coloransi import TermColors, ColorScheme, ColorSchemeTable
 from IPython.utils.py3compat import cast_unicode, string_types, PY3
 from IPython.utils.signatures import signature
 from IPython.utils.colorable import Colorable
 
+from traitlets import Float
+
 from pygments import highlight
 from pygments.lexers import PythonLexer
 from pygments.formatters import HtmlFormatter
@@ -374,12 +378,19 @@ def find_source_lines(obj):
 
 class Inspector(Colorable):
 
+    info_cache_ttl = Float(2.0, help=
+        """
+        Seconds for which the information computed about an object (its
+        source, signatures, docstrings...) is reused. 0 disables the cache.
+        """).tag(config=True)
+
     def __init__(self, color_table=InspectColors,
                  code_color_table=PyColorize.ANSICodeColors,
                  scheme='NoColor',
                  str_detail_level=0,
                  parent=None, config=None):
         super(Inspector, self).__init__(parent=parent, config=config)
+        self._info_cache = {}
         self.color_table = color_table
         self.parser = PyColorize.Parser(out='str', parent=self, style=scheme)
         self.format = self.parser.format
@@ -509,7 +520,7 @@ def psource(self, obj, oname=''):
         if src is None:
             self.noinfo('source', oname)
         else:
-            page.page(self.format(src))
+            page.page_lines(self.parser.format_lines(src.splitlines()))
 
     def pfile(self, obj, oname=''):
         """Show the whole file where an object was defined."""
@@ -531,7 +542,8 @@ def pfile(self, obj, oname=''):
             # Print only text files, not extension binaries.  Note that
             # getsourcelines returns lineno with 1-offset and page() uses
             # 0-offset, so we must adjust.
-            page.page(self.format(openpy.read_py_file(ofile, skip_encoding_cookie=False)), lineno - 1)
+            with openpy.open(ofile) as f:
+                page.page_lines(self.parser.format_lines(f), lineno - 1)
 
     def _format_fields(self, fields, title_width=0):
         """Formats a list of fields for display.
@@ -613,7 +625,8 @@ def format_mime(self, bundle):
     def _get_info(self, obj, oname='', formatter=None, info=None, detail_level=0):
         """Retrieve an info dict and format it."""
 
-        info = self._info(obj, oname=oname, info=info, detail_level=detail_level)
+        info = self._info(obj, oname=oname, info=info, detail_level=detail_level,
+                          fields=self._mime_fields(obj, info, detail_level))
 
         _mime = {
             'text/plain': [],
@@ -690,6 +703,25 @@ def code_formatter(text):
 
         return self.format_mime(_mime)
 
+    def _mime_fields(self, obj, info, detail_level):
+        """The info fields that _get_info shows for obj."""
+        text = ['source'] if detail_level > 0 else ['docstring']
+        flags = ['isalias', 'ismagic', 'isclass']
+        if info is not None and info.isalias:
+            return flags + ['string_form']
+        elif info is not None and info.ismagic:
+            return flags + text + ['file']
+        elif inspect.isclass(obj) or is_simple_callable(obj):
+            if detail_level <= 0:
+                text.append('init_docstring')
+            return flags + ['definition', 'init_definition', 'file',
+                            'type_name'] + text
+        else:
+            return flags + ['type_name', 'base_class', 'string_form',
+                            'namespace', 'length', 'file', 'definition',
+                            'class_docstring', 'init_docstring', 'call_def',
+                            'call_docstring'] + text
+
     def pinfo(self, obj, oname='', formatter=None, info=None, detail_level=0, enable_html_pager=True):
         """Show detailed information about an object.
 
@@ -717,16 +749,18 @@ def pinfo(self, obj, oname='', formatter=None, info=None, detail_level=0, enable
             del info['text/html']
         page.page(info)
 
-    def info(self, obj, oname='', formatter=None, info=None, detail_level=0):
+    def info(self, obj, oname='', formatter=None, info=None, detail_level=0,
+             fields=None):
         """DEPRECATED. Compute a dict with detailed information about an object.
         """
         if formatter is not None:
             warnings.warn('The `formatter` keyword argument to `Inspector.info`'
                      'is deprecated as of IPython 5.0 and will have no effects.',
                       DeprecationWarning, stacklevel=2)
-        return self._info(obj, oname=oname, info=info, detail_level=detail_level)
+        return self._info(obj, oname=oname, info=info, detail_level=detail_level,
+                          fields=fields)
 
-    def _info(self, obj, oname='', info=None, detail_level=0):
+    def _info(self, obj, oname='', info=None, detail_level=0, fields=None):
         """Compute a dict with detailed information about an object.
 
         Optional arguments:
@@ -737,10 +771,14 @@ def _info(self, obj, oname='', info=None, detail_level=0):
           precomputed already.
 
         - detail_level: if set to 1, more information is given.
-        """
 
-        obj_type = type(obj)
+        - fields: the names of the fields (from `info_fields`) the caller
+          needs.  Only those are computed, the others are None.  By default
+          all fields are computed.
 
+        Fields are computed lazily, and the expensive ones are cached for
+        `info_cache_ttl` seconds for objects that can be weakly referenced.
+        """
         if info is None:
             ismagic = 0
             isalias = 0
@@ -750,43 +788,59 @@ def _info(self, obj, oname='', info=None, detail_level=0):
             isalias = info.isalias
             ospace = info.namespace
 
+        cache = self._info_cache_for(obj)
+        computed = {}
+        def get(field):
+            """Compute a field (or helper value) at most once."""
+            if field in computed:
+                return computed[field]
+            key = (field, oname, detail_level, isalias, ismagic)
+            if cache is not None and key in cache:
+                value = computed[field] = cache[key]
+                return value
+            value = computed[field] = compute[field]()
+            if cache is not None:
+                cache[key] = value
+            return value
+
         # Get docstring, special-casing aliases:
-        if isalias:
-            if not callable(obj):
-                try:
-                    ds = "Alias to the system command:\n  %s" % obj[1]
-                except:
-                    ds = "Alias: " + str(obj)
+        def raw_docstring():
+            if isalias:
+                if not callable(obj):
+                    try:
+                        ds = "Alias to the system command:\n  %s" % obj[1]
+                    except:
+                        ds = "Alias: " + str(obj)
+                else:
+                    ds = "Alias to " + str(obj)
+                    if obj.__doc__:
+                        ds += "\nDocstring:\n" + obj.__doc__
             else:
-                ds = "Alias to " + str(obj)
-                if obj.__doc__:
-                    ds += "\nDocstring:\n" + obj.__doc__
-        else:
-            ds = getdoc(obj)
-            if ds is None:
-                ds = '<no docstring>'
-
-        # store output in a dict, we initialize it here and fill it as we go
-        out = dict(name=oname, found=True, isalias=isalias, ismagic=ismagic)
-
-        string_max = 200 # max size of strings to show (snipped if longer)
-        shalf = int((string_max - 5) / 2)
-
-        if ismagic:
-            obj_type_name = 'Magic function'
-        elif isalias:
-            obj_type_name = 'System alias'
-        else:
-            obj_type_name = obj_type.__name__
-        out['type_name'] = obj_type_name
+                ds = getdoc(obj)
+                if ds is None:
+                    ds = '<no docstring>'
+            return ds
+
+        def type_name():
+            if ismagic:
+                return 'Magic function'
+            elif isalias:
+                return 'System alias'
+            else:
+                return type(obj).__name__
 
-        try:
-            bclass = obj.__class__
-            out['base_class'] = str(bclass)
-        except: pass
+        def base_class():
+            try:
+                return str(obj.__class__)
+            except:
+                return None
 
         # String form, but snip if too long in ? form (full in ??)
-        if detail_level >= self.str_detail_level:
+        def string_form():
+            if detail_level < self.str_detail_level:
+                return None
+            string_max = 200 # max size of strings to show (snipped if longer)
+            shalf = int((string_max - 5) / 2)
             try:
                 ostr = str(obj)
                 str_head = 'string_form'
@@ -794,165 +848,227 @@ def _info(self, obj, oname='', info=None, detail_level=0):
                     ostr = ostr[:shalf] + ' <...> ' + ostr[-shalf:]
                     ostr = ("\n" + " " * len(str_head.expandtabs())).\
                             join(q.strip() for q in ostr.split("\n"))
-                out[str_head] = ostr
+                return ostr
             except:
-                pass
-
-        if ospace:
-            out['namespace'] = ospace
+                return None
 
         # Length (for strings and lists)
-        try:
-            out['length'] = str(len(obj))
-        except: pass
-
-        # Filename where object was defined
-        binary_file = False
-        fname = find_file(obj)
-        if fname is None:
-            # if anything goes wrong, we don't want to show source, so it's as
-            # if the file was binary
-            binary_file = True
-        else:
-            if fname.endswith(('.so', '.dll', '.pyd')):
+        def length():
+            try:
+                return str(len(obj))
+            except:
+                return None
+
+        # Filename where object was defined, and whether it is binary
+        def find_fname():
+            binary_file = False
+            fname = find_file(obj)
+            if fname is None:
+                # if anything goes wrong, we don't want to show source, so it's
+                # as if the file was binary
                 binary_file = True
-            elif fname.endswith('<string>'):
-                fname = 'Dynamically generated function. No source code available.'
-            out['file'] = compress_user(fname)
+            else:
+                if fname.endswith(('.so', '.dll', '.pyd')):
+                    binary_file = True
+                elif fname.endswith('<string>'):
+                    fname = 'Dynamically generated function. No source code available.'
+                fname = compress_user(fname)
+            return fname, binary_file
 
         # Original source code for a callable, class or property.
-        if detail_level:
+        def source():
+            if not detail_level:
+                return None
             # Flush the source cache because inspect can return out-of-date
             # source
             linecache.checkcache()
             try:
-                if isinstance(obj, property) or not binary_file:
+                if isinstance(obj, property) or not get('fname')[1]:
                     src = getsource(obj, oname)
                     if src is not None:
                         src = src.rstrip()
-                    out['source'] = src
-
+                    return src
             except Exception:
                 pass
+            return None
 
         # Add docstring only if no source is to be shown (avoid repetitions).
-        if ds and out.get('source', None) is None:
-            out['docstring'] = ds
+        def docstring():
+            ds = get('ds')
+            if ds and get('source') is None:
+                return ds
+            return None
 
-        # Constructor docstring for classes
-        if inspect.isclass(obj):
-            out['isclass'] = True
+        def definition():
+            if inspect.isclass(obj):
+                return None
+            # reconstruct the function definition and print it:
+            return self._getdef(obj, oname) or None
 
-            # get the init signature:
+        # Constructor signature for classes
+        def init_definition():
+            if not inspect.isclass(obj):
+                return None
             try:
                 init_def = self._getdef(obj, oname)
             except AttributeError:
                 init_def = None
+            if init_def is None:
+                # Get signature from init if top-level sig failed.
+                # Can happen for built-in types (list, etc.).
+                try:
+                    init_def = self._getdef(obj.__init__, oname)
+                except AttributeError:
+                    pass
+            return init_def or None
 
-            # get the __init__ docstring
+        # Constructor docstring, for classes and instances
+        def init_docstring():
             try:
-                obj_init = obj.__init__
+                init_ds = getdoc(obj.__init__)
             except AttributeError:
-                init_ds = None
+                return None
+            # Skip Python's auto-generated docstrings
+            if init_ds == _object_init_docstring:
+                return None
+            return init_ds or None
+
+        # Class docstring for instances: check whether the instance docstring
+        # is identical to the class one, and print it separately if they
+        # don't coincide.  In most cases they will, but it's nice to print all
+        # the info for objects which use instance-customized docstrings.
+        def class_docstring():
+            ds = get('ds')
+            if inspect.isclass(obj) or not ds:
+                return None
+            try:
+                cls = getattr(obj,'__class__')
+            except:
+                class_ds = None
             else:
-                if init_def is None:
-                    # Get signature from init if top-level sig failed.
-                    # Can happen for built-in types (list, etc.).
-                    try:
-                        init_def = self._getdef(obj_init, oname)
-                    except AttributeError:
-                        pass
-                init_ds = getdoc(obj_init)
-                # Skip Python's auto-generated docstrings
-                if init_ds == _object_init_docstring:
-                    init_ds = None
-
-            if init_def:
-                out['init_definition'] = init_def
+                class_ds = getdoc(cls)
+            # Skip Python's auto-generated docstrings
+            if class_ds in _builtin_type_docstrings:
+                class_ds = None
+            if class_ds and ds != class_ds:
+                return class_ds
+            return None
 
-            if init_ds:
-                out['init_docstring'] = init_ds
+        # Call form for callable instances
+        def has_call():
+            return (not inspect.isclass(obj) and safe_hasattr(obj, '__call__')
+                    and not is_simple_callable(obj))
+
+        def call_def():
+            if not get('has_call'):
+                return None
+            call_def = self._getdef(obj.__call__, oname)
+            if call_def and (call_def != get('definition')):
+                # it may never be the case that call def and definition differ,
+                # but don't include the same signature twice
+                return call_def
+            return None
 
-        # and class docstring for instances:
-        else:
-            # reconstruct the function definition and print it:
-            defln = self._getdef(obj, oname)
-            if defln:
-                out['definition'] = defln
-
-            # First, check whether the instance docstring is identical to the
-            # class one, and print it separately if they don't coincide.  In
-            # most cases they will, but it's nice to print all the info for
-            # objects which use instance-customized docstrings.
-            if ds:
-                try:
-                    cls = getattr(obj,'__class__')
-                except:
-                    class_ds = None
-                else:
-                    class_ds = getdoc(cls)
-                # Skip Python's auto-generated docstrings
-                if class_ds in _builtin_type_docstrings:
-                    class_ds = None
-                if class_ds and ds != class_ds:
-                    out['class_docstring'] = class_ds
-
-            # Next, try to show constructor docstrings
-            try:
-                init_ds = getdoc(obj.__init__)
-                # Skip Python's auto-generated docstrings
-                if init_ds == _object_init_docstring:
-                    init_ds = None
-            except AttributeError:
-                init_ds = None
-            if init_ds:
-                out['init_docstring'] = init_ds
-
-            # Call form docstring for callable instances
-            if safe_hasattr(obj, '__call__') and not is_simple_callable(obj):
-                call_def = self._getdef(obj.__call__, oname)
-                if call_def and (call_def != out.get('definition')):
-                    # it may never be the case that call def and definition differ,
-                    # but don't include the same signature twice
-                    out['call_def'] = call_def
-                call_ds = getdoc(obj.__call__)
-                # Skip Python's auto-generated docstrings
-                if call_ds == _func_call_docstring:
-                    call_ds = None
-                if call_ds:
-                    out['call_docstring'] = call_ds
+        def call_docstring():
+            if not get('has_call'):
+                return None
+            call_ds = getdoc(obj.__call__)
+            # Skip Python's auto-generated docstrings
+            if call_ds == _func_call_docstring:
+                call_ds = None
+            return call_ds or None
 
         # Compute the object's argspec as a callable.  The key is to decide
         # whether to pull it from the object itself, from its __init__ or
         # from its __call__ method.
+        def argspec():
+            if inspect.isclass(obj):
+                # Old-style classes need not have an __init__
+                callable_obj = getattr(obj, "__init__", None)
+            elif callable(obj):
+                callable_obj = obj
+            else:
+                callable_obj = None
 
-        if inspect.isclass(obj):
-            # Old-style classes need not have an __init__
-            callable_obj = getattr(obj, "__init__", None)
-        elif callable(obj):
-            callable_obj = obj
-        else:
-            callable_obj = None
-
-        if callable_obj is not None:
+            if callable_obj is None:
+                return None
             try:
                 argspec = getargspec(callable_obj)
             except (TypeError, AttributeError):
                 # For extensions/builtins we can't retrieve the argspec
-                pass
-            else:
-                # named tuples' _asdict() method returns an OrderedDict, but we
-                # we want a normal
-                out['argspec'] = argspec_dict = dict(argspec._asdict())
-                # We called this varkw before argspec became a named tuple.
-                # With getfullargspec it's also called varkw.
-                if 'varkw' not in argspec_dict:
-                    argspec_dict['varkw'] = argspec_dict.pop('keywords')
+                return None
+            # named tuples' _asdict() method returns an OrderedDict, but we
+            # we want a normal
+            argspec_dict = dict(argspec._asdict())
+            # We called this varkw before argspec became a named tuple.
+            # With getfullargspec it's also called varkw.
+            if 'varkw' not in argspec_dict:
+                argspec_dict['varkw'] = argspec_dict.pop('keywords')
+            return argspec_dict
+
+        compute = {
+            'ds': raw_docstring,
+            'fname': find_fname,
+            'has_call': has_call,
+            'type_name': type_name,
+            'base_class': base_class,
+            'string_form': string_form,
+            'namespace': lambda: ospace or None,
+            'length': length,
+            'file': lambda: get('fname')[0],
+            'definition': definition,
+            'docstring': docstring,
+            'source': source,
+            'init_definition': init_definition,
+            'class_docstring': class_docstring,
+            'init_docstring': init_docstring,
+            'call_def': call_def,
+            'call_docstring': call_docstring,
+            'isclass': lambda: True if inspect.isclass(obj) else None,
+            'argspec': argspec,
+        }
 
+        # store output in a dict
+        out = dict(name=oname, found=True, isalias=isalias, ismagic=ismagic)
+        try:
+            for field in info_fields if fields is None else fields:
+                if field in compute:
+                    out[field] = get(field)
+        finally:
+            # The helpers refer to each other through `compute`, break the
+            # cycle so that obj isn't kept alive until the next collection.
+            compute.clear()
         return object_info(**out)
 
+    def _info_cache_for(self, obj):
+        """The dict caching info fields for obj, or None if it can't have one.
+
+        The cache is keyed by id(obj) and holds a weak reference to obj, so
+        that entries go away with the object.  Entries are dropped
+        `info_cache_ttl` seconds after they were created.
+        """
+        if not self.info_cache_ttl:
+            return None
+        now = time.time()
+        cache = self._info_cache
+        for key, (ref, expires, fields) in list(cache.items()):
+            if expires <= now:
+                del cache[key]
+
+        key = id(obj)
+        entry = cache.get(key)
+        if entry is not None and entry[0]() is obj:
+            return entry[2]
+        try:
+            ref = weakref.ref(obj, lambda ref: cache.pop(key, None))
+        except TypeError:
+            return None
+        fields = {}
+        cache[key] = (ref, now + self.info_cache_ttl, fields)
+        return fields
+
     def psearch(self,pattern,ns_table,ns_search=[],
-                ignore_case=False,show_all=False):
+                ignore_case=False,show_all=False,modules=False):
         """Search namespaces with wildcards for objects.
 
         Arguments:
@@ -971,6 +1087,11 @@ def psearch(self,pattern,ns_table,ns_search=[],
 
           - show_all(False): show all names, including those starting with
             underscores.
+
+          - modules(False): search the names defined at the top level of all
+            imported modules, by their qualified name (e.g. ``os.path.join``),
+            instead of the namespaces.  This uses an index which is updated
+            as modules are imported.
         """
         #print 'ps pattern:<%r>' % pattern # dbg
 
@@ -998,6 +1119,11 @@ def psearch(self,pattern,ns_table,ns_search=[],
 
         #print 'type_pattern:',type_pattern # dbg
         search_result, namespaces_seen = set(), set()
+        if modules:
+            search_result.update(module_index.search(
+                filter, type_pattern, ignore_case=ignore_case,
+                show_all=show_all))
+            ns_search = []
         for ns_name in ns_search:
             ns = ns_table[ns_name]
             # Normally, locals and globals are the same, so we just check one.
@@ -15,6 +15,7 @@
 
 from __future__ import print_function
 
+import itertools
 import os
 import re
 import sys
@@ -60,21 +61,36 @@ def page_dumb(strng, start=0, screen_lines=25):
     """
     if isinstance(strng, dict):
         strng = strng.get('text/plain', '')
-    out_ln  = strng.splitlines()[start:]
-    screens = chop(out_ln,screen_lines-1)
-    if len(screens) == 1:
-        print(os.linesep.join(screens[0]))
-    else:
-        last_escape = ""
-        for scr in screens[0:-1]:
-            hunk = os.linesep.join(scr)
-            print(last_escape + hunk)
-            if not page_more():
-                return
-            esc_list = esc_re.findall(hunk)
-            if len(esc_list) > 0:
-                last_escape = esc_list[-1]
-        print(last_escape + os.linesep.join(screens[-1]))
+    page_dumb_lines(strng.splitlines(), start, screen_lines)
+
+def page_dumb_lines(lines, start=0, screen_lines=25):
+    """Like page_dumb(), for text given as an iterable of lines.
+
+    Only the screen being shown and the next one are read from `lines`.
+    """
+    lines = itertools.islice(_split_lines(lines), start, None)
+    size = max(screen_lines - 1, 1)
+    screen = list(itertools.islice(lines, size))
+    last_escape = ""
+    while True:
+        following = list(itertools.islice(lines, size))
+        hunk = os.linesep.join(screen)
+        print(last_escape + hunk)
+        if not following or not page_more():
+            return
+        esc_list = esc_re.findall(hunk)
+        if len(esc_list) > 0:
+            last_escape = esc_list[-1]
+        screen = following
+
+def _split_lines(lines):
+    """Yield the lines of u'\\n'.join(lines), without joining them."""
+    for item in lines:
+        item_lines = item.splitlines()
+        if not item_lines or item.endswith(('\n', '\r')):
+            item_lines.append(u'')
+        for line in item_lines:
+            yield line
 
 def _detect_screen_size(screen_lines_def):
     """Attempt to work out the number of lines on the screen.
@@ -248,6 +264,107 @@ def pager_page(strng, start=0, screen_lines=0, pager_cmd=None):
             page_dumb(strng,screen_lines=screen_lines)
 
 
+def pager_page_lines(lines, start=0, screen_lines=0, pager_cmd=None):
+    """Like pager_page(), for text given as an iterable of lines.
+
+    Items may hold several lines each. Only the first screenful is read
+    before deciding whether to page; after that, lines are written to the
+    pager as they are produced. The pager stops reading while it waits for
+    the user, which in turn pauses the producer.
+    """
+    source = iter(lines)
+    lines = _split_lines(source)
+    try:
+        TERM = os.environ.get('TERM','dumb')
+        if TERM in ['dumb','emacs'] and os.name != 'nt':
+            for line in itertools.islice(lines, start, None):
+                print(line)
+            return
+
+        skipped = list(itertools.islice(lines, start))
+        screen_lines_def = get_terminal_size()[1]
+        if screen_lines <= 0:
+            try:
+                screen_lines += _detect_screen_size(screen_lines_def)
+            except (TypeError, UnsupportedOperation):
+                for line in lines:
+                    print(line)
+                return
+
+        # Read until the text is known not to fit on the screen, using the
+        # same heuristics as pager_page()
+        head = []
+        len_str = 0
+        for line in lines:
+            head.append(line)
+            len_str += len(line) + len(os.linesep)
+            if max(len(head), int(len_str/80)+1) > screen_lines:
+                break
+        else:
+            print(os.linesep.join(head))
+            return
+
+        pager_cmd = get_pager_cmd(pager_cmd)
+        start_string = get_pager_start(pager_cmd, start)
+        pager_cmd += ' ' + start_string
+        if start_string:
+            head = skipped + head
+        lines = itertools.chain(head, lines)
+        # Keep what the pager was sent, up to a limit, in case it fails
+        written, written_len = [], 0
+        if os.name == 'nt':
+            if pager_cmd.startswith('type'):
+                # The default WinXP 'type' command is failing on complex strings.
+                retval = 1
+            else:
+                fd, tmpname = tempfile.mkstemp('.txt')
+                try:
+                    os.close(fd)
+                    with open(tmpname, 'wt') as tmpfile:
+                        for line in lines:
+                            tmpfile.write(line + '\n')
+                        cmd = "%s < %s" % (pager_cmd, tmpname)
+                    # tmpfile needs to be closed for windows
+                    if os.system(cmd):
+                        with open(tmpname) as tmpfile:
+                            page_dumb_lines((l.rstrip('\n') for l in tmpfile),
+                                            screen_lines=screen_lines)
+                    retval = None
+                finally:
+                    os.remove(tmpname)
+        else:
+            try:
+                retval = None
+                pager = os.popen(pager_cmd, 'w')
+                try:
+                    pager_encoding = pager.encoding or sys.stdout.encoding
+                    for line in lines:
+                        if written is not None:
+                            written.append(line)
+                            written_len += len(line)
+                            if written_len > 2**20:
+                                written = None
+                        pager.write(py3compat.cast_bytes_py2(
+                            line + u'\n', encoding=pager_encoding))
+                finally:
+                    retval = pager.close()
+            except IOError as msg:  # broken pipe when user quits
+                if msg.args == (32, 'Broken pipe'):
+                    retval = None
+                else:
+                    retval = 1
+            except OSError:
+                # Other strange problems, sometimes seen in Win2k/cygwin
+                retval = 1
+        if retval is not None:
+            if written:
+                lines = itertools.chain(written, lines)
+            page_dumb_lines(lines, screen_lines=screen_lines)
+    finally:
+        if hasattr(source, 'close'):
+            source.close()
+
+
 def page(data, start=0, screen_lines=0, pager_cmd=None):
     """Display content in a pager, piping through a pager after a certain length.
     
@@ -274,6 +391,31 @@ def page(data, start=0, screen_lines=0, pager_cmd=None):
     return pager_page(data, start, screen_lines, pager_cmd)
 
 
+def _has_pager_hook(ip):
+    """Whether a show_in_pager hook other than the default is registered."""
+    from IPython.core.hooks import show_in_pager
+    hook = ip.hooks.show_in_pager
+    for prio, func in getattr(hook, 'chain', [(0, hook)]):
+        if getattr(func, '__func__', func) is not show_in_pager:
+            return True
+    return False
+
+
+def page_lines(lines, start=0, screen_lines=0, pager_cmd=None):
+    """Like page(), for text given as an iterable of lines.
+
+    Each item may hold several lines. In a terminal, the text is shown as
+    soon as the first screenful has been produced (see `pager_page_lines`),
+    so large outputs don't need to be built up front. `show_in_pager` hooks
+    take a string, so if one is registered the text is joined for it.
+    """
+    start = max(0, start)
+    ip = get_ipython()
+    if ip and _has_pager_hook(ip):
+        return page(u'\n'.join(lines), start, screen_lines, pager_cmd)
+    return pager_page_lines(lines, start, screen_lines, pager_cmd)
+
+
 def page_file(fname, start=0, pager_cmd=None):
     """Page a file, using an optional pager command and starting line.
     """
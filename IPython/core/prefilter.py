@@ -9,7 +9,7 @@
 # Copyright (c) IPython Development Team.
 # Distributed under the terms of the Modified BSD License.
 
-from keyword import iskeyword
+from keyword import iskeyword, kwlist
 import re
 
 from IPython.core.autocall import IPyAutocall
@@ -24,7 +24,7 @@
 from IPython.core.splitinput import LineInfo
 
 from traitlets import (
-    List, Integer, Unicode, Bool, Instance, CRegExp
+    List, Integer, Unicode, Bool, Instance, CRegExp, observe
 )
 
 #-----------------------------------------------------------------------------
@@ -57,6 +57,13 @@ class PrefilterError(Exception):
 # nasty enough that I shouldn't change it until I can test it _well_.
 #self.re_fun_name = re.compile (r'[a-zA-Z_]([a-zA-Z0-9_.\[\]]*) ?$')
 
+# Lines no default checker applies to: those starting with a Python keyword,
+# which can't name a variable, or with a character that can't start a name
+# or an escape. 'print' and 'exec' are functions in Python 3, and can be in
+# Python 2, so they can be autocalled.
+re_plain_line = re.compile(r'\s*(?:(?:%s)\b|[\d\'"(\[{#@~+\-])' % '|'.join(
+    kw for kw in kwlist if kw not in ('print', 'exec')))
+
 
 # Handler Check Utilities
 def is_shadowed(identifier, ip):
@@ -120,6 +127,9 @@ class PrefilterManager(Configurable):
     def __init__(self, shell=None, **kwargs):
         super(PrefilterManager, self).__init__(shell=shell, **kwargs)
         self.shell = shell
+        # Names _ofind didn't find, valid while _missing_stamp is current
+        self._missing = set()
+        self._missing_stamp = None
         self.init_transformers()
         self.init_handlers()
         self.init_checkers()
@@ -167,6 +177,8 @@ def unregister_transformer(self, transformer):
     def init_checkers(self):
         """Create the default checkers."""
         self._checkers = []
+        self._enabled_checkers = []
+        self._plain_checkers_only = True
         for checker in _default_checkers:
             checker(
                 shell=self.shell, prefilter_manager=self, parent=self
@@ -179,6 +191,14 @@ def sort_checkers(self):
         The :meth:`register_checker` method calls this automatically.
         """
         self._checkers.sort(key=lambda x: x.priority)
+        self._update_enabled_checkers()
+
+    def _update_enabled_checkers(self):
+        """Cache the enabled checkers, called when they change."""
+        self._enabled_checkers = [c for c in self._checkers if c.enabled]
+        # Whether re_plain_line lines are sure to get the normal handler
+        self._plain_checkers_only = all(type(c) in _plain_checkers
+                                        for c in self._enabled_checkers)
 
     @property
     def checkers(self):
@@ -195,6 +215,7 @@ def unregister_checker(self, checker):
         """Unregister a checker instance."""
         if checker in self._checkers:
             self._checkers.remove(checker)
+            self._update_enabled_checkers()
 
     #-------------------------------------------------------------------------
     # API for managing handlers
@@ -254,11 +275,10 @@ def prefilter_line_info(self, line_info):
 
     def find_handler(self, line_info):
         """Find a handler for the line_info by trying checkers."""
-        for checker in self.checkers:
-            if checker.enabled:
-                handler = checker.check(line_info)
-                if handler:
-                    return handler
+        for checker in self._enabled_checkers:
+            handler = checker.check(line_info)
+            if handler:
+                return handler
         return self.get_handler_by_name('normal')
 
     def transform_line(self, line, continue_prompt):
@@ -293,6 +313,13 @@ def prefilter_line(self, line, continue_prompt=False):
         if not continue_prompt or (continue_prompt and self.multi_line_specials):
             line = self.transform_line(line, continue_prompt)
 
+        # Fast path for ordinary Python statements: the normal handler
+        # returns a first line unchanged.
+        if (not continue_prompt and self._plain_checkers_only and
+                re_plain_line.match(line) and
+                type(self._handlers.get('normal')) is PrefilterHandler):
+            return line
+
         # Now we compute line_info for the checkers and handlers
         line_info = LineInfo(line, continue_prompt)
 
@@ -336,6 +363,39 @@ def prefilter_lines(self, lines, continue_prompt=False):
 
         return out
 
+    #-------------------------------------------------------------------------
+    # Object lookups
+    #-------------------------------------------------------------------------
+
+    def ofind(self, line_info):
+        """Find the object for line_info, like :meth:`LineInfo.ofind`.
+
+        Names that aren't found in any namespace are remembered and not looked
+        up again until the namespaces or magics change: after each execution,
+        or when one of them grows or shrinks.
+        """
+        shell = self.shell
+        magics = shell.magics_manager.magics
+        stamp = (len(shell.user_ns), len(shell.user_global_ns),
+                 len(shell.ns_table['builtin']),
+                 len(magics['line']), len(magics['cell']))
+        if stamp != self._missing_stamp:
+            self._missing.clear()
+            self._missing_stamp = stamp
+        elif line_info.ifun in self._missing:
+            return {'found': False}
+
+        oinfo = line_info.ofind(shell)
+        # A parent means the head of a dotted name was found, and then the
+        # result depends on more than the namespaces.
+        if not oinfo['found'] and oinfo.get('parent') is None:
+            self._missing.add(line_info.ifun)
+        return oinfo
+
+    def clear_ofind_cache(self):
+        """Forget the names that weren't found."""
+        self._missing.clear()
+
 #-----------------------------------------------------------------------------
 # Prefilter transformers
 #-----------------------------------------------------------------------------
@@ -385,6 +445,11 @@ def __init__(self, shell=None, prefilter_manager=None, **kwargs):
         )
         self.prefilter_manager.register_checker(self)
 
+    @observe('enabled')
+    def _enabled_changed(self, change):
+        if self.prefilter_manager is not None:
+            self.prefilter_manager.sort_checkers()
+
     def check(self, line_info):
         """Inspect line_info and return a handler instance or None."""
         return None
@@ -506,7 +571,8 @@ def check(self, line_info):
         if not self.shell.autocall:
             return None
 
-        oinfo = line_info.ofind(self.shell) # This can mutate state via getattr
+        # This can mutate state via getattr
+        oinfo = self.prefilter_manager.ofind(line_info)
         if not oinfo['found']:
             return None
 
@@ -691,6 +757,16 @@ def handle(self, line_info):
     AutocallChecker
 ]
 
+# Checkers that can't apply to lines matching re_plain_line
+_plain_checkers = (
+    MacroChecker,
+    IPyAutocallChecker,
+    AssignmentChecker,
+    AutoMagicChecker,
+    PythonOpsChecker,
+    AutocallChecker
+)
+
 _default_handlers = [
     PrefilterHandler,
     MacroHandler,
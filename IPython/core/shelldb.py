@@ -0,0 +1,188 @@
+# encoding: utf-8
+"""The persistent key-value store behind ``InteractiveShell.db``.
+
+:class:`ShellDB` keeps the on-disk format of :class:`pickleshare.PickleShareDB`
+(one pickle file per key, under the profile's ``db`` directory) and adds two
+things:
+
+- Values are pickled when they are set, so later changes to the object are
+  not saved and errors reach the caller, but the pickle is kept in memory and
+  written out by :meth:`ShellDB.flush`, which the shell calls after each cell
+  and at exit. A key changed several times during a cell, e.g. ``dhist`` by
+  repeated ``%cd``, is written once.
+- Reads are served from memory while the file's modification time and size
+  are unchanged, so repeated lookups cost one ``stat`` and no unpickling.
+
+Files are written to a temporary name and renamed into place, so another
+shell reading the same profile never sees a partially written pickle. When
+two shells write the same key, the last flush wins.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import errno
+import os
+import sys
+import tempfile
+from warnings import warn
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+from pickleshare import PickleShareDB
+
+from IPython.utils.path import ensure_dir_exists
+
+_deleted = object()
+
+
+def _dumps(value):
+    # Protocol 2, as PickleShareDB uses, so Python 2 can read it.
+    return pickle.dumps(value, protocol=2)
+
+
+def _replace(src, dst):
+    """Atomically move `src` over `dst`, where the platform allows it."""
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    elif sys.platform == 'win32':
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        os.rename(src, dst)
+    else:
+        os.rename(src, dst)
+
+
+class ShellDB(MutableMapping):
+    """A PickleShareDB with write-behind caching and validated reads.
+
+    Operations other than getting, setting, deleting and testing for a single
+    key (``keys()``, iteration, ``hset`` and the other PickleShareDB methods)
+    flush pending writes first and are then handled by a PickleShareDB on the
+    same directory.
+    """
+
+    def __init__(self, root):
+        self._db = PickleShareDB(root)
+        self.root = str(self._db.root)
+        # key -> pickled value to write, or _deleted
+        self._pending = {}
+        # key -> (value, (st_mtime, st_size)) as last read, or
+        # (pickled value, None, (st_mtime, st_size)) as last written
+        self._cache = {}
+
+    def _path(self, key):
+        return os.path.join(self.root, str(key))
+
+    @staticmethod
+    def _stamp(path):
+        st = os.stat(path)
+        return st.st_mtime, st.st_size
+
+    def __getitem__(self, key):
+        if key in self._pending:
+            data = self._pending[key]
+            if data is _deleted:
+                raise KeyError(key)
+            return pickle.loads(data)
+
+        path = self._path(key)
+        try:
+            stamp = self._stamp(path)
+        except OSError:
+            self._cache.pop(key, None)
+            raise KeyError(key)
+        cached = self._cache.get(key)
+        if cached is not None and cached[-1] == stamp:
+            if len(cached) == 2:
+                return cached[0]
+            # Written by this shell: unpickle a copy rather than reading
+            # the file back, and keep that for later reads.
+            value = pickle.loads(cached[0])
+        else:
+            try:
+                with open(path, 'rb') as f:
+                    value = pickle.load(f)
+            except Exception:
+                raise KeyError(key)
+        self._cache[key] = (value, stamp)
+        return value
+
+    def __setitem__(self, key, value):
+        self._pending[key] = _dumps(value)
+
+    def __delitem__(self, key):
+        # Like PickleShareDB, deleting a missing key is not an error.
+        self._pending[key] = _deleted
+
+    def __contains__(self, key):
+        if key in self._pending:
+            return self._pending[key] is not _deleted
+        return os.path.isfile(self._path(key))
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self, globpat=None):
+        """List the keys, optionally those matching a glob pattern."""
+        self.flush()
+        return self._db.keys(globpat)
+
+    def __getattr__(self, name):
+        # The rest of the PickleShareDB API (hset, hget, uncache, ...)
+        if name.startswith('_'):
+            raise AttributeError(name)
+        self.flush()
+        return getattr(self._db, name)
+
+    def flush(self):
+        """Write out pending changes."""
+        pending, self._pending = self._pending, {}
+        for key, data in pending.items():
+            try:
+                if data is _deleted:
+                    self._remove(key)
+                else:
+                    self._write(key, data)
+            except Exception as e:
+                warn("Could not save %r to the IPython database: %s"
+                     % (key, e))
+
+    def _remove(self, key):
+        self._cache.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError as e:
+            # Lost a race with another shell, or the key never existed
+            if e.errno not in (errno.ENOENT, errno.EACCES, errno.EPERM):
+                raise
+
+    def _write(self, key, data):
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        ensure_dir_exists(directory)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            _replace(tmp, path)
+        except:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        self._cache[key] = (data, None, self._stamp(path))
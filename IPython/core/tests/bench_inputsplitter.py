@@ -0,0 +1,119 @@
+"""Benchmarks for pushing large blocks through IPython.core.inputsplitter.
+
+Not collected by the test suite, run with::
+
+    python -m IPython.core.tests.bench_inputsplitter
+
+The 'full' column is a splitter that compiles the whole buffer on every
+push, as IPythonInputSplitter did before completeness was checked
+incrementally. The 'tokenize' column transforms cells by tokenizing every
+line and running every logical line transformer on it, as IPythonInputSplitter
+did before lines without special characters took a fast path.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import print_function
+
+import timeit
+
+from IPython.core.inputsplitter import IPythonInputSplitter
+from IPython.core.inputtransformer import (assemble_python_lines, help_end,
+                                           escaped_commands, assign_from_magic,
+                                           assign_from_system)
+
+
+class FullRecompileSplitter(IPythonInputSplitter):
+    """Compiles everything pushed so far after each line."""
+    def _push_line(self, line, check=True):
+        return super(FullRecompileSplitter, self)._push_line(line)
+
+    def _check(self):
+        self._unchecked = False
+        self._checkpoints[:] = []
+        self._code, self._is_complete = None, None
+        self._is_invalid = False
+        if self._buffer[-1].endswith('\\\n'):
+            return False
+        return self._compile_pending()
+
+
+class TokenizingAssembler(assemble_python_lines):
+    """Finds the end of every Python line by tokenizing."""
+    def push(self, line):
+        self.tokenize = True
+        return super(TokenizingAssembler, self).push(line)
+
+
+def tokenizing_splitter():
+    isp = IPythonInputSplitter(line_input_checker=False,
+        logical_line_transforms=[t(trigger=None) for t in
+            (help_end, escaped_commands, assign_from_magic, assign_from_system)])
+    isp.assemble_python_lines = TokenizingAssembler()
+    return isp
+
+
+def make_source(n):
+    """About n lines of top-level statements, functions and bracketed data."""
+    chunk = [
+        "x = 1",
+        "def f(a, b):",
+        "    '''Docstring",
+        "    on two lines'''",
+        "    return (a +",
+        "            b)",
+        "",
+        "data = [1, 2,",
+        "        3, 4]",
+        "if x:",
+        "    y = f(x, 2)",
+        "else:",
+        "    y = 0",
+    ]
+    return '\n'.join(chunk * (n // len(chunk) + 1))
+
+
+def bench(cls, source, by_line, number=3):
+    """Best time, in seconds, to push `source` as one block or line by line."""
+    isp = cls()
+    lines = source.splitlines()
+    def run():
+        isp.reset()
+        if by_line:
+            for line in lines:
+                isp.push(line)
+        else:
+            isp.push(source)
+        isp.push_accepts_more()
+    return min(timeit.repeat(run, number=1, repeat=number))
+
+
+def bench_transform(isp, source, number=3):
+    """Best time, in seconds, to transform `source` as a cell."""
+    return min(timeit.repeat(lambda: isp.transform_cell(source),
+                             number=1, repeat=number))
+
+
+def main():
+    print('%6s %-8s %12s %12s' % ('lines', 'push', 'full', 'incremental'))
+    for n in (100, 1000, 5000):
+        source = make_source(n)
+        for by_line in (False, True):
+            print('%6d %-8s %11.4fs %11.4fs' % (
+                n, 'by line' if by_line else 'block',
+                bench(FullRecompileSplitter, source, by_line),
+                bench(IPythonInputSplitter, source, by_line)))
+
+    print()
+    print('%6s %-8s %12s %12s' % ('lines', 'cell', 'tokenize', 'scan'))
+    for n in (1000, 5000):
+        source = make_source(n) + '\n%time x = !ls\n'
+        print('%6d %-8s %11.4fs %11.4fs' % (n, 'transform',
+            bench_transform(tokenizing_splitter(), source),
+            bench_transform(IPythonInputSplitter(line_input_checker=False),
+                            source)))
+
+
+if __name__ == '__main__':
+    main()
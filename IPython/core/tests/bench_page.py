@@ -0,0 +1,65 @@
+"""Time to the first screen, and peak memory, when paging a large source.
+
+Not collected by the test suite, run with::
+
+    python -m IPython.core.tests.bench_page
+
+A large Python source is colorized and sent to a pager that exits after
+reading one screenful, as a user quitting `less` on the first page would.
+'string' colorizes the whole source and pages it with pager_page(), as
+%pycat used to; 'lines' pages the colorized blocks with pager_page_lines().
+Posix, Python 3 only.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import print_function
+
+import argparse
+import inspect
+import os
+import time
+import tracemalloc
+
+from IPython.core import page
+from IPython.utils.PyColorize import Parser
+
+SCREEN = 50
+PAGER = 'head -n %d > /dev/null' % SCREEN
+
+
+def page_string(src):
+    page.pager_page(Parser().format(src, 'str', 'Linux'),
+                    screen_lines=SCREEN, pager_cmd=PAGER)
+
+
+def page_lines(src):
+    page.pager_page_lines(Parser().format_lines(src.splitlines(), 'Linux'),
+                          screen_lines=SCREEN, pager_cmd=PAGER)
+
+
+def bench(func, src):
+    """Seconds and peak MB of traced memory to page `src` with `func`."""
+    tracemalloc.start()
+    t = time.time()
+    func(src)
+    t = time.time() - t
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return t, peak / 2.**20
+
+
+def main():
+    os.environ['TERM'] = 'xterm'
+    module = inspect.getsource(argparse)
+    print('%8s %18s %18s' % ('lines', 'string', 'lines'))
+    for copies in (1, 10, 50):
+        src = module * copies
+        results = [bench(f, src) for f in (page_string, page_lines)]
+        print('%8d' % src.count('\n'), *('%8.3fs %6.1fMB' % r
+                                          for r in results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Latency and peak memory of %%script output.
+
+Not collected by the test suite, run with::
+
+    python -m IPython.core.tests.bench_script
+
+'communicate' runs the script as %%script used to, reading all of its
+output before showing any; 'streaming' is the current %%script. The first
+table shows when the first line of a script that prints, then works for a
+second, reaches the output. The second shows the peak memory traced while
+a script writes 100MB, shown or captured with --out. Posix, Python 3 only.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import print_function
+
+import sys
+import time
+import tracemalloc
+from subprocess import Popen, PIPE
+
+from IPython.testing.globalipapp import start_ipython
+from IPython.utils import py3compat
+
+SLOW = "echo first\nsleep 1\necho last"
+LARGE = "yes 'a line of log output' | head -c 100000000"
+
+
+class Sink(object):
+    """A stream that only notes when it was first written to."""
+    def __init__(self):
+        self.first = None
+
+    def write(self, text):
+        if self.first is None:
+            self.first = time.time()
+
+    def flush(self):
+        pass
+
+
+def communicate(ip, line, cell):
+    """%%script before output was streamed, without the --bg options."""
+    args = line.split()
+    p = Popen(args[-1:], stdout=PIPE, stderr=PIPE, stdin=PIPE)
+    out, err = p.communicate(cell.encode('utf8') + b'\n')
+    out, err = py3compat.bytes_to_str(out), py3compat.bytes_to_str(err)
+    if '--out' in args:
+        ip.user_ns['output'] = out
+    else:
+        sys.stdout.write(out)
+    sys.stderr.write(err)
+
+
+def streaming(ip, line, cell):
+    ip.run_cell_magic('script', line, cell)
+
+
+def run(func, ip, line, cell):
+    """Seconds to the first output, and peak MB traced."""
+    sink = Sink()
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = sink
+    tracemalloc.start()
+    t = time.time()
+    try:
+        func(ip, line, cell)
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    ip.user_ns.pop('output', None)
+    return (sink.first or time.time()) - t, peak / 2.**20
+
+
+def main():
+    ip = start_ipython()
+    funcs = (communicate, streaming)
+    print('%-22s %12s %12s' % ('first output', 'communicate', 'streaming'))
+    print('%-22s' % 'sh, sleeps 1s', *('%11.3fs' % run(f, ip, 'sh', SLOW)[0]
+                                       for f in funcs))
+    print()
+    print('%-22s %12s %12s' % ('peak memory', 'communicate', 'streaming'))
+    for label, line in (('100MB shown', 'sh'),
+                        ('100MB, --out', '--out output sh')):
+        print('%-22s' % label, *('%10.1fMB' % run(f, ip, line, LARGE)[1]
+                                 for f in funcs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Benchmarks for verbose traceback formatting in IPython.core.ultratb.
+
+Not collected by the test suite, run with::
+
+    python -m IPython.core.tests.bench_ultratb
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import print_function
+
+import json
+import sys
+import timeit
+
+from IPython.core import ultratb
+from IPython.core.events import EventManager, available_events
+
+
+def _recurse(n):
+    if n == 0:
+        return {}['missing']
+    return _recurse(n - 1)
+
+
+def _exc_info(depth):
+    try:
+        _recurse(depth)
+    except KeyError:
+        return sys.exc_info()
+
+
+def bench(mode, depth, cold, max_frames=0, number=5):
+    """Best time of `number` renders of a depth-frame traceback, in seconds."""
+    tb = ultratb.FormattedTB(mode=mode, color_scheme='Linux',
+                             max_frames=max_frames)
+    etype, evalue, etb = _exc_info(depth)
+    def run():
+        if cold:
+            ultratb.source_cache.clear()
+        tb.structured_traceback(etype, evalue, etb)
+    return min(timeit.repeat(run, number=1, repeat=number))
+
+
+def bench_record(depth, number=5):
+    """Best times of formatting, recording and JSON-encoding a traceback."""
+    tb = ultratb.FormattedTB(mode='Context', color_scheme='Linux')
+    etype, evalue, etb = _exc_info(depth)
+    def text():
+        tb.structured_traceback(etype, evalue, etb)
+    def record():
+        json.dumps(tb.exception_record(etype, evalue, etb))
+    return [min(timeit.repeat(f, number=1, repeat=number))
+            for f in (text, record)]
+
+
+def bench_disabled(number=100000):
+    """Time per call of the check done by the shell when nothing records."""
+    events = EventManager(None, available_events)
+    def check():
+        if events.callbacks['exception_recorded']:
+            pass
+    return min(timeit.repeat(check, number=number, repeat=3)) / number
+
+
+def main():
+    print('%-9s %6s %6s %12s %12s' % ('mode', 'frames', 'budget',
+                                      'cold', 'warm'))
+    for mode in ('Context', 'Verbose'):
+        for depth, max_frames in ((20, 0), (200, 0), (800, 0), (800, 20)):
+            print('%-9s %6d %6d %11.4fs %11.4fs' % (
+                mode, depth, max_frames,
+                bench(mode, depth, True, max_frames),
+                bench(mode, depth, False, max_frames)))
+
+    print()
+    print('%6s %12s %12s' % ('frames', 'text', 'record+json'))
+    for depth in (20, 200):
+        print('%6d %11.4fs %11.4fs' % ((depth,) + tuple(bench_record(depth))))
+    print()
+    print('exception_recorded check with no callbacks: %.3fus'
+          % (bench_disabled() * 1e6))
+
+
+if __name__ == '__main__':
+    main()
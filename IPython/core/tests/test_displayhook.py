@@ -1,4 +1,11 @@
+import os
+import warnings
+
+import nose.tools as nt
+
+from IPython.core.displayhook import approximate_sizeof
 from IPython.testing.tools import AssertPrints, AssertNotPrints
+from IPython.utils.tempdir import TemporaryDirectory
 
 ip = get_ipython()
 
@@ -26,3 +33,113 @@ def test_output_quiet():
 
     with AssertNotPrints('2'):
         ip.run_cell('1+1;\n#commented_out_function()', store_history=True)
+
+
+def test_approximate_sizeof():
+    nt.assert_greater(approximate_sizeof(['x' * 1000] * 10), 10000)
+    nt.assert_greater(approximate_sizeof({1: 'x' * 1000}), 1000)
+
+    class Array(object):
+        nbytes = 10 ** 9
+    nt.assert_equal(approximate_sizeof(Array()), 10 ** 9)
+
+
+def test_cache_max_bytes():
+    dh = ip.displayhook
+    try:
+        dh.cache_max_bytes = 3 * 10 ** 6
+        for i in range(5):
+            ip.run_cell("'%d' * 10 ** 6" % i, store_history=True)
+        oh = ip.user_ns['_oh']
+        last = ip.execution_count - 1
+        # only the last two fit in the budget
+        nt.assert_in(last, oh)
+        nt.assert_in(last - 1, oh)
+        nt.assert_not_in(last - 2, oh)
+        nt.assert_not_in('_%d' % (last - 2), ip.user_ns)
+        with nt.assert_raises(KeyError):
+            oh[last - 2]
+    finally:
+        dh.cache_max_bytes = 0
+
+
+def test_cache_spill():
+    dh = ip.displayhook
+    with TemporaryDirectory() as td:
+        dh.cache_max_bytes = 3 * 10 ** 6
+        dh.cache_spill = True
+        dh.cache_spill_dir = td
+        try:
+            for i in range(3):
+                ip.run_cell("'%d' * 10 ** 6" % i, store_history=True)
+            last = ip.execution_count - 1
+            oh = ip.user_ns['Out']
+            nt.assert_not_in(last - 2, dict.keys(oh))
+            # spilled entries are loaded back on access, and still part of
+            # the mapping
+            nt.assert_equal(oh[last - 2], '0' * 10 ** 6)
+            nt.assert_equal(oh.get(last - 2), '0' * 10 ** 6)
+            nt.assert_in(last - 2, oh)
+            nt.assert_in(last - 2, oh.keys())
+            nt.assert_in((last - 2, '0' * 10 ** 6), oh.items())
+            nt.assert_equal(len(oh), len(oh.keys()))
+            nt.assert_equal(len(os.listdir(td)), 1)
+            session = os.path.join(td, os.listdir(td)[0])
+            del oh[last - 2]
+            nt.assert_not_in(last - 2, oh)
+            nt.assert_is_none(oh.get(last - 2))
+            nt.assert_not_in('%d.pickle' % (last - 2), os.listdir(session))
+            ip.reset()
+            nt.assert_equal(os.listdir(td), [])
+        finally:
+            dh.cache_max_bytes = 0
+            dh.cache_spill = False
+            dh.cache_spill_dir = ''
+            dh._spill = None
+
+
+def test_cache_weakrefs():
+    dh = ip.displayhook
+    ip.run_cell('class Big(object): pass')
+    dh.cache_weakrefs = True
+    dh.cache_strong_size = 1
+    try:
+        ip.run_cell('b = Big(); b', store_history=True)
+        n = ip.execution_count - 1
+        ip.run_cell('1', store_history=True)
+        ip.run_cell('2', store_history=True)
+        ip.run_cell('3', store_history=True)
+        oh = ip.user_ns['Out']
+        nt.assert_not_in(n, dict.keys(oh))
+        nt.assert_not_in('_%d' % n, ip.user_ns)
+        nt.assert_is(oh[n], ip.user_ns['b'])
+        nt.assert_is(oh.get(n), ip.user_ns['b'])
+        nt.assert_in(n, oh)
+        # ints can't be weakly referenced, and stay
+        nt.assert_equal(oh[n + 1], 1)
+        nt.assert_in('_%d' % (n + 1), ip.user_ns)
+        ip.run_cell('del b')
+        with nt.assert_raises(KeyError):
+            oh[n]
+        nt.assert_not_in(n, oh)
+    finally:
+        dh.cache_weakrefs = False
+        dh.cache_strong_size = 3
+
+
+def test_cache_weakrefs_warns_large():
+    dh = ip.displayhook
+    dh.cache_weakrefs = True
+    dh.cache_strong_size = 1
+    try:
+        ip.run_cell('[0] * 10 ** 6', store_history=True)
+        n = ip.execution_count - 1
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            ip.run_cell('1', store_history=True)
+        nt.assert_equal(len(w), 1)
+        nt.assert_in('Out[%d] (list' % n, str(w[0].message))
+        nt.assert_in(n, ip.user_ns['Out'])
+    finally:
+        dh.cache_weakrefs = False
+        dh.cache_strong_size = 3
@@ -35,6 +35,10 @@ def __repr__(self):
 class BadPretty(object):
     _repr_pretty_ = None
 
+class MakeHTML(object):
+    def _repr_html_(self):
+        return '<b>html</b>'
+
 class GoodPretty(object):
     def _repr_pretty_(self, pp, cycle):
         pp.text('foo')
@@ -239,6 +243,60 @@ def test_pop_string():
     with nt.assert_raises(KeyError):
         f.pop(type_str)
     nt.assert_is(f.pop(type_str, None), None)
+
+def test_lookup_cache_invalidated():
+    f = HTMLFormatter()
+    with nt.assert_raises(KeyError):
+        f.lookup_by_type(B)
+    f.for_type(A, foo_printer)
+    nt.assert_is(f.lookup_by_type(B), foo_printer)
+    f.pop(A)
+    with nt.assert_raises(KeyError):
+        f.lookup_by_type(B)
+    f.for_type_by_name(A.__module__, 'A', foo_printer)
+    nt.assert_is(f.lookup_by_type(B), foo_printer)
+    f.type_printers = {}
+    with nt.assert_raises(KeyError):
+        f.lookup_by_type(B)
+
+def test_is_applicable():
+    f = HTMLFormatter()
+    nt.assert_false(f._is_applicable(A()))
+    nt.assert_true(f._is_applicable(MakeHTML()))
+    # methods set on the instance are still found
+    a = A()
+    a._repr_html_ = lambda : 'html'
+    nt.assert_true(f._is_applicable(a))
+    nt.assert_equal(f(a), 'html')
+    f.for_type(A, lambda obj: 'A')
+    nt.assert_true(f._is_applicable(A()))
+    f.enabled = False
+    nt.assert_false(f._is_applicable(A()))
+    # PlainTextFormatter always produces output
+    nt.assert_true(PlainTextFormatter()._is_applicable(A()))
+
+def test_format_skips_inapplicable():
+    f = DisplayFormatter()
+    d, md = f.format(MakeHTML())
+    nt.assert_equal(sorted(d), ['text/html', 'text/plain'])
+    d, md = f.format(A())
+    nt.assert_equal(list(d), ['text/plain'])
+    f.formatters['text/html'].for_type(A, lambda obj: 'A')
+    d, md = f.format(A())
+    nt.assert_equal(d['text/html'], 'A')
+
+def test_format_printers_changed_in_place():
+    f = DisplayFormatter()
+    html = f.formatters['text/html']
+    d, md = f.format(A())
+    nt.assert_equal(list(d), ['text/plain'])
+    html.type_printers[A] = lambda obj: 'A'
+    d, md = f.format(B())
+    nt.assert_equal(d['text/html'], 'A')
+    del html.type_printers[A]
+    html.deferred_printers[(A.__module__, 'A')] = lambda obj: 'deferred'
+    d, md = f.format(A())
+    nt.assert_equal(d['text/html'], 'deferred')
     
 
 def test_error_method():
@@ -391,6 +449,18 @@ def test_pretty_max_seq_length():
     lines = text.splitlines()
     nt.assert_equal(len(lines), 1024)
 
+def test_pretty_budget():
+    f = PlainTextFormatter(max_lines=2)
+    text, md = f(list(range(1024)))
+    nt.assert_equal(text.splitlines()[0], '[0,')
+    nt.assert_equal(md, {'truncated': True})
+    nt.assert_equal(f([1]), '[1]')
+    f = DisplayFormatter()
+    f.formatters['text/plain'].max_chars = 10
+    d, md = f.format(list(range(1024)))
+    nt.assert_true(d['text/plain'].startswith('[0, 1, 2,'))
+    nt.assert_equal(md['text/plain'], {'truncated': True})
+
 
 def test_ipython_display_formatter():
     """Objects with _ipython_display_ defined bypass other formatters"""
@@ -350,6 +350,107 @@ def test_check_complete(self):
         self.assertEqual(isp.check_complete("a = [1,\n2,"), ('incomplete', 0))
         self.assertEqual(isp.check_complete("def a():\n x=1\n global x"), ('invalid', None))
 
+class IncrementalCompileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.isp = isp.InputSplitter()
+
+    def test_check_complete_in_brackets(self):
+        # Compiled even though the tokenizer sees an open bracket
+        self.assertEqual(self.isp.check_complete("f(1 2,\n"), ('invalid', None))
+
+    def test_incremental_compile(self):
+        isp = self.isp
+        compiled = []
+        compile = isp._compile
+        def tracking_compile(source, symbol):
+            compiled.append(source)
+            return compile(source, symbol=symbol)
+        isp._compile = tracking_compile
+
+        lines = ["x = [1,", "2]", "if x:", "    y = 1", "else:", "    y = 2",
+                 "z = '''a", "b'''", "w = 4"]
+        for line in lines:
+            isp.push(line)
+        self.assertEqual(isp.source, '\n'.join(lines) + '\n')
+        # Brackets and strings are compiled when opened and when closed;
+        # 'else' with its 'if', and other statements on their own.
+        self.assertEqual(compiled, [
+            "x = [1,\n", "x = [1,\n2]\n",
+            "if x:\n", "if x:\n    y = 1\n", "if x:\n    y = 1\nelse:\n",
+            "if x:\n    y = 1\nelse:\n    y = 2\n",
+            "z = '''a\n", "z = '''a\nb'''\n",
+            "w = 4\n"])
+        self.assertFalse(isp._is_invalid)
+        self.assertTrue(isp._is_complete)
+
+    def test_code_covers_full_source(self):
+        isp = self.isp
+        for line in ["x = 1", "y = 2", "def f():", "    return x + y"]:
+            isp.push(line)
+        ns = {}
+        exec(isp.code, ns)
+        self.assertEqual(ns['f'](), 3)
+        self.assertIs(isp.code, isp.code)
+        isp.push("if x:")
+        self.assertIsNone(isp.code)
+
+    def test_incremental_future(self):
+        isp = self.isp
+        isp.push("x = 1")
+        isp.push("from __future__ import division")
+        self.assertTrue(isp._is_invalid)
+
+    def test_check_complete_incremental(self):
+        lines = ["def f(a,", "      b):", "    x = '''a", "b'''", "    %cd",
+                 "    return x", "", "y = 1", "if y:", "    z = ) ", "w",
+                 "def f():", "    for a in b:", "        if x and \\",
+                 "                y:", "            pass", ""]
+        for splitter in (isp.InputSplitter(), isp.IPythonInputSplitter()):
+            full = type(splitter)()
+            source = ''
+            for line in lines:
+                source += line + '\n'
+                expected = full.check_complete(source)
+                self.assertEqual(
+                    splitter.check_complete(source, incremental=True),
+                    expected)
+                if expected[0] != 'incomplete':
+                    source = ''
+        # Only the lines added since the last check are pushed
+        splitter = isp.InputSplitter()
+        splitter.check_complete("if x:\n", incremental=True)
+        splitter.push = None
+        self.assertEqual(splitter.check_complete("if x:\n", incremental=True),
+                         ('incomplete', 4))
+        # Any other source starts over
+        del splitter.push
+        self.assertEqual(splitter.check_complete("x = (\n", incremental=True),
+                         ('incomplete', 0))
+        splitter.reset()
+        self.assertEqual(splitter.check_complete("1)\n", incremental=True),
+                         ('invalid', None))
+
+
+def test_token_state():
+    def state(*lines):
+        ts = isp.TokenState()
+        for line in lines:
+            ts.feed(line)
+        return ts.at_boundary
+
+    nt.assert_true(state("a = (1,", "2)"))
+    nt.assert_false(state("a = {[1,", "2]"))
+    nt.assert_false(state("a = '''x", "y"))
+    nt.assert_true(state("a = '''x", "y'''"))
+    nt.assert_true(state("a = '(['  # ("))
+    nt.assert_false(state("a = 'x\\"))
+    nt.assert_false(state("a = 1 + \\"))
+    nt.assert_true(state(r"a = '\''"))
+    # Errors end the statement, so that the compiler reports them
+    nt.assert_true(state("a = (1]"))
+    nt.assert_true(state("(1 \\ "))
+
+
 class InteractiveLoopTestCase(unittest.TestCase):
     """Tests for an interactive loop like a python shell.
     """
@@ -462,6 +563,14 @@ def test_cellmagic_preempt(self):
             out = isp.transform_cell(raw)
             self.assertEqual(out.rstrip(), expected.rstrip())
 
+    def test_backslash_in_string(self):
+        # A line ending in a backslash inside a string doesn't stop the rest
+        # of the cell being transformed
+        raw = u'def f():\n    """a \\\n    b"""\n\n%ls\n'
+        out = self.isp.transform_cell(raw)
+        self.assertEqual(out.splitlines()[-1],
+                         u"get_ipython().magic(%r)" % u'ls')
+
     def test_multiline_passthrough(self):
         isp = self.isp
         class CommentTransformer(InputTransformer):
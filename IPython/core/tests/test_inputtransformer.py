@@ -415,11 +415,40 @@ def test_assemble_python_lines():
        (u"2,", None),
        (None, u"a = [1,\n2,"),
       ],
+      [(u"a = '''", None),  # Backslash continuation inside a string
+       (u"b \\", None),
+       (u"c'''", u"a = '''\nb \\\nc'''"),
+      ],
+      [(u"a = 1 + \\", None),
+       (u"", u"a = 1 + \\"),
+      ],
+      [(u"# comment", u"# comment"),
+       (u"a = (1,  # (", None),
+       (u"2)", u"a = (1,  # (\n2)"),
+      ],
+      [(u"a = ('x", u"a = ('x"),  # Tokenizer errors end the line
+       (u"f(a?", u"f(a?"),
+      ],
     ] + syntax_ml['multiline_datastructure']
     for example in tests:
         transform_checker(example, ipt.assemble_python_lines)
 
 
+def test_stateless_trigger():
+    calls = []
+    @ipt.StatelessInputTransformer.wrap(trigger=r'^!')
+    def shout(line):
+        calls.append(line)
+        return line.upper()
+
+    transformer = shout()
+    nt.assert_equal(transformer.push(u'!a'), u'!A')
+    nt.assert_equal(transformer.push(u'a!'), u'a!')
+    nt.assert_equal(calls, [u'!a'])
+    # The trigger can be overridden when creating the transformer
+    nt.assert_equal(shout(trigger=None).push(u'a!'), u'A!')
+
+
 def test_help_end():
     tt.check_pairs(transform_and_reset(ipt.help_end), syntax['end_help'])
 
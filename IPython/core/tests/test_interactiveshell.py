@@ -33,6 +33,7 @@
 from IPython.utils.process import find_cmd
 from IPython.utils import py3compat
 from IPython.utils.py3compat import unicode_type, PY3
+from IPython.utils.text import SList
 
 if PY3:
     from io import StringIO
@@ -608,6 +609,21 @@ def test_exit_code_error(self):
     def test_exit_code_signal(self):
         ExitCodeChecks.test_exit_code_signal(self)
 
+class TestGetoutputStream(unittest.TestCase):
+    def tearDown(self):
+        ip.stream_system_output = False
+
+    @skip_win32
+    def test_stream_system_output(self):
+        ip.stream_system_output = True
+        ip.run_cell("a, b = !printf 'x 1\\ny 2\\n'")
+        self.assertEqual((ip.user_ns['a'], ip.user_ns['b']), ('x 1', 'y 2'))
+        out = ip.getoutput("printf 'x 1\\ny 2\\n'")
+        self.assertEqual(out.fields(1), ['1', '2'])
+        # LSStrings are still built in one go
+        self.assertEqual(ip.getoutput("echo x", split=False), 'x\n')
+        self.assertIsInstance(ip.getoutput("echo x", stream=False), SList)
+
 class TestModules(unittest.TestCase, tt.TempFileMixin):
     def test_extraneous_loads(self):
         """Test we're not loading modules on startup that we shouldn't.
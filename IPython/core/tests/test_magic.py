@@ -523,6 +523,10 @@ def test_psearch():
     with tt.AssertPrints("dict.fromkeys"):
         _ip.run_cell("dict.fr*?")
 
+def test_psearch_modules():
+    with tt.AssertPrints("os.path.join"):
+        _ip.run_cell("%psearch -m os.path.j* function")
+
 def test_timeit_shlex():
     """test shlex issues with timeit (#1109)"""
     _ip.ex("def f(*a,**kw): pass")
@@ -827,6 +831,69 @@ def test_script_bg_out_err():
     nt.assert_equal(ip.user_ns['output'].read(), b'hi\n')
     nt.assert_equal(ip.user_ns['error'].read(), b'hello\n')
 
+@dec.skip_win32
+def test_script_streams_in_order():
+    ip = get_ipython()
+    out = StringIO()
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = out
+    try:
+        ip.run_cell_magic("script", "sh", "\n".join(
+            ["echo 'a'", "sleep 0.1", "echo 'b' >&2", "sleep 0.1", "echo 'c'"]))
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+    nt.assert_equal(out.getvalue(), u'a\nb\nc\n')
+
+@dec.skip_win32
+def test_script_out_spills_to_file():
+    ip = get_ipython()
+    sm = ip.magics_manager.registry['ScriptMagics']
+    limit = sm.capture_limit
+    sm.capture_limit = 100
+    try:
+        ip.run_cell_magic("script", "--out output --err error sh",
+                          "seq 1000\necho 'hello' >&2")
+    finally:
+        sm.capture_limit = limit
+    output = ip.user_ns['output']
+    nt.assert_equal(output.read().split(),
+                    [str(i).encode() for i in range(1, 1001)])
+    output.close()
+    nt.assert_equal(ip.user_ns['error'], 'hello\n')
+
+@dec.skip_win32
+def test_script_interrupted_closes_pipes():
+    import subprocess, time
+    class Interrupt(object):
+        def write(self, data):
+            raise KeyboardInterrupt
+    sm = get_ipython().magics_manager.registry['ScriptMagics']
+    p = subprocess.Popen(['sh'], stdin=subprocess.PIPE,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # More output than fits in the queue, so the readers have to wait
+    with nt.assert_raises(KeyboardInterrupt):
+        sm._stream_script(p, b'exec yes\n', Interrupt(), Interrupt())
+    p.kill()
+    p.wait()
+    deadline = time.time() + 10
+    while not (p.stdout.closed and p.stderr.closed) and time.time() < deadline:
+        time.sleep(0.05)
+    nt.assert_true(p.stdout.closed)
+    nt.assert_true(p.stderr.closed)
+
+@dec.skip_win32
+@dec.py3_only
+def test_script_flushes_partial_character():
+    ip = get_ipython()
+    out = StringIO()
+    stdout, sys.stdout = sys.stdout, out
+    try:
+        # Output ending in the first byte of a two-byte character
+        ip.run_cell_magic("script", "sh", "printf 'a\\303'")
+    finally:
+        sys.stdout = stdout
+    nt.assert_equal(out.getvalue(), u'a\ufffd')
+
 def test_script_defaults():
     ip = get_ipython()
     for cmd in ['sh', 'bash', 'perl', 'ruby']:
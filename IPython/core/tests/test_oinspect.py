@@ -328,6 +328,43 @@ def test_info_serialliar():
     # infinite loops: https://github.com/ipython/ipython/issues/9122
     nt.assert_less(fib_tracker[0], 9000)
 
+def test_info_fields():
+    class Counted(object):
+        """Counts calls to __len__"""
+        lens = 0
+        def __len__(self):
+            Counted.lens += 1
+            return 3
+    obj = Counted()
+    i = inspector.info(obj, fields=['type_name', 'docstring'])
+    nt.assert_equal(i['type_name'], 'Counted')
+    nt.assert_equal(i['docstring'], Counted.__doc__)
+    nt.assert_is(i['length'], None)
+    nt.assert_equal(Counted.lens, 0)
+    nt.assert_equal(set(i), set(oinspect.info_fields))
+
+def test_info_cache():
+    class Counted(object):
+        lens = 0
+        def __len__(self):
+            Counted.lens += 1
+            return Counted.lens
+    obj = Counted()
+    insp = oinspect.Inspector()
+    insp.info_cache_ttl = 60
+    nt.assert_equal(insp.info(obj)['length'], '1')
+    nt.assert_equal(insp.info(obj)['length'], '1')
+    # Entries are per object, and die with it
+    nt.assert_equal(insp.info(Counted())['length'], '2')
+    nt.assert_equal(len(insp._info_cache), 1)
+    del obj
+    nt.assert_equal(len(insp._info_cache), 0)
+
+    insp.info_cache_ttl = 0
+    obj = Counted()
+    nt.assert_equal(insp.info(obj)['length'], '3')
+    nt.assert_equal(insp.info(obj)['length'], '4')
+
 def test_calldef_none():
     # We should ignore __call__ for all of these.
     for obj in [f, SimpleClass().method, any, str.upper]:
@@ -6,9 +6,19 @@
 #  The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 import io
+import os
+import tempfile
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock # Python 2
+
+import nose.tools as nt
 
 # N.B. For the test suite, page.page is overridden (see IPython.testing.globalipapp)
 from IPython.core import page
+from IPython.utils.capture import capture_output
 
 def test_detect_screen_size():
     """Simple smoketest for page._detect_screen_size."""
@@ -18,3 +28,92 @@ def test_detect_screen_size():
         # This can happen in the test suite, because stdout may not have a
         # fileno.
         pass
+
+
+def test_split_lines():
+    nt.assert_equal(list(page._split_lines([u'a', u'b\nc', u'', u'd\n'])),
+                    u'a\nb\nc\n\nd\n'.split(u'\n'))
+
+
+def _counted(n):
+    """Lines 0..n-1, recording how many have been produced."""
+    produced = []
+    def lines():
+        for i in range(n):
+            produced.append(i)
+            yield str(i)
+    return produced, lines()
+
+
+def test_page_dumb_lines():
+    produced, lines = _counted(100)
+    saved = page.page_more
+    answers = [True, False]
+    page.page_more = lambda: answers.pop(0)
+    try:
+        with capture_output() as captured:
+            page.page_dumb_lines(lines, screen_lines=11)
+    finally:
+        page.page_more = saved
+    nt.assert_equal(captured.stdout.split(), [str(i) for i in range(20)])
+    # Only the next screen was read ahead
+    nt.assert_equal(len(produced), 30)
+
+
+def test_pager_page_lines():
+    saved = os.environ.get('TERM')
+    os.environ['TERM'] = 'xterm'
+    fd, fname = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        with capture_output() as captured:
+            page.orig_page_lines(['1', '2\n3'], screen_lines=5,
+                                 pager_cmd='cat > %s' % fname)
+        nt.assert_equal(captured.stdout.split(), ['1', '2', '3'])
+
+        produced, lines = _counted(1000)
+        page.orig_page_lines(lines, start=10, screen_lines=5,
+                             pager_cmd='cat > %s' % fname)
+        with open(fname) as f:
+            nt.assert_equal(f.read().split(),
+                            [str(i) for i in range(10, 1000)])
+    finally:
+        os.remove(fname)
+        if saved is None:
+            del os.environ['TERM']
+        else:
+            os.environ['TERM'] = saved
+
+
+def test_pager_page_lines_windows_fallback():
+    # The pager command fails, and the temporary file it was given is paged
+    # with page_dumb_lines() instead
+    saved = os.environ.get('TERM')
+    os.environ['TERM'] = 'xterm'
+    try:
+        with mock.patch.object(page.os, 'name', 'nt'), \
+                mock.patch.object(page.os, 'system', return_value=1), \
+                mock.patch.object(page, 'page_more', return_value=True), \
+                capture_output() as captured:
+            page.orig_page_lines([str(i) for i in range(7)], screen_lines=5,
+                                 pager_cmd='more')
+    finally:
+        if saved is None:
+            del os.environ['TERM']
+        else:
+            os.environ['TERM'] = saved
+    nt.assert_equal(captured.stdout.splitlines(), [str(i) for i in range(7)])
+
+
+def test_page_lines_hook():
+    ip = get_ipython()
+    shown = []
+    def show_in_pager(self, data, start, screen_lines):
+        shown.append((data, start))
+    saved = list(ip.hooks.show_in_pager.chain)
+    ip.set_hook('show_in_pager', show_in_pager)
+    try:
+        page.page_lines(iter([u'a', u'b']), start=1)
+    finally:
+        ip.hooks.show_in_pager.chain = saved
+    nt.assert_equal(shown, [(u'a\nb', 1)])
@@ -4,8 +4,11 @@
 # Imports
 #-----------------------------------------------------------------------------
 import nose.tools as nt
+from traitlets import Unicode
 
-from IPython.core.prefilter import AutocallChecker
+from IPython.core.prefilter import (
+    AutocallChecker, PrefilterChecker, PrefilterHandler
+)
 from IPython.testing.globalipapp import get_ipython
 
 #-----------------------------------------------------------------------------
@@ -117,3 +120,46 @@ def __call__(self, x):
     finally:
         del ip.user_ns['x']
         ip.magic('autocall 0')
+
+
+def test_prefilter_plain_lines():
+    """Plain Python lines skip the checkers, unless a custom one is added."""
+    pm = ip.prefilter_manager
+
+    class ClaimAll(PrefilterChecker):
+        def check(self, line_info):
+            return self.prefilter_manager.get_handler_by_name('emacs')
+
+    class Shout(PrefilterHandler):
+        handler_name = Unicode('emacs')
+        def handle(self, line_info):
+            return line_info.line.upper()
+
+    emacs = pm.get_handler_by_name('emacs')
+    Shout(shell=ip, prefilter_manager=pm)
+    checker = ClaimAll(shell=ip, prefilter_manager=pm, config=pm.config)
+    try:
+        nt.assert_equal(ip.prefilter('for i in x: pass'), 'FOR I IN X: PASS')
+        checker.enabled = False
+        nt.assert_equal(ip.prefilter('for i in x: pass'), 'for i in x: pass')
+        nt.assert_equal(ip.prefilter('[1, 2]'), '[1, 2]')
+    finally:
+        pm.unregister_checker(checker)
+        pm.register_handler('emacs', emacs, emacs.esc_strings)
+
+
+def test_autocall_missing_names():
+    """Names that weren't found are looked up again once they are defined."""
+    ip.magic('autocall 2')
+    try:
+        nt.assert_equal(ip.prefilter('g 1'), 'g 1')
+        ip.user_ns['g'] = lambda x: x
+        nt.assert_equal(ip.prefilter('g 1'), 'g(1)')
+        # Swapping names keeps the size of the namespace, but runs code
+        ip.run_cell('del g; h = 1')
+        nt.assert_equal(ip.prefilter('g 1'), 'g 1')
+        ip.run_cell('del h; g = lambda x: x')
+        nt.assert_equal(ip.prefilter('g 1'), 'g(1)')
+    finally:
+        ip.user_ns.pop('g', None)
+        ip.magic('autocall 0')
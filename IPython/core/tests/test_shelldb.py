@@ -0,0 +1,83 @@
+"""Tests for the write-behind shell database."""
+
+import os
+import shutil
+import tempfile
+import threading
+
+import nose.tools as nt
+
+from IPython.core.shelldb import ShellDB
+
+
+class TestShellDB(object):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.db = ShellDB(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_write_behind(self):
+        db = self.db
+        db['a'] = 1
+        db['a'] = 2
+        nt.assert_equal(db['a'], 2)
+        nt.assert_in('a', db)
+        nt.assert_false(os.path.exists(os.path.join(self.root, 'a')))
+
+        db.flush()
+        nt.assert_equal(ShellDB(self.root)['a'], 2)
+        nt.assert_equal(os.listdir(self.root), ['a'])
+
+        del db['a']
+        nt.assert_not_in('a', db)
+        with nt.assert_raises(KeyError):
+            db['a']
+        nt.assert_equal(db.keys(), [])
+        nt.assert_false(os.path.exists(os.path.join(self.root, 'a')))
+
+        # deleting a missing key is allowed, as with PickleShareDB
+        del db['missing']
+        db.flush()
+
+    def test_value_saved_when_set(self):
+        db = self.db
+        x = [1]
+        db['x'] = x
+        x.append(2)
+        nt.assert_equal(db['x'], [1])
+        db.flush()
+        nt.assert_equal(db['x'], [1])
+        nt.assert_is_not(db['x'], x)
+        nt.assert_equal(ShellDB(self.root)['x'], [1])
+
+        with nt.assert_raises(TypeError):
+            db['lock'] = threading.Lock()
+        nt.assert_not_in('lock', db)
+
+    def test_nested_keys(self):
+        db = self.db
+        db['autorestore/x'] = [1]
+        db['autorestore/y'] = [2]
+        nt.assert_equal(sorted(db.keys('autorestore/*')),
+                        ['autorestore/x', 'autorestore/y'])
+        nt.assert_equal(db.get('autorestore/x'), [1])
+        nt.assert_equal(db.get('autorestore/z', 'default'), 'default')
+
+    def test_reads_validated_against_other_writers(self):
+        db, other = self.db, ShellDB(self.root)
+        db['k'] = 'first'
+        db.flush()
+        nt.assert_equal(other['k'], 'first')
+        # the cached value is returned while the file is unchanged
+        nt.assert_is(other['k'], other['k'])
+
+        db['k'] = 'second value'
+        db.flush()
+        nt.assert_equal(other['k'], 'second value')
+
+    def test_pickleshare_methods(self):
+        db = self.db
+        db.hset('hashed', 'key', 'value')
+        nt.assert_equal(db.hget('hashed', 'key'), 'value')
@@ -2,18 +2,22 @@
 """Tests for IPython.core.ultratb
 """
 import io
+import json
 import sys
 import os.path
+import time
 from textwrap import dedent
 import traceback
 import unittest
+import zipfile
 
 try:
     from unittest import mock
 except ImportError:
     import mock    # Python 2
 
-from ..ultratb import ColorTB, VerboseTB, find_recursion
+from ..ultratb import (ColorTB, VerboseTB, find_recursion, SourceCache,
+                       SkippedFrames, ReprLimiter, _fixed_getinnerframes)
 
 
 from IPython.testing import tools as tt
@@ -309,6 +313,224 @@ def capture_exc(*args, **kwargs):
         self.assertEqual(last_unique, 2)
         self.assertEqual(repeat_length, 3)
 
+    def test_max_frames(self):
+        ip.run_cell("%config InteractiveShell.xmode_max_frames = 20")
+        try:
+            with tt.AssertPrints(["frames skipped, recursion detected in",
+                                  "r3a (", "r3b (", "r3c ("]):
+                with tt.AssertNotPrints("frames repeated", suppress=False):
+                    ip.run_cell("r3o2()")
+            with tt.AssertNotPrints("frames skipped"):
+                ip.run_cell("non_recurs()")
+        finally:
+            ip.run_cell("%config InteractiveShell.xmode_max_frames = 0")
+
+    def test_max_frames_records(self):
+        captured = []
+        def capture_exc(*args, **kwargs):
+            captured.append(sys.exc_info())
+        with mock.patch.object(ip, 'showtraceback', capture_exc):
+            ip.run_cell("r3o2()")
+        etype, evalue, tb = captured[0]
+
+        records = _fixed_getinnerframes(tb, 1, 1, max_frames=7)
+        self.assertEqual(len(records), 8)
+        skipped = records[3]
+        self.assertIsInstance(skipped, SkippedFrames)
+        self.assertTrue(skipped.recursive)
+        full = _fixed_getinnerframes(tb, 1, 1)
+        self.assertEqual(skipped.count, len(full) - 7)
+        self.assertEqual([r[3] for r in records[:3]],
+                         [r[3] for r in full[:3]])
+        self.assertEqual([r[3] for r in records[4:]],
+                         [r[3] for r in full[-4:]])
+
+
+class DeferredTest(unittest.TestCase):
+    def setUp(self):
+        ip.run_cell("def deferred_f(x):\n    return 'spam' + x")
+        ip.run_cell("%config InteractiveShell.xmode_deferred = True")
+        self.mode = ip.InteractiveTB.mode
+        ip.InteractiveTB.set_mode('Context')
+
+    def tearDown(self):
+        ip.run_cell("%config InteractiveShell.xmode_deferred = False")
+        ip.InteractiveTB.set_mode(self.mode)
+
+    def test_deferred(self):
+        with tt.AssertPrints(["TypeError", "%tb -v"]):
+            with tt.AssertNotPrints("-->", suppress=False):
+                ip.run_cell("deferred_f(1)")
+        with tt.AssertPrints(["-->", "TypeError"]):
+            with tt.AssertNotPrints("deferred_f(x=1)", suppress=False):
+                ip.run_cell("%tb")
+        with tt.AssertPrints(["-->", "deferred_f(x=1)"]):
+            ip.run_cell("%tb -v")
+        self.assertEqual(ip.InteractiveTB.mode, 'Context')
+        self.assertTrue(ip.InteractiveTB.deferred)
+
+
+class ReprLimiterTest(unittest.TestCase):
+    def test_max_chars(self):
+        limiter = ReprLimiter(max_chars=10)
+        self.assertEqual(limiter(1), '1')
+        self.assertEqual(limiter('a' * 20), "'" + 'a' * 9 + '...')
+
+    def test_time_limit(self):
+        class Slow(object):
+            calls = 0
+            def __repr__(self):
+                Slow.calls += 1
+                time.sleep(0.01)
+                return 'slow'
+        limiter = ReprLimiter(time_limit=0.001)
+        self.assertEqual(limiter(Slow()), 'slow')
+        self.assertIn('too slow', limiter(Slow()))
+        self.assertEqual(Slow.calls, 1)
+
+
+class ExceptionRecordTest(unittest.TestCase):
+    def setUp(self):
+        ip.run_cell("def record_f(x):\n    y = 'spam'\n    return y + x")
+
+    def capture(self, cell):
+        captured = []
+        def capture_exc(*args, **kwargs):
+            captured.append(sys.exc_info())
+        with mock.patch.object(ip, 'showtraceback', capture_exc):
+            ip.run_cell(cell)
+        return captured[0]
+
+    def test_record(self):
+        etype, evalue, tb = self.capture("record_f(1)")
+        record = ip.InteractiveTB.exception_record(etype, evalue, tb,
+                                                   include_locals=True)
+        self.assertEqual(record, json.loads(json.dumps(record)))
+        self.assertEqual(record['ename'], 'TypeError')
+        frames = record['frames']
+        self.assertEqual([f['function'] for f in frames],
+                         ['<module>', 'record_f'])
+        frame = frames[-1]
+        self.assertEqual(frame['lineno'], 3)
+        self.assertEqual(frame['source_start'], 1)
+        self.assertEqual(frame['source'][frame['lineno'] - frame['source_start']],
+                         "    return y + x\n")
+        self.assertIsInstance(frame['execution_count'], int)
+        self.assertEqual(frame['locals'], {'x': '1', 'y': "'spam'"})
+        self.assertNotIn('locals', frames[0])
+
+    def test_record_chained(self):
+        if not PY3:
+            return
+        etype, evalue, tb = self.capture(
+            "try:\n    record_f(1)\nexcept TypeError:\n    1/0")
+        record = ip.InteractiveTB.exception_record(etype, evalue, tb)
+        self.assertEqual(record['ename'], 'ZeroDivisionError')
+        self.assertEqual(record['context']['ename'], 'TypeError')
+        self.assertNotIn('cause', record)
+        self.assertNotIn('locals', record['context']['frames'][-1])
+
+    def test_record_file(self):
+        with TemporaryDirectory() as td:
+            fname = os.path.join(td, 'exceptions.jsonl')
+            ip.exception_record_file = fname
+            try:
+                ip.run_cell("record_f(1)")
+                ip.run_cell("record_f(2)")
+            finally:
+                ip.exception_record_file = ''
+            ip.run_cell("record_f(3)")
+            with io.open(fname, encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['ename'], 'TypeError')
+        self.assertIn('execution_count', records[0])
+        self.assertFalse(ip.events.callbacks['exception_recorded'])
+
+
+class SourceCacheTest(unittest.TestCase):
+    def test_lines_and_names_invalidated(self):
+        cache = SourceCache()
+        with TemporaryDirectory() as td:
+            fname = os.path.join(td, "foo.py")
+            with open(fname, "w") as f:
+                f.write("a = b.c + d\n")
+            self.assertEqual(cache.getlines(fname), ["a = b.c + d\n"])
+            self.assertEqual(cache.names(fname, 1), ["a", "b.c", "d"])
+
+            # Same size, different mtime
+            with open(fname, "w") as f:
+                f.write("x = y.z + w\n")
+            st = os.stat(fname)
+            os.utime(fname, (st.st_atime, st.st_mtime + 10))
+            self.assertEqual(cache.getlines(fname), ["x = y.z + w\n"])
+            self.assertEqual(cache.names(fname, 1), ["x", "y.z", "w"])
+
+    def test_names_multiline(self):
+        cache = SourceCache()
+        with TemporaryDirectory() as td:
+            fname = os.path.join(td, "foo.py")
+            with open(fname, "w") as f:
+                f.write("f(a,\n  b)\nc\n")
+            self.assertEqual(cache.names(fname, 1), ["f", "a", "b"])
+            self.assertEqual(cache.names(fname, 3), ["c"])
+
+    def test_resolve(self):
+        cache = SourceCache()
+        with TemporaryDirectory() as td:
+            fname = os.path.join(td, "foo.py")
+            with open(fname, "w") as f:
+                f.write("pass\n")
+            self.assertEqual(cache.resolve("foo.py"), "foo.py")
+            with prepended_to_syspath(td):
+                self.assertEqual(cache.resolve("foo.py"), os.path.abspath(fname))
+            self.assertEqual(cache.resolve("foo.py"), "foo.py")
+
+    def test_zipped_module(self):
+        with TemporaryDirectory() as td:
+            zname = os.path.join(td, "zipped.zip")
+            with zipfile.ZipFile(zname, "w") as zf:
+                zf.writestr("zipped_mod.py",
+                            "def f():\n    x = 1\n    return x / 0\n")
+            with prepended_to_syspath(zname):
+                import zipped_mod
+                try:
+                    zipped_mod.f()
+                except ZeroDivisionError:
+                    tb = VerboseTB(color_scheme='NoColor').text(*sys.exc_info())
+                finally:
+                    del sys.modules['zipped_mod']
+        self.assertIn("return x / 0", tb)
+        self.assertIn("x = 1", tb)
+
+    def test_stat_once_per_traceback(self):
+        with TemporaryDirectory() as td:
+            fname = os.path.join(td, "foo.py")
+            with open(fname, "w") as f:
+                f.write("def f(n):\n    return 1 / n if n == 0 else f(n - 1)\n")
+            ns = {}
+            with open(fname) as f:
+                exec(compile(f.read(), fname, 'exec'), ns)
+            try:
+                ns['f'](3)
+            except ZeroDivisionError:
+                info = sys.exc_info()
+            VerboseTB(color_scheme='Linux').text(*info)
+            stats = []
+            os_stat = os.stat
+            def stat(path):
+                stats.append(path)
+                return os_stat(path)
+            with mock.patch('os.stat', stat):
+                VerboseTB(color_scheme='Linux').text(*info)
+            self.assertEqual(stats.count(fname), 1)
+
+    def test_deep_stack(self):
+        ip.run_cell("def deep(n):\n    return 1/0 if n == 0 else deep(n-1)")
+        with tt.AssertPrints(["deep(n-1)", "ZeroDivisionError"]):
+            ip.run_cell("%xmode verbose\ndeep(200)")
+        ip.run_cell("%xmode context")
+
 
 #----------------------------------------------------------------------------
 
@@ -92,8 +92,12 @@
 from __future__ import unicode_literals
 from __future__ import print_function
 
+import collections
+import contextlib
 import dis
 import inspect
+import io
+import json
 import keyword
 import linecache
 import os
@@ -328,6 +332,213 @@ def wrapped(*args, **kwargs):
     fixed_getargvalues = with_patch_inspect(inspect.getargvalues)
 
 
+def _line_names(getline, lnum):
+    """Return the unique variable names in the logical line starting at lnum.
+
+    Dotted names are joined (e.g. ``"dict.fromkeys"``); keywords are skipped.
+    """
+    def linereader(lnum=[lnum]):
+        line = getline(lnum[0])
+        lnum[0] += 1
+        return line
+
+    names = []
+    name_cont = False
+    try:
+        for token_type, token, start, end, line in generate_tokens(linereader):
+            # build composite names
+            if token_type == tokenize.NAME and token not in keyword.kwlist:
+                if name_cont:
+                    # Continuation of a dotted name
+                    try:
+                        names[-1].append(token)
+                    except IndexError:
+                        names.append([token])
+                    name_cont = False
+                else:
+                    # Regular new names.  We append everything, the pruning
+                    # at the end is easy to do, it's very tricky to try to
+                    # prune as we go, b/c composite names can fool us.
+                    names.append([token])
+            elif token == '.':
+                name_cont = True
+            elif token_type == tokenize.NEWLINE:
+                break
+
+    except (IndexError, UnicodeDecodeError, SyntaxError):
+        # signals exit of tokenizer
+        # SyntaxError can occur if the file is not actually Python
+        #  - see gh-6300
+        pass
+    except tokenize.TokenError as msg:
+        _m = ("An unexpected error occurred while tokenizing input\n"
+              "The following traceback may be corrupted or invalid\n"
+              "The error message is: %s\n" % msg)
+        error(_m)
+
+    # Join composite names (e.g. "dict.fromkeys") and prune duplicates,
+    # keeping the right order
+    return uniq_stable('.'.join(n) for n in names)
+
+
+class SourceCache(object):
+    """Caches the work done per source file when formatting tracebacks.
+
+    Source lines, the variable names found on each line and colorized lines
+    are stored per file and keyed by the file's (mtime, size), so editing a
+    module invalidates everything derived from its old source.  Modules
+    loaded through a PEP 302 loader (e.g. from a zip file) are read with
+    the loader found in their globals, and kept until :meth:`clear`.  Other
+    names that are not files on disk (e.g. ``<ipython-input-...>`` cells) go
+    straight to linecache every time.
+
+    Files are stat'ed on every lookup, except inside :meth:`single_check`.
+
+    Relative filenames are resolved against ``sys.path`` once, and resolved
+    again whenever ``sys.path`` changes.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Forget everything that has been cached."""
+        self._files = {}
+        self._paths = {}
+        self._sys_path = None
+        # filename -> (entry, whether module globals were given), for the
+        # files already checked in single_check()
+        self._checked = None
+
+    @contextlib.contextmanager
+    def single_check(self):
+        """Stat each file at most once inside the block.
+
+        Used while formatting one traceback, which looks up the same files
+        several times per frame.
+        """
+        if self._checked is not None:
+            yield
+            return
+        self._checked = {}
+        try:
+            yield
+        finally:
+            self._checked = None
+
+    def _entry(self, filename, module_globals=None):
+        """Return the cache entry for filename, or None if it has no source
+        we can keep."""
+        checked = self._checked
+        if checked is not None and filename in checked:
+            entry, had_globals = checked[filename]
+            if entry is not None or had_globals or module_globals is None:
+                return entry
+        entry = self._load(filename, module_globals)
+        if checked is not None:
+            checked[filename] = entry, module_globals is not None
+        return entry
+
+    def _load(self, filename, module_globals):
+        entry = self._files.get(filename)
+        try:
+            st = os.stat(filename)
+        except (OSError, TypeError, ValueError):
+            if entry is not None and entry['stamp'] is None:
+                # Read through a loader before
+                return entry
+            self._files.pop(filename, None)
+            loader = (module_globals or {}).get('__loader__')
+            if filename.startswith('<') or not hasattr(loader, 'get_source'):
+                return None
+            stamp = None
+            lines = ulinecache.getlines(filename, module_globals)
+            if not lines:
+                return None
+        else:
+            stamp = (st.st_mtime, st.st_size)
+            if entry is not None and entry['stamp'] == stamp:
+                return entry
+            # Make sure linecache doesn't hand us an outdated copy
+            linecache.checkcache(filename)
+            lines = ulinecache.getlines(filename)
+        entry = self._files[filename] = {
+            'stamp': stamp,
+            'lines': lines,
+            'names': {},
+            'colored': {},
+        }
+        return entry
+
+    def getlines(self, filename, module_globals=None):
+        """Return the source lines of filename, as unicode.
+
+        module_globals are the globals of the module the file belongs to,
+        used like :func:`linecache.getlines` does to find its loader.
+        """
+        entry = self._entry(filename, module_globals)
+        if entry is None:
+            return ulinecache.getlines(filename, module_globals)
+        return entry['lines']
+
+    def names(self, filename, lnum, module_globals=None):
+        """Return the variable names in the logical line starting at lnum."""
+        entry = self._entry(filename, module_globals)
+        if entry is None:
+            getline = lambda n: ulinecache.getline(filename, n, module_globals)
+            return _line_names(getline, lnum)
+        names = entry['names'].get(lnum)
+        if names is None:
+            lines = entry['lines']
+            def getline(n):
+                return lines[n-1] if 1 <= n <= len(lines) else ''
+            names = entry['names'][lnum] = _line_names(getline, lnum)
+        return names
+
+    def colorize(self, filename, line, scheme):
+        """Return line syntax-highlighted with scheme, or None on failure."""
+        entry = self._entry(filename) if filename else None
+        key = (scheme, line)
+        if entry is not None and key in entry['colored']:
+            return entry['colored'][key]
+        new_line, err = _parser.format2(line, 'str', scheme)
+        colored = None if err else new_line
+        if entry is not None:
+            entry['colored'][key] = colored
+        return colored
+
+    def resolve(self, filename):
+        """Make a relative filename absolute by searching sys.path.
+
+        Returns filename unchanged if it can't be found (which is also what
+        linecache does).
+        """
+        sys_path = tuple(sys.path)
+        if sys_path != self._sys_path:
+            self._paths = {}
+            self._sys_path = sys_path
+        try:
+            return self._paths[filename]
+        except KeyError:
+            pass
+        fullname = filename
+        for dirname in sys_path:
+            try:
+                candidate = os.path.join(dirname, filename)
+                if os.path.isfile(candidate):
+                    fullname = os.path.abspath(candidate)
+                    break
+            except Exception:
+                # Just in case that sys.path contains very
+                # strange entries...
+                pass
+        self._paths[filename] = fullname
+        return fullname
+
+#: The cache shared by all traceback formatters.
+source_cache = SourceCache()
+
+
 def fix_frame_records_filenames(records):
     """Try to fix the filenames in each record from inspect.getinnerframes().
 
@@ -351,35 +562,117 @@ def fix_frame_records_filenames(records):
     return fixed_records
 
 
-@with_patch_inspect
-def _fixed_getinnerframes(etb, context=1, tb_offset=0):
-    LNUM_POS, LINES_POS, INDEX_POS = 2, 4, 5
+class SkippedFrames(object):
+    """Stands for the frames a frame budget leaves out of a traceback.
+
+    Only the function and file of each skipped frame are looked at, so
+    collecting thousands of them is cheap.  A function that shows up more
+    than once means the stack is recursing.
+    """
+
+    #: How many functions the summary line lists by name.
+    max_functions = 5
+
+    def __init__(self):
+        self.count = 0
+        self.functions = collections.OrderedDict()
+
+    def add(self, code):
+        """Account for a skipped frame running code object `code`."""
+        self.count += 1
+        key = (code.co_name, code.co_filename)
+        self.functions[key] = self.functions.get(key, 0) + 1
+
+    @property
+    def recursive(self):
+        return any(n > 1 for n in self.functions.values())
+
+    def summary(self):
+        """A one line description of the skipped frames."""
+        functions = sorted(self.functions.items(), key=lambda kv: -kv[1])
+        shown = ['%s (%d times)' % (name, n) if n > 1 else name
+                 for (name, _), n in functions[:self.max_functions]]
+        if len(functions) > self.max_functions:
+            shown.append('%d more' % (len(functions) - self.max_functions))
+        return '... %d frames skipped%s: %s ...' % (
+            self.count, ', recursion detected in' if self.recursive else '',
+            ', '.join(shown))
+
+
+def _fixed_getinnerframes(etb, context=1, tb_offset=0, max_frames=0):
+    """Return frame records for a traceback, like inspect.getinnerframes().
+
+    Unlike the inspect version, this does not search each frame's source for
+    the enclosing definition; the context lines are taken from the
+    per-file cache in `source_cache` instead.
+
+    If max_frames is positive and the traceback is deeper than that, only
+    the outermost and innermost frames get a record, and a `SkippedFrames`
+    instance takes the place of the others in the returned list.  The
+    traceback is walked once, without building records for skipped frames.
+    """
+    head, tail, skipped = [], None, None
+    if max_frames > 0:
+        head_size = max_frames // 2
+        tail = collections.deque(maxlen=max_frames - head_size)
+        skipped = SkippedFrames()
+
+    for i, tb in enumerate(_walk_tb(etb)):
+        if i < tb_offset:
+            continue
+        frame = tb.tb_frame
+        code = frame.f_code
+        record = (frame, code.co_filename, tb.tb_lineno, code.co_name,
+                  None, None)
+        if tail is None or len(head) < head_size:
+            head.append(record)
+        else:
+            if len(tail) == tail.maxlen:
+                skipped.add(tail[0][0].f_code)
+            tail.append(record)
+
+    parts = [fix_frame_records_filenames(head)]
+    if tail:
+        if skipped.count:
+            parts.append([skipped])
+        parts.append(fix_frame_records_filenames(tail))
+    records = [r for part in parts for r in part]
 
-    records = fix_frame_records_filenames(inspect.getinnerframes(etb, context))
     # If the error is at the console, don't build any context, since it would
     # otherwise produce 5 blank lines printed out (there is no file at the
     # console)
-    rec_check = records[tb_offset:]
     try:
-        rname = rec_check[0][1]
+        rname = parts[0][0][1] if parts[0] else parts[-1][0][1]
         if rname == '<ipython console>' or rname.endswith('<string>'):
-            return rec_check
+            return records
     except IndexError:
         pass
 
-    aux = traceback.extract_tb(etb)
-    assert len(records) == len(aux)
-    for i, (file, lnum, _, _) in zip(range(len(records)), aux):
-        maybeStart = lnum - 1 - context // 2
-        start = max(maybeStart, 0)
+    for i, record in enumerate(records):
+        if isinstance(record, SkippedFrames):
+            continue
+        frame, filename, lnum, func = record[:4]
+        start = max(lnum - 1 - context // 2, 0)
         end = start + context
-        lines = ulinecache.getlines(file)[start:end]
-        buf = list(records[i])
-        buf[LNUM_POS] = lnum
-        buf[INDEX_POS] = lnum - 1 - start
-        buf[LINES_POS] = lines
-        records[i] = tuple(buf)
-    return records[tb_offset:]
+        lines = source_cache.getlines(frame.f_code.co_filename,
+                                      frame.f_globals)[start:end]
+        records[i] = (frame, filename, lnum, func, lines, lnum - 1 - start)
+    return records
+
+
+_ipython_input_re = re.compile(r'^<ipython-input-(\d+)-')
+
+def _execution_count(filename):
+    """The prompt number for code typed in IPython, or None for a real file."""
+    match = _ipython_input_re.match(filename)
+    return int(match.group(1)) if match else None
+
+
+def _walk_tb(etb):
+    """Yield etb and the traceback objects following it."""
+    while etb is not None:
+        yield etb
+        etb = etb.tb_next
 
 # Helper function -- largely belongs to VerboseTB, but we need the same
 # functionality to produce a pseudo verbose TB for SyntaxErrors, so that they
@@ -389,7 +682,8 @@ def _fixed_getinnerframes(etb, context=1, tb_offset=0):
 _parser = PyColorize.Parser()
 
 
-def _format_traceback_lines(lnum, index, lines, Colors, lvals=None, scheme=None):
+def _format_traceback_lines(lnum, index, lines, Colors, lvals=None, scheme=None,
+                            filename=None):
     numbers_width = INDENT_SIZE - 1
     res = []
     i = lnum - index
@@ -402,13 +696,11 @@ def _format_traceback_lines(lnum, index, lines, Colors, lvals=None, scheme=None)
         else:
             scheme = DEFAULT_SCHEME
 
-    _line_format = _parser.format2
-
     for line in lines:
         line = py3compat.cast_unicode(line)
 
-        new_line, err = _line_format(line, 'str', scheme)
-        if not err: line = new_line
+        new_line = source_cache.colorize(filename, line, scheme)
+        if new_line is not None: line = new_line
 
         if i == lnum:
             # This is the line with the error
@@ -811,18 +1103,24 @@ class VerboseTB(TBTools):
 
     def __init__(self, color_scheme='Linux', call_pdb=False, ostream=None,
                  tb_offset=0, long_header=False, include_vars=True,
-                 check_cache=None, debugger_cls = None):
+                 check_cache=None, debugger_cls = None, max_frames=0):
         """Specify traceback offset, headers and color scheme.
 
         Define how many frames to drop from the tracebacks. Calling it with
         tb_offset=1 allows use of this handler in interpreters which will have
         their own code at the top of the traceback (VerboseTB will first
-        remove that frame before printing the traceback info)."""
+        remove that frame before printing the traceback info).
+
+        If max_frames is positive, tracebacks deeper than that show only the
+        first and last max_frames/2 frames, with a one line summary of the
+        frames in between."""
         TBTools.__init__(self, color_scheme=color_scheme, call_pdb=call_pdb,
                          ostream=ostream)
         self.tb_offset = tb_offset
         self.long_header = long_header
         self.include_vars = include_vars
+        self.max_frames = max_frames
+        self.repr_limiter = ReprLimiter()
         # By default we use linecache.checkcache, but the user can provide a
         # different check_cache implementation.  This is used by the IPython
         # kernel to provide tracebacks for interactive code that is cached,
@@ -839,7 +1137,10 @@ def format_records(self, records, last_unique, recursion_repeat):
         frames = []
         for r in records[:last_unique+recursion_repeat+1]:
             #print '*** record:',file,lnum,func,lines,index  # dbg
-            frames.append(self.format_record(*r))
+            if isinstance(r, SkippedFrames):
+                frames.append(self.format_skipped(r))
+            else:
+                frames.append(self.format_record(*r))
 
         if recursion_repeat:
             frames.append('... last %d frames repeated, from the frame below ...\n' % recursion_repeat)
@@ -847,6 +1148,11 @@ def format_records(self, records, last_unique, recursion_repeat):
 
         return frames
 
+    def format_skipped(self, skipped):
+        """Format the summary standing for frames left out by max_frames"""
+        Colors = self.Colors
+        return '%s%s%s\n' % (Colors.em, skipped.summary(), Colors.Normal)
+
     def format_record(self, frame, file, lnum, func, lines, index):
         """Format a single stack frame"""
         Colors = self.Colors  # just a shorthand + quicker name lookup
@@ -880,16 +1186,7 @@ def format_record(self, frame, file, lnum, func, lines, index):
         elif not os.path.isabs(file):
             # Try to make the filename absolute by trying all
             # sys.path entries (which is also what linecache does)
-            for dirname in sys.path:
-                try:
-                    fullname = os.path.join(dirname, file)
-                    if os.path.isfile(fullname):
-                        file = os.path.abspath(fullname)
-                        break
-                except Exception:
-                    # Just in case that sys.path contains very
-                    # strange entries...
-                    pass
+            file = source_cache.resolve(file)
 
         file = py3compat.cast_unicode(file, util_path.fs_encoding)
         link = tpl_link % file
@@ -899,7 +1196,11 @@ def format_record(self, frame, file, lnum, func, lines, index):
             call = ''
         else:
             # Decide whether to include variable details or not
-            var_repr = self.include_vars and eqrepr or nullrepr
+            if self.include_vars:
+                var_repr = lambda value: eqrepr(value, lambda v:
+                                                self.repr_limiter(v, text_repr))
+            else:
+                var_repr = nullrepr
             try:
                 call = tpl_call % (func, inspect.formatargvalues(args,
                                                                  varargs, varkw,
@@ -936,55 +1237,9 @@ def format_record(self, frame, file, lnum, func, lines, index):
                 # E.g. https://github.com/ipython/ipython/issues/9486
                 return '%s %s\n' % (link, call)
 
-        def linereader(file=file, lnum=[lnum], getline=ulinecache.getline):
-            line = getline(file, lnum[0])
-            lnum[0] += 1
-            return line
-
         # Build the list of names on this line of code where the exception
         # occurred.
-        try:
-            names = []
-            name_cont = False
-
-            for token_type, token, start, end, line in generate_tokens(linereader):
-                # build composite names
-                if token_type == tokenize.NAME and token not in keyword.kwlist:
-                    if name_cont:
-                        # Continuation of a dotted name
-                        try:
-                            names[-1].append(token)
-                        except IndexError:
-                            names.append([token])
-                        name_cont = False
-                    else:
-                        # Regular new names.  We append everything, the caller
-                        # will be responsible for pruning the list later.  It's
-                        # very tricky to try to prune as we go, b/c composite
-                        # names can fool us.  The pruning at the end is easy
-                        # to do (or the caller can print a list with repeated
-                        # names if so desired.
-                        names.append([token])
-                elif token == '.':
-                    name_cont = True
-                elif token_type == tokenize.NEWLINE:
-                    break
-
-        except (IndexError, UnicodeDecodeError, SyntaxError):
-            # signals exit of tokenizer
-            # SyntaxError can occur if the file is not actually Python
-            #  - see gh-6300
-            pass
-        except tokenize.TokenError as msg:
-            _m = ("An unexpected error occurred while tokenizing input\n"
-                  "The following traceback may be corrupted or invalid\n"
-                  "The error message is: %s\n" % msg)
-            error(_m)
-
-        # Join composite names (e.g. "dict.fromkeys")
-        names = ['.'.join(n) for n in names]
-        # prune names list of duplicates, but keep the right order
-        unique_names = uniq_stable(names)
+        unique_names = source_cache.names(file, lnum, frame.f_globals)
 
         # Start loop over vars
         lvals = []
@@ -994,7 +1249,7 @@ def linereader(file=file, lnum=[lnum], getline=ulinecache.getline):
                 if name_base in frame.f_code.co_varnames:
                     if name_base in locals:
                         try:
-                            value = repr(eval(name_full, locals))
+                            value = self.repr_limiter(eval(name_full, locals))
                         except:
                             value = undefined
                     else:
@@ -1003,7 +1258,7 @@ def linereader(file=file, lnum=[lnum], getline=ulinecache.getline):
                 else:
                     if name_base in frame.f_globals:
                         try:
-                            value = repr(eval(name_full, frame.f_globals))
+                            value = self.repr_limiter(eval(name_full, frame.f_globals))
                         except:
                             value = undefined
                     else:
@@ -1022,7 +1277,7 @@ def linereader(file=file, lnum=[lnum], getline=ulinecache.getline):
         else:
             return '%s%s' % (level, ''.join(
                 _format_traceback_lines(lnum, index, lines, Colors, lvals,
-                                        col_scheme)))
+                                        col_scheme, file)))
 
     def prepare_chained_exception_message(self, cause):
         direct_cause = "\nThe above exception was the direct cause of the following exception:\n"
@@ -1105,14 +1360,20 @@ def format_exception_as_a_whole(self, etype, evalue, etb, number_of_lines_of_con
 
         tb_offset = self.tb_offset if tb_offset is None else tb_offset
         head = self.prepare_header(etype, self.long_header)
-        records = self.get_records(etb, number_of_lines_of_context, tb_offset)
+        with source_cache.single_check():
+            records = self.get_records(etb, number_of_lines_of_context,
+                                       tb_offset)
 
-        if records is None:
-            return ""
+            if records is None:
+                return ""
 
-        last_unique, recursion_repeat = find_recursion(orig_etype, evalue, records)
+            if any(isinstance(r, SkippedFrames) for r in records):
+                # Repeats were already summarized while walking the traceback
+                last_unique, recursion_repeat = len(records), 0
+            else:
+                last_unique, recursion_repeat = find_recursion(orig_etype, evalue, records)
 
-        frames = self.format_records(records, last_unique, recursion_repeat)
+            frames = self.format_records(records, last_unique, recursion_repeat)
 
         formatted_exception = self.format_exception(etype, evalue)
         if records:
@@ -1129,7 +1390,8 @@ def get_records(self, etb, number_of_lines_of_context, tb_offset):
             # Try the default getinnerframes and Alex's: Alex's fixes some
             # problems, but it generates empty tracebacks for console errors
             # (5 blanks lines) where none should be returned.
-            return _fixed_getinnerframes(etb, number_of_lines_of_context, tb_offset)
+            return _fixed_getinnerframes(etb, number_of_lines_of_context,
+                                         tb_offset, self.max_frames)
         except:
             # FIXME: I've been getting many crash reports from python 2.3
             # users, traceable to inspect.py.  If I can find a small test-case
@@ -1156,10 +1418,94 @@ def get_chained_exception(exception_value):
         if chained_evalue:
             return chained_evalue.__class__, chained_evalue, chained_evalue.__traceback__
 
+    def exception_record(self, etype, evalue, etb, tb_offset=None,
+                         number_of_lines_of_context=5, include_locals=False):
+        """Return a JSON-serializable description of an exception.
+
+        The record is a dict with the exception type (``ename``, ``module``)
+        and message (``evalue``), the list of ``frames``, and on Python 3 the
+        record of the exception it was raised from (``cause``) or while
+        handling (``context``).  Each frame has the ``filename``, ``lineno``
+        and ``function``, the ``source`` lines around the error starting at
+        ``source_start``, and the ``execution_count`` of the cell for code
+        typed at the IPython prompt.  If include_locals is True, frames other
+        than module level ones also get the bounded reprs of their
+        ``locals``.  Frames left out by max_frames are summarized in an entry
+        with ``skipped`` and ``functions`` keys.
+
+        ``timestamp`` and ``record_time`` give the time the record was built
+        and how long that took, in seconds.
+        """
+        start = time.time()
+        tb_offset = self.tb_offset if tb_offset is None else tb_offset
+        self.repr_limiter.slow_types.clear()
+        with source_cache.single_check():
+            record = self._exception_record(etype, evalue, etb, tb_offset,
+                                            number_of_lines_of_context,
+                                            include_locals, set())
+        record['timestamp'] = start
+        record['record_time'] = time.time() - start
+        return record
+
+    def _exception_record(self, etype, evalue, etb, tb_offset, context,
+                          include_locals, seen):
+        seen.add(id(evalue))
+        records = _fixed_getinnerframes(etb, context, tb_offset,
+                                        self.max_frames) if etb else []
+        try:
+            evalue_str = py3compat.cast_unicode(str(evalue))
+        except Exception:
+            evalue_str = u'<unprintable %s object>' % type(evalue).__name__
+        record = {
+            'ename': py3compat.cast_unicode(getattr(etype, '__name__', str(etype))),
+            'module': getattr(etype, '__module__', None),
+            'evalue': evalue_str,
+            'frames': [self._frame_record(r, include_locals) for r in records],
+        }
+        # Chained exceptions, from the Python 3 exception itself
+        cause = getattr(evalue, '__cause__', None)
+        if cause is None and not getattr(evalue, '__suppress_context__', False):
+            key, chained = 'context', getattr(evalue, '__context__', None)
+        else:
+            key, chained = 'cause', cause
+        if chained is not None and id(chained) not in seen:
+            record[key] = self._exception_record(
+                type(chained), chained, chained.__traceback__, 0, context,
+                include_locals, seen)
+        return record
+
+    def _frame_record(self, record, include_locals):
+        if isinstance(record, SkippedFrames):
+            return {
+                'skipped': record.count,
+                'functions': [[name, py3compat.cast_unicode_py2(filename, "utf-8"), n]
+                              for (name, filename), n in record.functions.items()],
+            }
+        frame, filename, lnum, func, lines, index = record
+        filename = py3compat.cast_unicode_py2(filename, "utf-8")
+        frame_record = {
+            'filename': filename,
+            'lineno': lnum,
+            'function': py3compat.cast_unicode_py2(func, "utf-8"),
+            'source': [py3compat.cast_unicode(l) for l in lines or []],
+            'source_start': None if index is None else lnum - index,
+            'execution_count': _execution_count(frame.f_code.co_filename),
+        }
+        if include_locals and frame.f_locals is not frame.f_globals:
+            locals_ = {}
+            for name, value in frame.f_locals.items():
+                try:
+                    locals_[name] = self.repr_limiter(value, text_repr)
+                except Exception:
+                    locals_[name] = u'<unprintable %s object>' % type(value).__name__
+            frame_record['locals'] = locals_
+        return frame_record
+
     def structured_traceback(self, etype, evalue, etb, tb_offset=None,
                              number_of_lines_of_context=5):
         """Return a nice text document describing the traceback."""
 
+        self.repr_limiter.slow_types.clear()
         formatted_exception = self.format_exception_as_a_whole(etype, evalue, etb, number_of_lines_of_context,
                                                                tb_offset)
 
@@ -1266,6 +1612,22 @@ def __call__(self, etype=None, evalue=None, etb=None):
             print("\nKeyboardInterrupt")
 
 
+class ExceptionRecordWriter(object):
+    """Append exception records to a file, one JSON document per line.
+
+    Instances are callables taking the record, suitable for the
+    ``exception_recorded`` event.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def __call__(self, record):
+        line = json.dumps(record, sort_keys=True)
+        with io.open(self.filename, 'a', encoding='utf-8') as f:
+            f.write(py3compat.cast_unicode(line) + u'\n')
+
+
 #----------------------------------------------------------------------------
 class FormattedTB(VerboseTB, ListTB):
     """Subclass ListTB but allow calling with a traceback.
@@ -1277,12 +1639,19 @@ class FormattedTB(VerboseTB, ListTB):
     Allows a tb_offset to be specified. This is useful for situations where
     one needs to remove a number of topmost frames from the traceback (such as
     occurs with python programs that themselves execute other python code,
-    like Python shells).  """
+    like Python shells).
+
+    If deferred is True, the 'Context' and 'Verbose' modes print the cheap
+    'Plain' traceback followed by `deferred_hint`, and leave it to the user
+    to ask for the expensive form afterwards."""
+
+    deferred_hint = 'Use %tb for the full traceback, %tb -v to include local variables.'
 
     def __init__(self, mode='Plain', color_scheme='Linux', call_pdb=False,
                  ostream=None,
                  tb_offset=0, long_header=False, include_vars=False,
-                 check_cache=None, debugger_cls=None):
+                 check_cache=None, debugger_cls=None, max_frames=0,
+                 deferred=False):
 
         # NEVER change the order of this list. Put new modes at the end:
         self.valid_modes = ['Plain', 'Context', 'Verbose']
@@ -1291,7 +1660,9 @@ def __init__(self, mode='Plain', color_scheme='Linux', call_pdb=False,
         VerboseTB.__init__(self, color_scheme=color_scheme, call_pdb=call_pdb,
                            ostream=ostream, tb_offset=tb_offset,
                            long_header=long_header, include_vars=include_vars,
-                           check_cache=check_cache, debugger_cls=debugger_cls)
+                           check_cache=check_cache, debugger_cls=debugger_cls,
+                           max_frames=max_frames)
+        self.deferred = deferred
 
         # Different types of tracebacks are joined with different separators to
         # form a single string.  They are taken from this dict
@@ -1308,7 +1679,7 @@ def _extract_tb(self, tb):
     def structured_traceback(self, etype, value, tb, tb_offset=None, number_of_lines_of_context=5):
         tb_offset = self.tb_offset if tb_offset is None else tb_offset
         mode = self.mode
-        if mode in self.verbose_modes:
+        if mode in self.verbose_modes and not self.deferred:
             # Verbose modes need a full traceback
             return VerboseTB.structured_traceback(
                 self, etype, value, tb, tb_offset, number_of_lines_of_context
@@ -1319,9 +1690,13 @@ def structured_traceback(self, etype, value, tb, tb_offset=None, number_of_lines
             self.check_cache()
             # Now we can extract and format the exception
             elist = self._extract_tb(tb)
-            return ListTB.structured_traceback(
+            stb = ListTB.structured_traceback(
                 self, etype, value, elist, tb_offset, number_of_lines_of_context
             )
+            if mode in self.verbose_modes:
+                # Deferred: the parts of a Plain traceback are joined with ''
+                stb = [''.join(stb), self.deferred_hint]
+            return stb
 
     def stb2text(self, stb):
         """Convert a structured traceback (a list) to a string."""
@@ -1492,3 +1867,33 @@ def eqrepr(value, repr=text_repr):
 
 def nullrepr(value, repr=text_repr):
     return ''
+
+
+class ReprLimiter(object):
+    """repr() for the variables shown in a traceback, bounded in size and time.
+
+    Reprs longer than max_chars are cut short.  Python can't interrupt a
+    __repr__ that is already running, so the time limit works per type:
+    once the repr of a value took longer than time_limit seconds, other
+    values of the same type are shown as a placeholder.  Either limit can be
+    disabled by setting it to 0.
+    """
+
+    def __init__(self, max_chars=2000, time_limit=0.5):
+        self.max_chars = max_chars
+        self.time_limit = time_limit
+        self.slow_types = set()
+
+    def __call__(self, value, repr=repr):
+        typ = type(value)
+        if typ in self.slow_types:
+            return '<%s object, repr skipped as too slow>' % typ.__name__
+        start = time.time()
+        try:
+            text = repr(value)
+        finally:
+            if self.time_limit and time.time() - start > self.time_limit:
+                self.slow_types.add(typ)
+        if self.max_chars and len(text) > self.max_chars:
+            text = text[:self.max_chars] + '...'
+        return text
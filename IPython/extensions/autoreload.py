@@ -60,6 +60,21 @@
 
     Mark module 'foo' to not be autoreloaded.
 
+Change detection
+================
+
+Rather than stat()ing every imported module before each cell, the reloader
+asks a change-detection backend which source files were modified. On Linux
+the backend uses inotify; elsewhere a background thread polls the module
+files, and only the directories are stat'ed before each cell. Set
+``c.AutoreloadMagics.watcher`` to ``'inotify'``, ``'poll'`` or ``'stat'``
+(stat every module on every check, as older versions did) to choose one
+explicitly.
+
+Modules that changed together are reloaded in dependency order, so that a
+module is reloaded after the modules it imports. Set
+``c.AutoreloadMagics.verbose = True`` to print each reload and its duration.
+
 Caveats
 =======
 
@@ -107,8 +122,13 @@
 # Imports
 #-----------------------------------------------------------------------------
 
+import ast
+import errno
 import os
+import struct
 import sys
+import threading
+import time
 import traceback
 import types
 import weakref
@@ -120,7 +140,296 @@
     from imp import reload
 
 from IPython.utils import openpy
-from IPython.utils.py3compat import PY3
+from IPython.utils.py3compat import PY3, cast_bytes, cast_unicode
+
+#------------------------------------------------------------------------------
+# Change detection
+#------------------------------------------------------------------------------
+
+class StatWatcher(object):
+    """Change-detection backend that tracks nothing.
+
+    :meth:`changed` always returns None, so the reloader stats every module
+    on every check.
+    """
+
+    def watch(self, filename):
+        pass
+
+    def changed(self):
+        return None
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(object):
+    """Change-detection backend using Linux's inotify.
+
+    One inotify watch is placed on each directory holding a module, and
+    :meth:`changed` drains the pending events without blocking. Raises
+    OSError or AttributeError if inotify is not available.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_CLOEXEC = 0o2000000
+    IN_NONBLOCK = 0o4000
+
+    mask = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+            | IN_DELETE)
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno=True)
+        fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._libc = libc
+        self._fd = fd
+        self._encoding = sys.getfilesystemencoding()
+        # directory -> watch descriptor (None if it could not be watched)
+        self._dirs = {}
+        # watch descriptor -> directory
+        self._wds = {}
+        # absolute path -> filename as given to watch()
+        self._files = {}
+        # Files in directories we could not watch; reported on every call.
+        self._unwatched = set()
+
+    def watch(self, filename):
+        path = os.path.abspath(filename)
+        if path in self._files:
+            return
+        self._files[path] = filename
+        directory = os.path.dirname(path)
+        if directory not in self._dirs:
+            wd = self._libc.inotify_add_watch(
+                self._fd, cast_bytes(directory, self._encoding), self.mask)
+            if wd < 0:
+                wd = None
+            else:
+                self._wds[wd] = directory
+            self._dirs[directory] = wd
+        if self._dirs[directory] is None:
+            self._unwatched.add(filename)
+
+    def changed(self):
+        changed = set(self._unwatched)
+        overflow = False
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = struct.unpack_from('iIII', data,
+                                                              offset)
+                offset += 16
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & self.IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                directory = self._wds.get(wd)
+                if directory is None:
+                    continue
+                if mask & self.IN_IGNORED:
+                    # The directory went away; stat() its files instead.
+                    del self._wds[wd]
+                    self._dirs[directory] = None
+                    for path, filename in self._files.items():
+                        if os.path.dirname(path) == directory:
+                            self._unwatched.add(filename)
+                            changed.add(filename)
+                    continue
+                path = os.path.join(directory,
+                                    cast_unicode(name, self._encoding))
+                if path in self._files:
+                    changed.add(self._files[path])
+        if overflow:
+            return None
+        return changed
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __del__(self):
+        self.close()
+
+
+class PollingWatcher(object):
+    """Change-detection backend that polls from a background thread.
+
+    Every `interval` seconds the thread stats the watched files, one
+    directory at a time, and queues the ones whose mtime changed.
+
+    So that a file saved just before a check is not missed, `changed` also
+    stats the watched directories. Saving a file by replacing it, as most
+    editors do, moves the mtime of its directory, and the files of those
+    directories are polled at once. If the last poll is older than
+    `interval`, all the files are polled.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._lock = threading.Lock()
+        # directory -> {filename: mtime}
+        self._dirs = {}
+        # directory -> its own mtime when it was last polled
+        self._dir_mtimes = {}
+        self._changed = set()
+        self._polled = time.time()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run,
+                                        name='autoreload-poller')
+        self._thread.daemon = True
+        self._thread.start()
+
+    @staticmethod
+    def _mtime(filename):
+        try:
+            return os.stat(filename).st_mtime
+        except OSError:
+            return None
+
+    def watch(self, filename):
+        directory = os.path.dirname(filename)
+        with self._lock:
+            files = self._dirs.get(directory)
+            if files is None:
+                files = self._dirs[directory] = {}
+                self._dir_mtimes[directory] = self._mtime(directory)
+            elif filename in files:
+                return
+            files[filename] = self._mtime(filename)
+
+    def poll(self, directories=None):
+        """Stat every watched file once, or those in `directories`, queueing
+        those that changed."""
+        started = time.time()
+        full = directories is None
+        with self._lock:
+            if full:
+                directories = list(self._dirs)
+            dirs = [(d, list(self._dirs[d].items())) for d in directories]
+        for directory, files in dirs:
+            # Before the files, so that a later change moves it again
+            dir_mtime = self._mtime(directory)
+            if dir_mtime is None:
+                mtimes = dict.fromkeys((f for f, _ in files), None)
+            else:
+                mtimes = dict((f, self._mtime(f)) for f, _ in files)
+            changed = [f for f, mtime in files if mtimes[f] != mtime]
+            with self._lock:
+                self._dir_mtimes[directory] = dir_mtime
+                watched = self._dirs[directory]
+                for f in changed:
+                    watched[f] = mtimes[f]
+                self._changed.update(changed)
+        if full:
+            self._polled = started
+
+    def changed(self):
+        if time.time() - self._polled > self.interval:
+            self.poll()
+        else:
+            with self._lock:
+                dirs = list(self._dir_mtimes.items())
+            moved = [d for d, mtime in dirs if self._mtime(d) != mtime]
+            if moved:
+                self.poll(moved)
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        return changed
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                pass
+
+    def close(self):
+        self._stopped.set()
+
+
+def default_watcher():
+    """Return the best change-detection backend available here."""
+    try:
+        return InotifyWatcher()
+    except (OSError, AttributeError):
+        return PollingWatcher()
+
+#------------------------------------------------------------------------------
+# Import dependencies
+#------------------------------------------------------------------------------
+
+if PY3:
+    class_types = (type,)
+else:
+    class_types = (type, types.ClassType)
+
+
+def _module_package(module):
+    """Return the package relative imports in `module` are resolved from"""
+    package = getattr(module, '__package__', None)
+    if package is not None:
+        return package
+    name = getattr(module, '__name__', '')
+    if hasattr(module, '__path__'):
+        return name
+    return name.rpartition('.')[0]
+
+
+def source_imports(filename, package=''):
+    """Return the absolute names of the modules imported by a source file.
+
+    ``from a import b`` yields both ``a`` and ``a.b``, since ``b`` may be a
+    submodule. Relative imports are resolved against `package`.
+    """
+    try:
+        with open(filename, 'rb') as f:
+            tree = ast.parse(f.read(), filename)
+    except (IOError, OSError, SyntaxError, ValueError, TypeError):
+        return set()
+
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                parts = alias.name.split('.')
+                for i in range(1, len(parts) + 1):
+                    names.add('.'.join(parts[:i]))
+        elif isinstance(node, ast.ImportFrom):
+            level = getattr(node, 'level', 0) or 0
+            if level:
+                base = package.rsplit('.', level - 1)[0] if package else ''
+                if not base:
+                    continue
+                module = base + '.' + node.module if node.module else base
+            else:
+                module = node.module
+            names.add(module)
+            for alias in node.names:
+                names.add(module + '.' + alias.name)
+    return names
 
 #------------------------------------------------------------------------------
 # Autoreload functionality
@@ -133,7 +442,16 @@ class ModuleReloader(object):
     check_all = True
     """Autoreload all modules, not just those listed in 'modules'"""
 
-    def __init__(self):
+    verbose = False
+    """Print each reloaded module and the time its reload took"""
+
+    def __init__(self, watcher=None):
+        # Change-detection backend; see StatWatcher for the interface.
+        self.watcher = watcher if watcher is not None else StatWatcher()
+        # Source files reported changed but not yet checked
+        self._dirty = set()
+        # module-name -> (id(module), source filename), for watched modules
+        self._sources = {}
         # Modules that failed to reload: {module: mtime-on-failed-reload, ...}
         self.failed = {}
         # Modules specially marked as autoreloadable.
@@ -144,6 +462,10 @@ def __init__(self):
         self.old_objects = {}
         # Module modification timestamps
         self.modules_mtimes = {}
+        # module-name -> ((filename, mtime), imported module names)
+        self._deps = {}
+        # [(module-name, seconds), ...] for the last batch of reloads
+        self.reload_times = []
 
         # Cache module modification times
         self.check(check_all=True, do_reload=False)
@@ -182,24 +504,29 @@ def aimport_module(self, module_name):
         top_module = sys.modules[top_name]
         return top_module, top_name
 
-    def filename_and_mtime(self, module):
+    def source_filename(self, module):
+        """Return the .py file a reloadable module was loaded from, or None"""
         if not hasattr(module, '__file__') or module.__file__ is None:
-            return None, None
+            return None
 
         if getattr(module, '__name__', None) == '__main__':
             # we cannot reload(__main__)
-            return None, None
+            return None
 
         filename = module.__file__
         path, ext = os.path.splitext(filename)
 
         if ext.lower() == '.py':
-            py_filename = filename
-        else:
-            try:
-                py_filename = openpy.source_from_cache(filename)
-            except ValueError:
-                return None, None
+            return filename
+        try:
+            return openpy.source_from_cache(filename)
+        except ValueError:
+            return None
+
+    def filename_and_mtime(self, module):
+        py_filename = self.source_filename(module)
+        if py_filename is None:
+            return None, None
 
         try:
             pymtime = os.stat(py_filename).st_mtime
@@ -219,6 +546,9 @@ def check(self, check_all=False, do_reload=True):
         else:
             modules = list(self.modules.keys())
 
+        modules = self._changed_modules(modules)
+
+        batch = []
         for modname in modules:
             m = sys.modules.get(modname, None)
 
@@ -243,14 +573,131 @@ def check(self, check_all=False, do_reload=True):
 
             # If we've reached this point, we should try to reload the module
             if do_reload:
-                try:
-                    superreload(m, reload, self.old_objects)
-                    if py_filename in self.failed:
-                        del self.failed[py_filename]
-                except:
-                    print("[autoreload of %s failed: %s]" % (
-                            modname, traceback.format_exc(1)), file=sys.stderr)
-                    self.failed[py_filename] = pymtime
+                batch.append((modname, m, py_filename, pymtime))
+
+        if batch:
+            self.reload_batch(batch)
+
+    def reload_batch(self, batch):
+        """Reload changed modules, dependencies first.
+
+        `batch` is a list of (module-name, module, filename, mtime) tuples.
+        """
+        modules = dict((item[0], item) for item in batch)
+        self.reload_times = []
+        for modname in self.reload_order([item[0] for item in batch]):
+            _, m, py_filename, pymtime = modules[modname]
+            start = time.time()
+            try:
+                superreload(m, reload, self.old_objects)
+                if py_filename in self.failed:
+                    del self.failed[py_filename]
+            except:
+                print("[autoreload of %s failed: %s]" % (
+                        modname, traceback.format_exc(1)), file=sys.stderr)
+                self.failed[py_filename] = pymtime
+            elapsed = time.time() - start
+            self.reload_times.append((modname, elapsed))
+            if self.verbose:
+                print("[autoreloaded %s in %.3fs]" % (modname, elapsed))
+        self.prune_old_objects()
+
+    def reload_order(self, modnames):
+        """Sort `modnames` so that each module follows the ones it imports.
+
+        Modules in an import cycle are ordered by which one the walk reaches
+        first, which follows the order of `modnames`.
+        """
+        if len(modnames) < 2:
+            return list(modnames)
+        batch = set(modnames)
+        order = []
+        seen = set()
+
+        def visit(modname):
+            seen.add(modname)
+            for dep in sorted(self.dependencies(modname) & batch):
+                if dep not in seen:
+                    visit(dep)
+            order.append(modname)
+
+        for modname in modnames:
+            if modname not in seen:
+                visit(modname)
+        return order
+
+    def dependencies(self, modname):
+        """Return the names of the loaded modules `modname` depends on.
+
+        These are the modules whose objects appear in its globals and those
+        imported by its source, which is parsed again only when it changes.
+        """
+        m = sys.modules.get(modname, None)
+        stamp = self.filename_and_mtime(m)
+        cached = self._deps.get(modname)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        deps = set()
+        for value in list(getattr(m, '__dict__', {}).values()):
+            if isinstance(value, types.ModuleType):
+                name = getattr(value, '__name__', None)
+            elif isinstance(value, class_types + (types.FunctionType,)):
+                name = getattr(value, '__module__', None)
+            else:
+                continue
+            if isinstance(name, str):
+                deps.add(name)
+        if stamp[0] is not None:
+            deps.update(source_imports(stamp[0], _module_package(m)))
+        deps.discard(modname)
+        deps = frozenset(name for name in deps if name in sys.modules)
+        self._deps[modname] = (stamp, deps)
+        return deps
+
+    def prune_old_objects(self):
+        """Drop references to old objects that have been garbage collected"""
+        old_objects = self.old_objects
+        for key, refs in list(old_objects.items()):
+            live = [ref for ref in refs if ref() is not None]
+            if not live:
+                del old_objects[key]
+            elif len(live) != len(refs):
+                old_objects[key] = live
+
+    def _changed_modules(self, modules):
+        """Narrow `modules` down to those whose source may have changed.
+
+        Modules seen for the first time are always returned, so that their
+        mtime gets recorded, and start being watched.
+        """
+        changed = self.watcher.changed()
+        if changed is None:
+            # Either stat() is the backend, or it lost track of events.
+            self._dirty.clear()
+            return modules
+        dirty = self._dirty
+        dirty.update(changed)
+
+        candidates = []
+        checked = []
+        for modname in modules:
+            if modname in self.skip_modules:
+                # keep its changes pending in case it is re-enabled
+                continue
+            m = sys.modules.get(modname, None)
+            source = self._sources.get(modname)
+            if source is None or source[0] != id(m):
+                py_filename = self.source_filename(m)
+                self._sources[modname] = (id(m), py_filename)
+                if py_filename is not None:
+                    self.watcher.watch(py_filename)
+                    candidates.append(modname)
+            elif source[1] in dirty:
+                candidates.append(modname)
+                checked.append(source[1])
+        dirty.difference_update(checked)
+        return candidates
 
 #------------------------------------------------------------------------------
 # superreload
@@ -411,15 +858,43 @@ def superreload(module, reload=reload, old_objects={}):
 #------------------------------------------------------------------------------
 
 from IPython.core.magic import Magics, magics_class, line_magic
+from traitlets import Bool, Enum, observe
 
 @magics_class
 class AutoreloadMagics(Magics):
+
+    watcher = Enum(['auto', 'inotify', 'poll', 'stat'], 'auto',
+        help="""How to detect changed modules: 'inotify' (Linux only), 'poll'
+        (a background thread stats module files every second), 'stat' (stat
+        every module before each execution) or 'auto' (inotify where
+        available, polling otherwise)."""
+    ).tag(config=True)
+
+    verbose = Bool(False,
+        help="""Print each module that is reloaded, and how long it took."""
+    ).tag(config=True)
+
     def __init__(self, *a, **kw):
         super(AutoreloadMagics, self).__init__(*a, **kw)
-        self._reloader = ModuleReloader()
+        self._reloader = ModuleReloader(self._make_watcher())
+        self._reloader.verbose = self.verbose
         self._reloader.check_all = False
         self.loaded_modules = set(sys.modules)
 
+    @observe('verbose')
+    def _verbose_changed(self, change):
+        if hasattr(self, '_reloader'):
+            self._reloader.verbose = change['new']
+
+    def _make_watcher(self):
+        if self.watcher == 'inotify':
+            return InotifyWatcher()
+        elif self.watcher == 'poll':
+            return PollingWatcher()
+        elif self.watcher == 'stat':
+            return StatWatcher()
+        return default_watcher()
+
     @line_magic
     def autoreload(self, parameter_s=''):
         r"""%autoreload => Reload modules automatically
@@ -8,19 +8,318 @@
 :file:`ipython_config.py` file::
 
   c.StoreMagics.autorestore = True
+
+Restored variables are loaded from disk the first time they are used. To keep
+variables in a single SQLite file instead of one pickle file per variable, with
+large NumPy arrays saved as ``.npy`` files that are memory-mapped on load, use::
+
+  c.StoreMagics.backend = 'sqlite'
 """
 from __future__ import print_function
 
 # Copyright (c) IPython Development Team.
 # Distributed under the terms of the Modified BSD License.
 
-import inspect, os, sys, textwrap
+import ast, inspect, json, operator, os, sys, textwrap, uuid, zlib
+from io import BytesIO
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    from reprlib import repr as short_repr
+except ImportError:
+    from repr import repr as short_repr
 
 from IPython.core.error import UsageError
 from IPython.core.magic import Magics, magics_class, line_magic
-from traitlets import Bool
-from IPython.utils.py3compat import string_types
-
+from IPython.utils.path import ensure_dir_exists
+from traitlets import Bool, Enum, Integer
+from IPython.utils.py3compat import PY3, string_types
+
+#-----------------------------------------------------------------------------
+# Storage backends
+#-----------------------------------------------------------------------------
+
+class PickleShareStore(object):
+    """Stored variables kept in IPython's database, one pickle file each."""
+
+    prefix = 'autorestore/'
+
+    def __init__(self, db):
+        self.db = db
+
+    def keys(self):
+        return sorted(os.path.basename(key)
+                      for key in self.db.keys(self.prefix + '*'))
+
+    def __contains__(self, name):
+        # Checking the key itself would unpickle the value
+        return name in self.keys()
+
+    def load(self, name):
+        return self.db[self.prefix + name]
+
+    def save(self, name, obj):
+        self.db[self.prefix + name] = obj
+
+    def delete(self, name):
+        del self.db[self.prefix + name]
+
+    def clear(self):
+        for key in self.db.keys(self.prefix + '*'):
+            del self.db[key]
+
+    def summary(self, name):
+        return repr(self.db.get(self.prefix + name, '<unavailable>'))
+
+
+class SQLiteStore(object):
+    """Stored variables kept in a single SQLite file.
+
+    Pickles can be zlib-compressed. NumPy arrays of at least
+    `array_threshold` bytes are written next to the database as ``.npy``
+    files, outside the pickle, and memory-mapped (copy-on-write) on load.
+    """
+
+    def __init__(self, path, compress=False, array_threshold=1 << 20):
+        self.path = path
+        self.array_dir = os.path.splitext(path)[0] + '_arrays'
+        self.compress = compress
+        self.array_threshold = array_threshold
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            import sqlite3
+            ensure_dir_exists(os.path.dirname(self.path))
+            self._conn = sqlite3.connect(self.path)
+            with self._conn:
+                self._conn.execute("CREATE TABLE IF NOT EXISTS variables "
+                    "(name TEXT PRIMARY KEY, data BLOB, compressed INTEGER, "
+                    "arrays TEXT, summary TEXT)")
+        return self._conn
+
+    def keys(self):
+        cur = self.conn.execute("SELECT name FROM variables ORDER BY name")
+        return [row[0] for row in cur]
+
+    def __contains__(self, name):
+        return self._get(name, 'name') is not None
+
+    def _get(self, name, columns):
+        cur = self.conn.execute("SELECT %s FROM variables WHERE name=?"
+                                % columns, (name,))
+        return cur.fetchone()
+
+    def load(self, name):
+        row = self._get(name, 'data, compressed')
+        if row is None:
+            raise KeyError(name)
+        data = bytes(row[0])
+        try:
+            if row[1]:
+                data = zlib.decompress(data)
+            unpickler = pickle.Unpickler(BytesIO(data))
+            unpickler.persistent_load = self._load_array
+            return unpickler.load()
+        except Exception:
+            raise KeyError(name)
+
+    def save(self, name, obj):
+        import sqlite3
+        arrays = []
+        buf = BytesIO()
+        pickler = pickle.Pickler(buf, pickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = lambda o: self._save_array(name, o, arrays)
+        try:
+            pickler.dump(obj)
+        except:
+            self._remove_arrays(arrays)
+            raise
+        data = buf.getvalue()
+        if self.compress:
+            data = zlib.compress(data)
+        try:
+            summary = short_repr(obj)
+        except Exception:
+            summary = '<%s>' % type(obj).__name__
+
+        old_arrays = self._arrays(name)
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO variables "
+                              "VALUES (?, ?, ?, ?, ?)",
+                (name, sqlite3.Binary(data), int(self.compress),
+                 json.dumps(arrays), summary))
+        self._remove_arrays(old_arrays)
+
+    def delete(self, name):
+        arrays = self._arrays(name)
+        with self.conn:
+            cur = self.conn.execute("DELETE FROM variables WHERE name=?",
+                                    (name,))
+        if not cur.rowcount:
+            raise KeyError(name)
+        self._remove_arrays(arrays)
+
+    def clear(self):
+        for name in self.keys():
+            self.delete(name)
+
+    def summary(self, name):
+        row = self._get(name, 'summary')
+        return '<unavailable>' if row is None else row[0]
+
+    def _arrays(self, name):
+        row = self._get(name, 'arrays')
+        return json.loads(row[0]) if row is not None and row[0] else []
+
+    def _remove_arrays(self, arrays):
+        for filename in arrays:
+            try:
+                os.remove(os.path.join(self.array_dir, filename))
+            except OSError:
+                # e.g. still memory-mapped on Windows
+                pass
+
+    def _save_array(self, name, obj, arrays):
+        numpy = sys.modules.get('numpy')
+        if (numpy is None
+                or type(obj) not in (numpy.ndarray, numpy.memmap)
+                or obj.dtype.hasobject
+                or obj.nbytes < self.array_threshold):
+            return None
+        ensure_dir_exists(self.array_dir)
+        filename = '%s-%s.npy' % (name, uuid.uuid4().hex[:12])
+        numpy.save(os.path.join(self.array_dir, filename), obj,
+                   allow_pickle=False)
+        arrays.append(filename)
+        return 'npy:' + filename
+
+    def _load_array(self, pid):
+        if not pid.startswith('npy:'):
+            raise pickle.UnpicklingError("unsupported persistent id %r" % pid)
+        import numpy
+        return numpy.load(os.path.join(self.array_dir, pid[4:]),
+                          mmap_mode='c')
+
+#-----------------------------------------------------------------------------
+# Lazy restoring
+#-----------------------------------------------------------------------------
+
+_unset = object()
+
+class LazyVariable(object):
+    """Placeholder for a stored variable, which loads it on first use.
+
+    Once loaded, the value replaces the placeholder in the namespace it was
+    restored into. Until then, the placeholder forwards attribute access and
+    the common operators to the value.
+    """
+    __slots__ = ('_lazy_store', '_lazy_name', '_lazy_ns', '_lazy_value')
+
+    def __init__(self, store, name, ns):
+        object.__setattr__(self, '_lazy_store', store)
+        object.__setattr__(self, '_lazy_name', name)
+        object.__setattr__(self, '_lazy_ns', ns)
+        object.__setattr__(self, '_lazy_value', _unset)
+
+    def _lazy_load(self):
+        value = self._lazy_value
+        if value is _unset:
+            value = self._lazy_store.load(self._lazy_name)
+            object.__setattr__(self, '_lazy_value', value)
+            if self._lazy_ns.get(self._lazy_name) is self:
+                self._lazy_ns[self._lazy_name] = value
+        return value
+
+    def __getattr__(self, attr):
+        return getattr(self._lazy_load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._lazy_load(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self._lazy_load(), attr)
+
+    def __call__(self, *args, **kwargs):
+        return self._lazy_load()(*args, **kwargs)
+
+    def __contains__(self, item):
+        return item in self._lazy_load()
+
+    def __reduce_ex__(self, protocol):
+        return self._lazy_load().__reduce_ex__(protocol)
+
+
+def _applied(func):
+    return lambda self, *args: func(self._lazy_load(), *args)
+
+def _reflected(func):
+    return lambda self, other: func(other, self._lazy_load())
+
+for _name, _func in [('repr', repr), ('str', str), ('len', len), ('iter', iter),
+                     ('hash', hash), ('format', format),
+                     ('bool' if PY3 else 'nonzero', bool),
+                     ('getitem', operator.getitem),
+                     ('setitem', operator.setitem),
+                     ('delitem', operator.delitem),
+                     ('neg', operator.neg), ('pos', operator.pos),
+                     ('abs', operator.abs), ('invert', operator.invert),
+                     ('eq', operator.eq), ('ne', operator.ne),
+                     ('lt', operator.lt), ('le', operator.le),
+                     ('gt', operator.gt), ('ge', operator.ge)]:
+    setattr(LazyVariable, '__%s__' % _name, _applied(_func))
+
+for _name in ['add', 'sub', 'mul', 'truediv', 'floordiv', 'mod', 'pow',
+              'and', 'or', 'xor', 'lshift', 'rshift']:
+    _func = getattr(operator, _name + '_' if _name in ('and', 'or') else _name)
+    setattr(LazyVariable, '__%s__' % _name, _applied(_func))
+    setattr(LazyVariable, '__r%s__' % _name, _reflected(_func))
+
+del _name, _func
+
+
+class LazyRestorer(object):
+    """AST transformer loading the lazy variables a cell refers to.
+
+    Loading them before the cell runs means user code sees the real values,
+    not the placeholders.
+    """
+
+    def __init__(self):
+        # name -> LazyVariable not loaded yet
+        self.pending = {}
+
+    def install(self, ns, store, name):
+        proxy = ns[name] = LazyVariable(store, name, ns)
+        self.pending[name] = proxy
+
+    def visit(self, node):
+        pending = self.pending
+        if not pending:
+            return node
+        for sub in ast.walk(node):
+            if isinstance(sub, ast.Name) and sub.id in pending:
+                proxy = pending.pop(sub.id)
+                ns = proxy._lazy_ns
+                if ns.get(sub.id) is not proxy:
+                    continue
+                try:
+                    proxy._lazy_load()
+                except Exception:
+                    del ns[sub.id]
+                    print("Unable to restore variable '%s', ignoring "
+                          "(use %%store -d to forget!)" % sub.id)
+                    print("The error was:", sys.exc_info()[0])
+        return node
+
+#-----------------------------------------------------------------------------
+# Restoring
+#-----------------------------------------------------------------------------
 
 def restore_aliases(ip):
     staliases = ip.db.get('stored_aliases', {})
@@ -30,13 +329,22 @@ def restore_aliases(ip):
         ip.alias_manager.define_alias(k,v)
 
 
-def refresh_variables(ip):
-    db = ip.db
-    for key in db.keys('autorestore/*'):
-        # strip autorestore
-        justkey = os.path.basename(key)
+def refresh_variables(ip, store=None, restorer=None, names=None):
+    """Restore stored variables into the user namespace.
+
+    `store` defaults to the variables kept in ``ip.db``. If a LazyRestorer
+    is given, placeholders are installed and loaded on first use instead.
+    """
+    if store is None:
+        store = PickleShareStore(ip.db)
+    if names is None:
+        names = store.keys()
+    for justkey in names:
+        if restorer is not None:
+            restorer.install(ip.user_ns, store, justkey)
+            continue
         try:
-            obj = db[key]
+            obj = store.load(justkey)
         except KeyError:
             print("Unable to restore variable '%s', ignoring (use %%store -d to forget!)" % justkey)
             print("The error was:", sys.exc_info()[0])
@@ -49,8 +357,8 @@ def restore_dhist(ip):
     ip.user_ns['_dh'] = ip.db.get('dhist',[])
 
 
-def restore_data(ip):
-    refresh_variables(ip)
+def restore_data(ip, store=None, restorer=None):
+    refresh_variables(ip, store, restorer)
     restore_aliases(ip)
     restore_dhist(ip)
 
@@ -66,12 +374,53 @@ class StoreMagics(Magics):
         when IPython starts.
         """
     ).tag(config=True)
-    
+
+    lazy = Bool(True, help=
+        """If True, restored variables are loaded from disk the first time
+        they are used, rather than all at once.
+        """
+    ).tag(config=True)
+
+    backend = Enum(['pickleshare', 'sqlite'], 'pickleshare', help=
+        """Where %store keeps variables: 'pickleshare' (one pickle file per
+        variable in the profile's db directory) or 'sqlite' (a single
+        db/store.sqlite file, with large NumPy arrays saved as .npy files
+        that are memory-mapped on load).
+        """
+    ).tag(config=True)
+
+    compress = Bool(False, help=
+        """Compress variables stored by the 'sqlite' backend with zlib."""
+    ).tag(config=True)
+
+    array_threshold = Integer(1 << 20, help=
+        """NumPy arrays of at least this many bytes are saved as separate .npy
+        files by the 'sqlite' backend.
+        """
+    ).tag(config=True)
+
     def __init__(self, shell):
         super(StoreMagics, self).__init__(shell=shell)
         self.shell.configurables.append(self)
+        if self.backend == 'sqlite':
+            path = os.path.join(shell.profile_dir.location, 'db',
+                                'store.sqlite')
+            self.store = SQLiteStore(path, self.compress, self.array_threshold)
+        else:
+            self.store = PickleShareStore(shell.db)
         if self.autorestore:
-            restore_data(self.shell)
+            restore_data(self.shell, self.store, self._restorer())
+
+    def _restorer(self):
+        """Return the shell's LazyRestorer, registering one if needed."""
+        if not self.lazy:
+            return None
+        for transformer in self.shell.ast_transformers:
+            if isinstance(transformer, LazyRestorer):
+                return transformer
+        restorer = LazyRestorer()
+        self.shell.ast_transformers.append(restorer)
+        return restorer
 
     @line_magic
     def store(self, parameter_s=''):
@@ -120,6 +469,7 @@ def store(self, parameter_s=''):
         args = argsl.split(None,1)
         ip = self.shell
         db = ip.db
+        store = self.store
         # delete
         if 'd' in opts:
             try:
@@ -128,30 +478,28 @@ def store(self, parameter_s=''):
                 raise UsageError('You must provide the variable to forget')
             else:
                 try:
-                    del db['autorestore/' + todel]
+                    store.delete(todel)
                 except:
                     raise UsageError("Can't delete variable '%s'" % todel)
         # reset
         elif 'z' in opts:
-            for k in db.keys('autorestore/*'):
-                del db[k]
+            store.clear()
 
         elif 'r' in opts:
             if args:
+                names = []
                 for arg in args:
-                    try:
-                        obj = db['autorestore/' + arg]
-                    except KeyError:
-                        print("no stored variable %s" % arg)
+                    if arg in store:
+                        names.append(arg)
                     else:
-                        ip.user_ns[arg] = obj
+                        print("no stored variable %s" % arg)
+                refresh_variables(ip, store, self._restorer(), names)
             else:
-                restore_data(ip)
+                restore_data(ip, store, self._restorer())
 
         # run without arguments -> list variables & values
         elif not args:
-            vars = db.keys('autorestore/*')
-            vars.sort()
+            vars = store.keys()
             if vars:
                 size = max(map(len, vars))
             else:
@@ -159,11 +507,9 @@ def store(self, parameter_s=''):
 
             print('Stored variables and their in-db values:')
             fmt = '%-'+str(size)+'s -> %s'
-            get = db.get
             for var in vars:
-                justkey = os.path.basename(var)
                 # print 30 first characters from every var
-                print(fmt % (justkey, repr(get(var, '<unavailable>'))[:50]))
+                print(fmt % (var, store.summary(var)[:50]))
 
         # default action - store the variable
         else:
@@ -208,6 +554,8 @@ def store(self, parameter_s=''):
                 return
 
             else:
+                if isinstance(obj, LazyVariable):
+                    obj = obj._lazy_load()
                 modname = getattr(inspect.getmodule(obj), '__name__', '')
                 if modname == '__main__':
                     print(textwrap.dedent("""\
@@ -217,8 +565,7 @@ def store(self, parameter_s=''):
                     of classes in real modules on file system can be %%store'd.
                     """ % (args[0], obj) ))
                     return
-                #pickled = pickle.dumps(obj)
-                db[ 'autorestore/' + args[0] ] = obj
+                store.save(args[0], obj)
                 print("Stored '%s' (%s)" % (args[0], obj.__class__.__name__))
 
 
@@ -18,11 +18,15 @@
 import shutil
 import random
 import time
+import weakref
 
+import nose
 import nose.tools as nt
 import IPython.testing.tools as tt
 
-from IPython.extensions.autoreload import AutoreloadMagics
+from IPython.extensions.autoreload import (AutoreloadMagics, ModuleReloader,
+                                           InotifyWatcher, PollingWatcher,
+                                           source_imports)
 from IPython.core.events import EventManager, pre_run_cell
 from IPython.utils.py3compat import PY3
 
@@ -39,10 +43,10 @@
 
 class FakeShell(object):
 
-    def __init__(self):
+    def __init__(self, **kw):
         self.ns = {}
         self.events = EventManager(self, {'pre_run_cell', pre_run_cell})
-        self.auto_magics = AutoreloadMagics(shell=self)
+        self.auto_magics = AutoreloadMagics(shell=self, **kw)
         self.events.register('pre_run_cell', self.auto_magics.pre_run_cell)
 
     register_magics = set_hook = noop
@@ -319,3 +323,151 @@ def test_smoketest_aimport(self):
 
     def test_smoketest_autoreload(self):
         self._check_smoketest(use_aimport=False)
+
+    def test_smoketest_stat(self):
+        self.shell = FakeShell(watcher='stat')
+        self._check_smoketest(use_aimport=False)
+
+
+class FakeWatcher(object):
+    """Change-detection backend driven by the test"""
+    def __init__(self):
+        self.watched = set()
+        self.pending = set()
+
+    def watch(self, filename):
+        self.watched.add(filename)
+
+    def changed(self):
+        changed, self.pending = self.pending, set()
+        return changed
+
+
+class CountingReloader(ModuleReloader):
+    def __init__(self, *a, **kw):
+        self.stats = []
+        super(CountingReloader, self).__init__(*a, **kw)
+
+    def filename_and_mtime(self, module):
+        self.stats.append(module.__name__)
+        return super(CountingReloader, self).filename_and_mtime(module)
+
+
+class TestWatchers(Fixture):
+    def test_check_stats_only_changed(self):
+        mod_name, mod_fn = self.new_module("x = 1\n")
+        __import__(mod_name)
+        watcher = FakeWatcher()
+        reloader = CountingReloader(watcher)
+        reloader.enabled = True
+        nt.assert_in(mod_fn, watcher.watched)
+
+        reloader.stats = []
+        reloader.check()
+        nt.assert_equal(reloader.stats, [])
+
+        self.write_file(mod_fn, "x = 2\n")
+        watcher.pending.add(mod_fn)
+        reloader.check()
+        nt.assert_equal(reloader.stats, [mod_name])
+        nt.assert_equal(sys.modules[mod_name].x, 2)
+
+    def test_skipped_changes_stay_pending(self):
+        mod_name, mod_fn = self.new_module("x = 1\n")
+        __import__(mod_name)
+        watcher = FakeWatcher()
+        reloader = ModuleReloader(watcher)
+        reloader.enabled = True
+        reloader.mark_module_skipped(mod_name)
+
+        self.write_file(mod_fn, "x = 2\n")
+        watcher.pending.add(mod_fn)
+        reloader.check()
+        nt.assert_equal(sys.modules[mod_name].x, 1)
+
+        reloader.mark_module_reloadable(mod_name)
+        reloader.check()
+        nt.assert_equal(sys.modules[mod_name].x, 2)
+
+    def test_polling_watcher(self):
+        mod_name, mod_fn = self.new_module("x = 1\n")
+        watcher = PollingWatcher(interval=3600)
+        try:
+            watcher.watch(mod_fn)
+            nt.assert_equal(watcher.changed(), set())
+            # A file replaced just before the check is seen by that check
+            self.write_file(mod_fn + '.new', "x = 2\n")
+            os.rename(mod_fn + '.new', mod_fn)
+            nt.assert_equal(watcher.changed(), {mod_fn})
+            nt.assert_equal(watcher.changed(), set())
+            # One rewritten in place waits for the next poll
+            self.write_file(mod_fn, "x = 3\n")
+            nt.assert_equal(watcher.changed(), set())
+            watcher.poll()
+            nt.assert_equal(watcher.changed(), {mod_fn})
+            # unless the last poll is older than the interval
+            watcher.interval = 0
+            self.write_file(mod_fn, "x = 4\n")
+            nt.assert_equal(watcher.changed(), {mod_fn})
+            os.remove(mod_fn)
+            nt.assert_equal(watcher.changed(), {mod_fn})
+        finally:
+            watcher.close()
+
+    def test_inotify_watcher(self):
+        try:
+            watcher = InotifyWatcher()
+        except (OSError, AttributeError):
+            raise nose.SkipTest("inotify is not available")
+        try:
+            mod_name, mod_fn = self.new_module("x = 1\n")
+            other_name, other_fn = self.new_module("y = 1\n")
+            watcher.watch(mod_fn)
+            nt.assert_equal(watcher.changed(), set())
+            with open(mod_fn, 'w') as f:
+                f.write("x = 2\n")
+            with open(other_fn, 'w') as f:
+                f.write("y = 2\n")
+            nt.assert_equal(watcher.changed(), {mod_fn})
+            nt.assert_equal(watcher.changed(), set())
+        finally:
+            watcher.close()
+
+
+class TestReloadOrder(Fixture):
+    def test_source_imports(self):
+        mod_name, mod_fn = self.new_module(
+            "import os.path\nfrom . import sibling\nfrom ..up import x\n")
+        nt.assert_equal(source_imports(mod_fn, 'pkg.sub'),
+                        {'os', 'os.path', 'pkg.sub', 'pkg.sub.sibling',
+                         'pkg.up', 'pkg.up.x'})
+
+    def test_dependencies_reloaded_first(self):
+        base_name, base_fn = self.new_module("def f():\n    return 1\n")
+        user_name, user_fn = self.new_module(
+            "from %s import f\ndef g():\n    return f()\n" % base_name)
+        __import__(base_name)
+        __import__(user_name)
+        watcher = FakeWatcher()
+        reloader = ModuleReloader(watcher)
+        reloader.enabled = True
+        nt.assert_equal(reloader.reload_order([user_name, base_name]),
+                        [base_name, user_name])
+
+        self.write_file(base_fn, "def f():\n    return 2\n")
+        self.write_file(user_fn,
+            "from %s import f\ndef g():\n    return f() * 10\n" % base_name)
+        watcher.pending.update([user_fn, base_fn])
+        reloader.check()
+        nt.assert_equal([name for name, _ in reloader.reload_times],
+                        [base_name, user_name])
+        nt.assert_equal(sys.modules[user_name].g(), 20)
+
+    def test_prune_old_objects(self):
+        mod_name, mod_fn = self.new_module("class A(object):\n    pass\n")
+        __import__(mod_name)
+        reloader = ModuleReloader(FakeWatcher())
+        reloader.old_objects[(mod_name, 'A')] = [weakref.ref(sys.modules[mod_name].A)]
+        reloader.old_objects[(mod_name, 'gone')] = [weakref.ref(set())]
+        reloader.prune_old_objects()
+        nt.assert_equal(list(reloader.old_objects), [(mod_name, 'A')])
@@ -1,8 +1,10 @@
-import tempfile, os
+import tempfile, os, shutil, sys
 
 from traitlets.config.loader import Config
 import nose.tools as nt
 
+from IPython.testing import decorators as dec
+
 ip = get_ipython()
 ip.magic('load_ext storemagic')
 
@@ -48,3 +50,68 @@ def test_autorestore():
         nt.assert_equal(ip.user_ns['foo'], 95)
     finally:
         ip.config = orig_config
+
+def test_lazy_restore():
+    # load_ext imports the extension as the top-level 'storemagic' module
+    LazyVariable = sys.modules['storemagic'].LazyVariable
+    ip.user_ns['lazyvar'] = [1, 2, 3]
+    ip.magic('store lazyvar')
+    del ip.user_ns['lazyvar']
+    try:
+        ip.magic('store -r lazyvar')
+        nt.assert_is_instance(ip.user_ns['lazyvar'], LazyVariable)
+        ip.run_cell('lazyvar_type = type(lazyvar)')
+        nt.assert_is(ip.user_ns['lazyvar_type'], list)
+        nt.assert_equal(ip.user_ns['lazyvar'], [1, 2, 3])
+
+        # placeholders forward operations, and replace themselves when used
+        ip.magic('store -r lazyvar')
+        nt.assert_equal(len(ip.user_ns['lazyvar']), 3)
+        nt.assert_is_instance(ip.user_ns['lazyvar'], list)
+    finally:
+        ip.magic('store -d lazyvar')
+        ip.user_ns.pop('lazyvar', None)
+        ip.user_ns.pop('lazyvar_type', None)
+
+def test_sqlite_store():
+    from IPython.extensions.storemagic import SQLiteStore
+    tmpd = tempfile.mkdtemp()
+    try:
+        store = SQLiteStore(os.path.join(tmpd, 'store.sqlite'), compress=True)
+        store.save('a', {'x': 1})
+        store.save('b', 'text')
+        nt.assert_equal(store.keys(), ['a', 'b'])
+        nt.assert_in('a', store)
+        nt.assert_equal(store.load('a'), {'x': 1})
+        nt.assert_equal(store.summary('b'), "'text'")
+        store.delete('b')
+        nt.assert_not_in('b', store)
+        with nt.assert_raises(KeyError):
+            store.load('b')
+        with nt.assert_raises(KeyError):
+            store.delete('b')
+    finally:
+        shutil.rmtree(tmpd)
+
+@dec.skip_without('numpy')
+def test_sqlite_store_arrays():
+    import numpy
+    from IPython.extensions.storemagic import SQLiteStore
+    tmpd = tempfile.mkdtemp()
+    try:
+        store = SQLiteStore(os.path.join(tmpd, 'store.sqlite'),
+                            array_threshold=1000)
+        big, small = numpy.arange(1000), numpy.arange(10)
+        store.save('arrays', [big, small])
+        nt.assert_equal(len(os.listdir(store.array_dir)), 1)
+        loaded = store.load('arrays')
+        nt.assert_is_instance(loaded[0], numpy.memmap)
+        nt.assert_not_is_instance(loaded[1], numpy.memmap)
+        numpy.testing.assert_array_equal(loaded[0], big)
+        numpy.testing.assert_array_equal(loaded[1], small)
+        del loaded
+
+        store.save('arrays', None)
+        nt.assert_equal(os.listdir(store.array_dir), [])
+    finally:
+        shutil.rmtree(tmpd)
@@ -96,6 +96,8 @@ def _repr_pretty_(self, p, cycle):
 
 
 MAX_SEQ_LENGTH = 1000
+# Appended to the output when a character or line budget has been exhausted.
+TRUNCATION_MARKER = '...[output truncated]'
 _re_pattern_type = type(re.compile(''))
 
 def _safe_getattr(obj, attr, default=None):
@@ -119,22 +121,28 @@ def write(self, text):
                 cast_unicode(text, encoding=get_stream_enc(sys.stdout)))
 
 
-def pretty(obj, verbose=False, max_width=79, newline='\n', max_seq_length=MAX_SEQ_LENGTH):
+def pretty(obj, verbose=False, max_width=79, newline='\n', max_seq_length=MAX_SEQ_LENGTH,
+           max_chars=0, max_lines=0, iterative=False):
     """
     Pretty print the object's representation.
     """
     stream = CUnicodeIO()
-    printer = RepresentationPrinter(stream, verbose, max_width, newline, max_seq_length=max_seq_length)
+    printer = RepresentationPrinter(stream, verbose, max_width, newline,
+        max_seq_length=max_seq_length, max_chars=max_chars, max_lines=max_lines,
+        iterative=iterative)
     printer.pretty(obj)
     printer.flush()
     return stream.getvalue()
 
 
-def pprint(obj, verbose=False, max_width=79, newline='\n', max_seq_length=MAX_SEQ_LENGTH):
+def pprint(obj, verbose=False, max_width=79, newline='\n', max_seq_length=MAX_SEQ_LENGTH,
+           max_chars=0, max_lines=0, iterative=False):
     """
     Like `pretty` but print to stdout.
     """
-    printer = RepresentationPrinter(sys.stdout, verbose, max_width, newline, max_seq_length=max_seq_length)
+    printer = RepresentationPrinter(sys.stdout, verbose, max_width, newline,
+        max_seq_length=max_seq_length, max_chars=max_chars, max_lines=max_lines,
+        iterative=iterative)
     printer.pretty(obj)
     printer.flush()
     sys.stdout.write(newline)
@@ -166,13 +174,26 @@ class PrettyPrinter(_PrettyPrinterBase):
     generate pretty reprs of objects.  Contrary to the `RepresentationPrinter`
     this printer knows nothing about the default pprinters or the `_repr_pretty_`
     callback method.
+
+    `max_chars` and `max_lines` put a budget on the size of the output (0
+    means no limit).  Once it is exhausted, further text is dropped, the
+    `truncated` attribute is set and `TRUNCATION_MARKER` is written on the
+    final flush.
     """
 
-    def __init__(self, output, max_width=79, newline='\n', max_seq_length=MAX_SEQ_LENGTH):
+    def __init__(self, output, max_width=79, newline='\n', max_seq_length=MAX_SEQ_LENGTH,
+                 max_chars=0, max_lines=0):
         self.output = output
         self.max_width = max_width
         self.newline = newline
         self.max_seq_length = max_seq_length
+        self.max_chars = max_chars
+        self.max_lines = max_lines
+        self.truncated = False
+        self.chars_written = 0
+        self.lines_written = 0
+        self._lines_exhausted = False
+        self._marker_written = False
         self.output_width = 0
         self.buffer_width = 0
         self.buffer = deque()
@@ -189,16 +210,55 @@ def _break_outer_groups(self):
                 return
             while group.breakables:
                 x = self.buffer.popleft()
-                self.output_width = x.output(self.output, self.output_width)
+                if not self._lines_exhausted or isinstance(x, Breakable):
+                    self.output_width = x.output(self.output, self.output_width)
                 self.buffer_width -= x.width
             while self.buffer and isinstance(self.buffer[0], Text):
                 x = self.buffer.popleft()
-                self.output_width = x.output(self.output, self.output_width)
+                if not self._lines_exhausted:
+                    self.output_width = x.output(self.output, self.output_width)
                 self.buffer_width -= x.width
 
+    def _check_budget(self, width):
+        """Account for `width` more characters.
+
+        Returns the number of characters that still fit in the budget, and
+        marks the output as truncated if that is less than `width`.
+        """
+        if self.truncated:
+            return 0
+        if self.max_chars:
+            remaining = self.max_chars - self.chars_written
+            if width > remaining:
+                self.truncated = True
+                width = max(remaining, 0)
+        self.chars_written += width
+        return width
+
+    def _newline_allowed(self):
+        """Count a line break about to be written to the output.
+
+        Returns False, marking the output as truncated, if it would exceed
+        the line budget. Anything still buffered is then dropped.
+        """
+        if self._lines_exhausted:
+            return False
+        if self.max_lines and self.lines_written + 1 >= self.max_lines:
+            self.truncated = self._lines_exhausted = True
+            return False
+        self.lines_written += 1
+        return True
+
     def text(self, obj):
         """Add literal text to the output."""
         width = len(obj)
+        if self.max_chars or self.max_lines:
+            allowed = self._check_budget(width)
+            if allowed < width:
+                if not allowed:
+                    return
+                obj = obj[:allowed]
+                width = allowed
         if self.buffer:
             text = self.buffer[-1]
             if not isinstance(text, Text):
@@ -218,9 +278,14 @@ def breakable(self, sep=' '):
         place the `sep` is inserted which default to one space.
         """
         width = len(sep)
+        if (self.max_chars or self.max_lines) and \
+                self._check_budget(width) < width:
+            return
         group = self.group_stack[-1]
         if group.want_break:
             self.flush()
+            if not self._newline_allowed():
+                return
             self.output.write(self.newline)
             self.output.write(' ' * self.indentation)
             self.output_width = self.indentation
@@ -234,7 +299,11 @@ def break_(self):
         """
         Explicitly insert a newline into the output, maintaining correct indentation.
         """
+        if (self.max_chars or self.max_lines) and self._check_budget(1) < 1:
+            return
         self.flush()
+        if not self._newline_allowed():
+            return
         self.output.write(self.newline)
         self.output.write(' ' * self.indentation)
         self.output_width = self.indentation
@@ -269,6 +338,9 @@ def begin_group(self, indent=0, open=''):
     def _enumerate(self, seq):
         """like enumerate, but with an upper limit on the number of items"""
         for idx, x in enumerate(seq):
+            if self.truncated:
+                # out of budget, stop walking the sequence
+                return
             if self.max_seq_length and idx >= self.max_seq_length:
                 self.text(',')
                 self.breakable()
@@ -288,9 +360,13 @@ def end_group(self, dedent=0, close=''):
     def flush(self):
         """Flush data that is left in the buffer."""
         for data in self.buffer:
-            self.output_width += data.output(self.output, self.output_width)
+            if not self._lines_exhausted or isinstance(data, Breakable):
+                self.output_width += data.output(self.output, self.output_width)
         self.buffer.clear()
         self.buffer_width = 0
+        if self.truncated and not self._marker_written:
+            self._marker_written = True
+            self.output.write(TRUNCATION_MARKER)
 
 
 def _get_mro(obj_class):
@@ -325,15 +401,26 @@ class RepresentationPrinter(PrettyPrinter):
     output.  For example the default instance repr prints all attributes and
     methods that are not prefixed by an underscore if the printer is in
     verbose mode.
+
+    If `iterative` is true, the builtin containers (lists, tuples, dicts,
+    sets) are walked with an explicit stack instead of recursive calls, so
+    that deeply nested structures don't hit the recursion limit.  The output
+    is the same.  Printers can take part in this by providing their
+    child-yielding generator as an ``iter_pprint`` attribute, see
+    `iterable_pprinter`.
     """
 
     def __init__(self, output, verbose=False, max_width=79, newline='\n',
         singleton_pprinters=None, type_pprinters=None, deferred_pprinters=None,
-        max_seq_length=MAX_SEQ_LENGTH):
+        max_seq_length=MAX_SEQ_LENGTH, max_chars=0, max_lines=0, iterative=False):
 
-        PrettyPrinter.__init__(self, output, max_width, newline, max_seq_length=max_seq_length)
+        PrettyPrinter.__init__(self, output, max_width, newline, max_seq_length=max_seq_length,
+                               max_chars=max_chars, max_lines=max_lines)
         self.verbose = verbose
+        self.iterative = iterative
         self.stack = []
+        # id -> number of occurrences in self.stack, for the iterative engine
+        self._stack_counts = {}
         if singleton_pprinters is None:
             singleton_pprinters = _singleton_pprinters.copy()
         self.singleton_pprinters = singleton_pprinters
@@ -346,45 +433,124 @@ def __init__(self, output, verbose=False, max_width=79, newline='\n',
 
     def pretty(self, obj):
         """Pretty print the given object."""
+        if self.truncated:
+            # output budget exhausted, don't walk any further
+            return
+        if self.iterative:
+            return self._pretty_iterative(obj)
         obj_id = id(obj)
         cycle = obj_id in self.stack
         self.stack.append(obj_id)
         self.begin_group()
         try:
-            obj_class = _safe_getattr(obj, '__class__', None) or type(obj)
-            # First try to find registered singleton printers for the type.
-            try:
-                printer = self.singleton_pprinters[obj_id]
-            except (TypeError, KeyError):
-                pass
-            else:
-                return printer(obj, self, cycle)
-            # Next walk the mro and check for either:
-            #   1) a registered printer
-            #   2) a _repr_pretty_ method
-            for cls in _get_mro(obj_class):
-                if cls in self.type_pprinters:
-                    # printer registered in self.type_pprinters
-                    return self.type_pprinters[cls](obj, self, cycle)
-                else:
-                    # deferred printer
-                    printer = self._in_deferred_types(cls)
-                    if printer is not None:
-                        return printer(obj, self, cycle)
-                    else:
-                        # Finally look for special method names.
-                        # Some objects automatically create any requested
-                        # attribute. Try to ignore most of them by checking for
-                        # callability.
-                        if '_repr_pretty_' in cls.__dict__:
-                            meth = cls._repr_pretty_
-                            if callable(meth):
-                                return meth(obj, self, cycle)
-            return _default_pprint(obj, self, cycle)
+            return self._find_printer(obj, obj_id)(obj, self, cycle)
         finally:
             self.end_group()
             self.stack.pop()
 
+    def _find_printer(self, obj, obj_id):
+        """Return the printer to use for obj."""
+        obj_class = _safe_getattr(obj, '__class__', None) or type(obj)
+        # First try to find registered singleton printers for the type.
+        try:
+            return self.singleton_pprinters[obj_id]
+        except (TypeError, KeyError):
+            pass
+        # Next walk the mro and check for either:
+        #   1) a registered printer
+        #   2) a _repr_pretty_ method
+        for cls in _get_mro(obj_class):
+            if cls in self.type_pprinters:
+                # printer registered in self.type_pprinters
+                return self.type_pprinters[cls]
+            else:
+                # deferred printer
+                printer = self._in_deferred_types(cls)
+                if printer is not None:
+                    return printer
+                else:
+                    # Finally look for special method names.
+                    # Some objects automatically create any requested
+                    # attribute. Try to ignore most of them by checking for
+                    # callability.
+                    if '_repr_pretty_' in cls.__dict__:
+                        meth = cls._repr_pretty_
+                        if callable(meth):
+                            return meth
+        return _default_pprint
+
+    def _enter(self, obj):
+        """Start pretty printing obj for the iterative engine.
+
+        Returns the generator yielding the children of obj that remain to be
+        printed, or None if obj has been printed completely.  In the former
+        case, `_leave` must be called once the generator is exhausted.
+        """
+        obj_id = id(obj)
+        counts = self._stack_counts
+        cycle = obj_id in counts
+        self.stack.append(obj_id)
+        counts[obj_id] = counts.get(obj_id, 0) + 1
+        self.begin_group()
+        done = True
+        try:
+            printer = self._find_printer(obj, obj_id)
+            iter_pprint = getattr(printer, 'iter_pprint', None)
+            if iter_pprint is not None:
+                done = False
+                return iter_pprint(obj, self, cycle)
+            printer(obj, self, cycle)
+        finally:
+            if done:
+                self._leave()
+
+    def _leave(self):
+        """Finish pretty printing the innermost object, see `_enter`."""
+        self.end_group()
+        obj_id = self.stack.pop()
+        counts = self._stack_counts
+        if counts[obj_id] == 1:
+            del counts[obj_id]
+        else:
+            counts[obj_id] -= 1
+
+    def _pretty_iterative(self, obj):
+        """Pretty print obj, walking containers with an explicit stack."""
+        frame = self._enter(obj)
+        if frame is None:
+            return
+        frames = [frame]
+        exc_info = None
+        while frames:
+            frame = frames[-1]
+            try:
+                if exc_info is None:
+                    child = next(frame)
+                else:
+                    # propagate errors to the parent, as recursion would
+                    info, exc_info = exc_info, None
+                    child = frame.throw(*info)
+            except StopIteration:
+                frames.pop()
+                self._leave()
+                continue
+            except Exception:
+                frames.pop()
+                self._leave()
+                if not frames:
+                    raise
+                exc_info = sys.exc_info()
+                continue
+            if self.truncated:
+                continue
+            try:
+                frame = self._enter(child)
+            except Exception:
+                exc_info = sys.exc_info()
+                continue
+            if frame is not None:
+                frames.append(frame)
+
     def _in_deferred_types(self, cls):
         """
         Check if the given class is specified in the deferred type registry.
@@ -438,7 +604,11 @@ def __init__(self, seq, width, pretty):
 
     def output(self, stream, output_width):
         self.group.breakables.popleft()
+        if self.pretty._lines_exhausted:
+            return output_width
         if self.group.want_break:
+            if not self.pretty._newline_allowed():
+                return output_width
             stream.write(self.pretty.newline)
             stream.write(' ' * self.indentation)
             return self.indentation
@@ -530,6 +700,23 @@ def _default_pprint(obj, p, cycle):
     p.end_group(1, '>')
 
 
+def iterable_pprinter(iter_pprint):
+    """
+    Make a pprint function out of a generator function with the same
+    signature, which yields the child objects to pretty print instead of
+    calling `p.pretty` on them.
+
+    The generator is kept as the ``iter_pprint`` attribute of the returned
+    function, which lets the iterative `RepresentationPrinter` walk nested
+    objects without recursion.
+    """
+    def inner(obj, p, cycle):
+        for child in iter_pprint(obj, p, cycle):
+            p.pretty(child)
+    inner.iter_pprint = iter_pprint
+    return inner
+
+
 def _seq_pprinter_factory(start, end, basetype):
     """
     Factory that returns a pprint function useful for sequences.  Used by
@@ -539,22 +726,24 @@ def inner(obj, p, cycle):
         typ = type(obj)
         if basetype is not None and typ is not basetype and typ.__repr__ != basetype.__repr__:
             # If the subclass provides its own repr, use it instead.
-            return p.text(typ.__repr__(obj))
+            p.text(typ.__repr__(obj))
+            return
 
         if cycle:
-            return p.text(start + '...' + end)
+            p.text(start + '...' + end)
+            return
         step = len(start)
         p.begin_group(step, start)
         for idx, x in p._enumerate(obj):
             if idx:
                 p.text(',')
                 p.breakable()
-            p.pretty(x)
+            yield x
         if len(obj) == 1 and type(obj) is tuple:
             # Special case for 1-item tuples.
             p.text(',')
         p.end_group(step, end)
-    return inner
+    return iterable_pprinter(inner)
 
 
 def _set_pprinter_factory(start, end, basetype):
@@ -565,10 +754,12 @@ def inner(obj, p, cycle):
         typ = type(obj)
         if basetype is not None and typ is not basetype and typ.__repr__ != basetype.__repr__:
             # If the subclass provides its own repr, use it instead.
-            return p.text(typ.__repr__(obj))
+            p.text(typ.__repr__(obj))
+            return
 
         if cycle:
-            return p.text(start + '...' + end)
+            p.text(start + '...' + end)
+            return
         if len(obj) == 0:
             # Special case.
             p.text(basetype.__name__ + '()')
@@ -587,9 +778,9 @@ def inner(obj, p, cycle):
                 if idx:
                     p.text(',')
                     p.breakable()
-                p.pretty(x)
+                yield x
             p.end_group(step, end)
-    return inner
+    return iterable_pprinter(inner)
 
 
 def _dict_pprinter_factory(start, end, basetype=None):
@@ -601,10 +792,12 @@ def inner(obj, p, cycle):
         typ = type(obj)
         if basetype is not None and typ is not basetype and typ.__repr__ != basetype.__repr__:
             # If the subclass provides its own repr, use it instead.
-            return p.text(typ.__repr__(obj))
+            p.text(typ.__repr__(obj))
+            return
 
         if cycle:
-            return p.text('{...}')
+            p.text('{...}')
+            return
         p.begin_group(1, start)
         keys = obj.keys()
         # if dict isn't large enough to be truncated, sort keys before displaying
@@ -618,11 +811,11 @@ def inner(obj, p, cycle):
             if idx:
                 p.text(',')
                 p.breakable()
-            p.pretty(key)
+            yield key
             p.text(': ')
-            p.pretty(obj[key])
+            yield obj[key]
         p.end_group(1, end)
-    return inner
+    return iterable_pprinter(inner)
 
 
 def _super_pprint(obj, p, cycle):
@@ -693,6 +886,8 @@ def _repr_pprint(obj, p, cycle):
     # Find newlines and replace them with p.break_()
     output = repr(obj)
     for idx,output_line in enumerate(output.splitlines()):
+        if p.truncated:
+            break
         if idx:
             p.break_()
         p.text(output_line)
@@ -0,0 +1,53 @@
+"""Benchmarks for the recursive and iterative engines of IPython.lib.pretty.
+
+Not collected by the test suite, run with::
+
+    python -m IPython.lib.tests.bench_pretty
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import print_function
+
+import sys
+import timeit
+
+from IPython.lib import pretty
+
+
+def _nested(depth):
+    obj = []
+    inner = obj
+    for i in range(depth):
+        inner.append({'a': [i]})
+        inner = inner[-1]['a']
+    return obj
+
+
+CASES = [
+    ('large dict', dict((str(i), [list(range(10)), {'x': i}])
+                        for i in range(20000))),
+    ('large list', [(i, str(i), float(i)) for i in range(50000)]),
+    ('wide nested', [dict((str(j), list(range(5))) for j in range(20))
+                     for i in range(500)]),
+    ('deep nested', _nested(sys.getrecursionlimit() // 8)),
+]
+
+
+def bench(obj, iterative, number=3):
+    """Best time of `number` runs of pretty(obj), in seconds."""
+    def run():
+        pretty.pretty(obj, max_seq_length=0, iterative=iterative)
+    return min(timeit.repeat(run, number=1, repeat=number))
+
+
+def main():
+    print('%-14s %12s %12s' % ('case', 'recursive', 'iterative'))
+    for name, obj in CASES:
+        print('%-14s %11.3fs %11.3fs' % (name, bench(obj, False),
+                                         bench(obj, True)))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,7 @@
 from __future__ import print_function
 
 from collections import Counter, defaultdict, deque, OrderedDict
+import sys
 
 import nose.tools as nt
 
@@ -436,3 +437,74 @@ class MyCounter(Counter):
     ]
     for obj, expected in cases:
         nt.assert_equal(pretty.pretty(obj), expected)
+
+def test_max_chars():
+    text = pretty.pretty(list(range(100000)), max_chars=20)
+    nt.assert_equal(text, '[0, 1, 2, 3, 4, 5, 6' + pretty.TRUNCATION_MARKER)
+    # long reprs are cut as well
+    text = pretty.pretty('x' * 100, max_chars=5)
+    nt.assert_equal(text, "'xxxx" + pretty.TRUNCATION_MARKER)
+    # small outputs are untouched
+    nt.assert_equal(pretty.pretty([1, 2], max_chars=20), '[1, 2]')
+
+def test_max_lines():
+    text = pretty.pretty(list(range(1000)), max_lines=3)
+    nt.assert_equal(text, '[0,\n 1,\n 2,' + pretty.TRUNCATION_MARKER)
+    nt.assert_equal(pretty.pretty(list(range(3)), max_lines=1), '[0, 1, 2]')
+
+def test_budget_stops_walking():
+    visited = []
+    class Visited(object):
+        def _repr_pretty_(self, p, cycle):
+            visited.append(self)
+            p.text('v' * 10)
+    stream = StringIO()
+    printer = pretty.RepresentationPrinter(stream, max_chars=50)
+    printer.pretty([Visited() for i in range(1000)])
+    printer.flush()
+    nt.assert_true(printer.truncated)
+    nt.assert_less(len(visited), 10)
+
+def test_iterative_same_output():
+    a = [1, 2]
+    a.append(a)
+    d = {'key': a, 'nested': {'x': [(1,), frozenset([3]), set()]}}
+    cases = [
+        d,
+        a,
+        [MyList([1, [2, 3]]), MyDict(), Breaking(), BreakingReprParent()],
+        dict((str(i), list(range(i))) for i in range(40)),
+        OrderedDict([('a', [1, 2]), ('b', deque([3]))]),
+        ([],) * 3,
+        list(range(2000)),
+    ]
+    for obj in cases:
+        nt.assert_equal(pretty.pretty(obj, iterative=True), pretty.pretty(obj))
+
+def test_iterative_deep_nesting():
+    depth = 10 * sys.getrecursionlimit()
+    obj = []
+    inner = obj
+    for i in range(depth):
+        inner.append({'a': []})
+        inner = inner[-1]['a']
+    text = pretty.pretty(obj, iterative=True)
+    nt.assert_equal(text, "[{'a': " * depth + "[]" + "}]" * depth)
+
+def test_iterative_exception_propagates():
+    class Failing(object):
+        def _repr_pretty_(self, p, cycle):
+            raise ValueError('oops')
+
+    class Catching(object):
+        def _repr_pretty_(self, p, cycle):
+            try:
+                p.pretty([Failing()])
+            except ValueError:
+                p.text('caught')
+
+    with nt.assert_raises(ValueError):
+        pretty.pretty([[Failing()]], iterative=True)
+    for iterative in (False, True):
+        nt.assert_equal(pretty.pretty([Catching()], iterative=iterative),
+                        '[[caught]')
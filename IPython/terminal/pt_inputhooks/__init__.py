@@ -1,5 +1,8 @@
+import errno
 import importlib
 import os
+import select
+import threading
 
 aliases = {
     'qt4': 'qt',
@@ -30,6 +33,35 @@ def __str__(self):
                 "Supported event loops are: {}").format(self.name,
                                     ', '.join(backends + sorted(registered)))
 
+def call_when_input_ready(context, callback):
+    """Call *callback* from a new thread once the prompt has input to process.
+
+    This is for toolkits that can't watch a file descriptor themselves, but
+    can be woken up from another thread: *callback* must be thread-safe. It
+    waits on ``context.fileno()`` with select(), so it doesn't work on
+    Windows, where select() can't wait for pipes.
+    """
+    fd = context.fileno()
+
+    def wait():
+        while True:
+            try:
+                select.select([fd], [], [])
+            except (select.error, OSError) as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                # The prompt was closed
+                return
+            except ValueError:
+                return
+            break
+        callback()
+
+    thread = threading.Thread(target=wait)
+    thread.daemon = True
+    thread.start()
+    return thread
+
 def get_inputhook_func(gui):
     if gui in registered:
         return registered[gui]
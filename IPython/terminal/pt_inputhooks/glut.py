@@ -21,6 +21,7 @@
 
 import sys
 import time
+import select
 import signal
 import OpenGL.GLUT as glut
 import OpenGL.platform as platform
@@ -92,13 +93,27 @@ def glut_int_handler(signum, frame):
 glut.glutIdleFunc( glut_idle )
 
 
+def wait_for_input(context, timeout):
+    """Sleep for up to *timeout* seconds, returning early if there is input."""
+    if sys.platform == 'win32':
+        # select() can't wait for pipes on Windows
+        time.sleep(timeout)
+        return
+    try:
+        select.select([context.fileno()], [], [], timeout)
+    except (select.error, OSError):
+        # Interrupted by a signal
+        pass
+
+
 def inputhook(context):
-    """Run the pyglet event loop by processing pending events only.
+    """Run the GLUT event loop by processing pending events only.
 
-    This keeps processing pending events until stdin is ready.  After
-    processing all pending events, a call to time.sleep is inserted.  This is
-    needed, otherwise, CPU usage is at 100%.  This sleep time should be tuned
-    though for best performance.
+    This keeps processing pending events until stdin is ready. GLUT can't
+    wait for events, so after processing all pending events we wait for
+    input, with a timeout to get back to the GLUT events. This is needed,
+    otherwise, CPU usage is at 100%. Input ends the wait straight away, so
+    the timeout only limits how often GUI events are processed.
     """
     # We need to protect against a user pressing Control-C when IPython is
     # idle and this is running. We trap KeyboardInterrupt and pass.
@@ -116,7 +131,7 @@ def inputhook(context):
 
         while not context.input_is_ready():
             glutMainLoopEvent()
-            # We need to sleep at this point to keep the idle CPU load
+            # We need to wait at this point to keep the idle CPU load
             # low.  However, if sleep to long, GUI response is poor.  As
             # a compromise, we watch how often GUI events are being processed
             # and switch between a short and long sleep time.  Here are some
@@ -129,13 +144,13 @@ def inputhook(context):
             used_time = clock() - t
             if used_time > 10.0:
                 # print 'Sleep for 1 s'  # dbg
-                time.sleep(1.0)
+                wait_for_input(context, 1.0)
             elif used_time > 0.1:
                 # Few GUI events coming in, so we can sleep longer
                 # print 'Sleep for 0.05 s'  # dbg
-                time.sleep(0.05)
+                wait_for_input(context, 0.05)
             else:
                 # Many GUI events coming in, so sleep only very little
-                time.sleep(0.001)
+                wait_for_input(context, 0.001)
     except KeyboardInterrupt:
         pass
@@ -8,6 +8,8 @@
 from timeit import default_timer as clock
 import pyglet
 
+from IPython.terminal.pt_inputhooks import call_when_input_ready
+
 # On linux only, window.flip() has a bug that causes an AttributeError on
 # window close.  For details, see:
 # http://groups.google.com/group/pyglet-users/browse_thread/thread/47c1aab9aa4a3d23/c22f9e819826799e?#c22f9e819826799e
@@ -23,7 +25,41 @@ def flip(window):
         window.flip()
 
 
-def inputhook(context):
+def _draw_windows():
+    pyglet.clock.tick()
+    for window in pyglet.app.windows:
+        window.switch_to()
+        window.dispatch_events()
+        window.dispatch_event('on_draw')
+        flip(window)
+
+
+_event_loop_started = False
+
+def inputhook_wait(context):
+    """Run the pyglet event loop, waiting for events instead of polling.
+
+    The platform event loop sleeps until there is a window event, a
+    scheduled clock function is due, or a thread wakes it up, which is done
+    when the prompt has input. This needs select() to work on pipes, so it
+    isn't used on Windows.
+    """
+    global _event_loop_started
+    event_loop = pyglet.app.platform_event_loop
+    if not _event_loop_started:
+        event_loop.start()
+        _event_loop_started = True
+
+    try:
+        call_when_input_ready(context, event_loop.notify)
+        while not context.input_is_ready():
+            _draw_windows()
+            event_loop.step(pyglet.clock.get_sleep_time(True))
+    except KeyboardInterrupt:
+        pass
+
+
+def inputhook_poll(context):
     """Run the pyglet event loop by processing pending events only.
 
     This keeps processing pending events until stdin is ready.  After
@@ -36,12 +72,7 @@ def inputhook(context):
     try:
         t = clock()
         while not context.input_is_ready():
-            pyglet.clock.tick()
-            for window in pyglet.app.windows:
-                window.switch_to()
-                window.dispatch_events()
-                window.dispatch_event('on_draw')
-                flip(window)
+            _draw_windows()
 
             # We need to sleep at this point to keep the idle CPU load
             # low.  However, if sleep to long, GUI response is poor.  As
@@ -66,3 +97,10 @@ def inputhook(context):
                 time.sleep(0.001)
     except KeyboardInterrupt:
         pass
+
+
+if sys.platform == 'win32' or not hasattr(pyglet.app, 'platform_event_loop'):
+    # pyglet before 1.2 has no platform event loop to wait on
+    inputhook = inputhook_poll
+else:
+    inputhook = inputhook_wait
@@ -8,6 +8,8 @@
 from timeit import default_timer as clock
 import wx
 
+from IPython.terminal.pt_inputhooks import call_when_input_ready
+
 
 def inputhook_wx1(context):
     """Run the wx event loop by processing pending events only.
@@ -138,11 +140,39 @@ def inputhook_wx3(context):
         pass
     return 0
 
-if sys.platform == 'darwin':
-    # On OSX, evtloop.Pending() always returns True, regardless of there being
-    # any events pending. As such we can't use implementations 1 or 3 of the
-    # inputhook as those depend on a pending/dispatch loop.
-    inputhook = inputhook_wx2
-else:
-    # This is our default implementation
+def inputhook_wx4(context):
+    """Run the wx event loop until stdin is ready, without polling.
+
+    A thread waits for the prompt to have input and makes the event loop exit
+    with wx.CallAfter, which is safe to call from other threads. The event
+    loop sleeps until there is a GUI event or input, so the shell uses no CPU
+    while idle and keypresses are seen immediately. This needs select() to
+    work on pipes, so it isn't used on Windows.
+    """
+    try:
+        app = wx.GetApp()
+        if app is not None:
+            assert wx.Thread_IsMain()
+
+            # See inputhook_wx3
+            if not callable(signal.getsignal(signal.SIGINT)):
+                signal.signal(signal.SIGINT, signal.default_int_handler)
+
+            evtloop = wx.EventLoop()
+
+            def exit():
+                if evtloop.IsRunning():
+                    evtloop.Exit()
+
+            call_when_input_ready(context, lambda: wx.CallAfter(exit))
+            evtloop.Run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if sys.platform == 'win32':
     inputhook = inputhook_wx3
+else:
+    # This is our default implementation. It doesn't rely on
+    # evtloop.Pending(), which always returns True on OSX.
+    inputhook = inputhook_wx4
@@ -1,3 +1,7 @@
+import re
+import sre_compile
+import sre_constants as sre
+import sre_parse
 import unicodedata
 from wcwidth import wcwidth
 
@@ -8,6 +12,8 @@
 from prompt_toolkit.layout.lexers import PygmentsLexer
 
 import pygments.lexers as pygments_lexers
+from pygments.lexer import RegexLexer
+from pygments.token import Error, _TokenType
 
 
 class IPythonPTCompleter(Completer):
@@ -52,23 +58,409 @@ def get_completions(self, document, complete_event):
             #                  display_meta=meta_text)
             yield Completion(m, start_position=start_pos)
 
+def _func(method):
+    return getattr(method, '__func__', method)
+
+
+# Character classes which can't match a line break
+_NO_NEWLINE_CATEGORIES = {getattr(sre, name) for name in (
+    'CATEGORY_DIGIT', 'CATEGORY_WORD', 'CATEGORY_NOT_SPACE',
+    'CATEGORY_NOT_LINEBREAK', 'CATEGORY_UNI_DIGIT', 'CATEGORY_UNI_WORD',
+    'CATEGORY_UNI_NOT_SPACE', 'CATEGORY_UNI_NOT_LINEBREAK',
+    'CATEGORY_LOC_WORD') if hasattr(sre, name)}
+
+def _in_newline(items):
+    """Whether a character set, as parsed by sre_parse, contains '\\n'."""
+    negate = found = False
+    for op, av in items:
+        if op is sre.NEGATE:
+            negate = True
+        elif op is sre.LITERAL:
+            found = found or av == 10
+        elif op is sre.NOT_LITERAL:
+            found = found or av != 10
+        elif op is sre.RANGE:
+            found = found or av[0] <= 10 <= av[1]
+        elif op is sre.CATEGORY:
+            found = found or av not in _NO_NEWLINE_CATEGORIES
+        else:
+            found = True
+    return found != negate
+
+def _newlines(items, flags):
+    """Look for line breaks in a parsed regex.
+
+    Returns (crosses, newline): whether the regex can look at anything past
+    a line break it matched, and whether it can match a line break at all.
+    Anything not understood is assumed to do both.
+    """
+    crosses = newline = False
+    for op, av in items:
+        if op is sre.LITERAL:
+            c, n = False, av == 10
+        elif op is sre.NOT_LITERAL:
+            c, n = False, av != 10
+        elif op is sre.ANY:
+            c, n = False, bool(flags & re.DOTALL)
+        elif op is sre.IN:
+            c, n = False, _in_newline(av)
+        elif op is sre.AT:
+            c = n = False
+        elif op in (sre.MAX_REPEAT, sre.MIN_REPEAT):
+            c, n = _newlines(av[2], flags)
+            c = c or (n and av[1] > 1)
+        elif op is sre.SUBPATTERN:
+            c, n = _newlines(av[-1], flags | (av[1] if len(av) == 4 else 0))
+        elif op is sre.BRANCH:
+            branches = [_newlines(b, flags) for b in av[1]]
+            c = any(b[0] for b in branches)
+            n = any(b[1] for b in branches)
+        elif op in (sre.ASSERT, sre.ASSERT_NOT):
+            c, n = _newlines(av[1], flags)
+        else:
+            c = n = True
+        crosses = crosses or c or newline
+        newline = newline or n
+    return crosses, newline
+
+def _alphabet(items, flags, chars):
+    """Add the character sets that a parsed regex can match to `chars`.
+
+    Returns False if that can't be worked out, i.e. it may match anything.
+    """
+    for op, av in items:
+        if op in (sre.LITERAL, sre.NOT_LITERAL, sre.IN):
+            chars.append((op, av))
+        elif op is sre.ANY:
+            if flags & re.DOTALL:
+                return False
+            chars.append((op, av))
+        elif op is sre.AT:
+            pass
+        elif op in (sre.MAX_REPEAT, sre.MIN_REPEAT):
+            if not _alphabet(av[2], flags, chars):
+                return False
+        elif op is sre.SUBPATTERN:
+            if len(av) == 4:
+                flags |= av[1]
+            if not _alphabet(av[-1], flags, chars):
+                return False
+        elif op is sre.BRANCH:
+            if not all(_alphabet(b, flags, chars) for b in av[1]):
+                return False
+        elif op in (sre.ASSERT, sre.ASSERT_NOT):
+            if not _alphabet(av[1], flags, chars):
+                return False
+        else:
+            return False
+    return True
+
+def _flatten(items):
+    """The items of a parsed regex with groups replaced by their content."""
+    flat = []
+    for op, av in items:
+        if op is sre.SUBPATTERN and not (len(av) == 4 and (av[1] or av[2])):
+            flat.extend(_flatten(av[-1]))
+        else:
+            flat.append((op, av))
+    return flat
+
+def _line_reach(regex):
+    """For a regex that can look past the end of the line it starts on, a
+    function of (text, pos) giving how far an attempt to match at `pos` may
+    have looked, or None if it stayed within the line.
+
+    Each part of a regex looks at a run of the characters it can match,
+    and one more. So past the end of the line, a part that can match a line
+    break looks at most to the end of such a run, and the parts after it to
+    the end of that line. Parts are only counted if what comes before them
+    matches.
+    """
+    flags = regex.flags
+    try:
+        parsed = sre_parse.parse(regex.pattern, flags)
+        if not _newlines(parsed, flags)[0]:
+            return None
+        state = getattr(parsed, 'state', None) or parsed.pattern
+        matcher = lambda items: sre_compile.compile(
+            sre_parse.SubPattern(state, items), flags).match
+        items = _flatten(parsed)
+        steps = []
+        for i, item in enumerate(items):
+            if not _newlines([item], flags)[1]:
+                continue
+            chars = []
+            # '.' and a line break make any character
+            if (_alphabet([item], flags, chars) and
+                    not any(op is sre.ANY for op, av in chars)):
+                branch = (None, [sre_parse.SubPattern(state, [c])
+                                 for c in chars])
+                run = matcher([(sre.MAX_REPEAT, (0, sre.MAXREPEAT,
+                    sre_parse.SubPattern(state, [(sre.BRANCH, branch)])))])
+            else:
+                run = None
+            steps.append((matcher(items[:i]) if i else None, run))
+    except Exception:
+        return lambda text, pos: len(text)
+
+    def reach(text, pos):
+        end = text.find('\n', pos)
+        if end < 0:
+            return None
+        line_end = end
+        for prefix, run in steps:
+            if prefix is not None and not prefix(text, pos):
+                break
+            run_end = run(text, end).end() if run is not None else len(text)
+            end = text.find('\n', run_end)
+            if end < 0:
+                return len(text)
+        return end if end > line_end else None
+    return reach
+
+def _regs(match):
+    """The spans of a match and its groups, or None for no match."""
+    return match and match.regs
+
+_rules = {}
+
+def _lexer_rules(lexer):
+    """The rules of a RegexLexer by state, as (rexmatch, action,
+    new_state, reach) with reach from _line_reach."""
+    cls = type(lexer)
+    if cls not in _rules:
+        _rules[cls] = {state: [(rexmatch, action, new_state,
+                                _line_reach(rexmatch.__self__))
+                               for rexmatch, action, new_state in rules]
+                       for state, rules in lexer._tokens.items()}
+    return _rules[cls]
+
+
+class IncrementalPygmentsLexer(PygmentsLexer):
+    """PygmentsLexer that re-lexes a changed document from the changed line.
+
+    prompt_toolkit's PygmentsLexer lexes every new document from the start,
+    so each keystroke in a long cell re-highlights everything above the
+    cursor. For lexers that tokenize with RegexLexer's own loop (most of
+    them), this lexer records the state stack at the start of each line,
+    along with the line's tokens. When the document changes, the tokens of
+    the lines before the first changed one are kept, and lexing restarts
+    from the last line before it whose starting state is known. Other
+    lexers are handled by PygmentsLexer.
+
+    Some patterns can look any number of lines ahead, like the one for
+    Python docstrings, so a change can alter how earlier lines are lexed.
+    The attempts to match such patterns are recorded with each line, and
+    a line is only kept if they all give the same result on the new text.
+    """
+    def __init__(self, pygments_lexer_cls):
+        super(IncrementalPygmentsLexer, self).__init__(pygments_lexer_cls)
+        self.incremental = (isinstance(self.pygments_lexer, RegexLexer) and
+            _func(type(self.pygments_lexer).get_tokens_unprocessed) is
+            _func(RegexLexer.get_tokens_unprocessed))
+        self._text = None
+        # Text lines and tokens of the lines lexed so far, and the state
+        # stack at the start of each of them (None inside a token).
+        self._text_lines = []
+        self._lines = []
+        self._stacks = []
+        # (rexmatch, pos, match.regs or None, reach, end) of the attempts,
+        # while lexing each line, to match patterns which may have looked
+        # past its end, up to `end`; and the furthest end for each line.
+        self._tries = []
+        self._reach = []
+        # Generator of (tokens, stack, tries) for the following lines.
+        self._lexing = None
+
+    def lex_document(self, cli, document):
+        if not self.incremental:
+            return super(IncrementalPygmentsLexer, self).lex_document(
+                cli, document)
+
+        text, lines = document.text, document.lines
+        self._update(text, lines)
+
+        def get_line(i):
+            if self._text is not text:
+                # An older document of the same buffer
+                self._update(text, lines)
+            while len(self._lines) <= i and self._lexing is not None:
+                try:
+                    tokens, stack, tries = next(self._lexing)
+                except StopIteration:
+                    self._lexing = None
+                else:
+                    self._lines.append(tokens)
+                    self._stacks.append(stack)
+                    self._tries.append(tries)
+                    self._reach.append(max([t[-1] for t in tries] or [-1]))
+            try:
+                return self._lines[i]
+            except IndexError:
+                return []
+
+        return get_line
+
+    def _update(self, text, lines):
+        """Keep what is still valid for a new text and restart lexing."""
+        old = self._text_lines
+        same = min(len(self._lines), len(lines))
+        changed = 0
+        while changed < same and old[changed] == lines[changed]:
+            changed += 1
+        # Restart before the changed line: the end of the line before a
+        # change can be lexed differently if a pattern looks past it.
+        start = max(changed - 1, 0)
+        # Or before that, if a pattern tried on an earlier line looked at
+        # the changed text and matches differently now.
+        changed_pos = sum(len(line) + 1 for line in lines[:changed]) - 1
+        for i in range(start):
+            if self._reach[i] >= changed_pos:
+                tries = self._check_tries(self._tries[i], text, changed_pos)
+                if tries is None:
+                    start = i
+                    break
+                self._tries[i] = tries
+                self._reach[i] = max([t[-1] for t in tries] or [-1])
+        while self._stacks and self._stacks[start] is None:
+            start -= 1
+        stack = self._stacks[start] if self._stacks else ('root',)
+
+        self._text = text
+        self._text_lines = lines
+        del self._lines[start:], self._stacks[start:]
+        del self._tries[start:], self._reach[start:]
+        pos = sum(len(line) + 1 for line in lines[:start])
+        self._lexing = self._lex(text, pos, stack)
+
+    @staticmethod
+    def _check_tries(tries, text, changed_pos):
+        """The tries of a line updated for a new text, or None if one of
+        them matches differently."""
+        checked = []
+        for rexmatch, pos, regs, reach, end in tries:
+            if end >= changed_pos:
+                if _regs(rexmatch(text, pos)) != regs:
+                    return None
+                end = reach(text, pos)
+                if end is None:
+                    continue
+            checked.append((rexmatch, pos, regs, reach, end))
+        return tuple(checked)
+
+    def _lex(self, text, pos, stack):
+        """Yield the tokens of each line from `pos`, at the start of a line,
+        with the state stack at the start of the line, or None if the line
+        starts inside a token.
+
+        This is RegexLexer.get_tokens_unprocessed, splitting the tokens into
+        lines and noting the state at the start of each line.
+        """
+        lexer = self.pygments_lexer
+        tokendefs = _lexer_rules(lexer)
+        statestack = list(stack)
+        statetokens = tokendefs[statestack[-1]]
+        line, line_stack = [], tuple(statestack)
+        tries = []
+
+        def done():
+            # The tries of the line just completed
+            line_tries = tuple(tries)
+            del tries[:]
+            return line_tries
+
+        def split(tokens):
+            # Yield complete lines, adding the rest to `line`.
+            for _, t, v in tokens:
+                parts = v.split('\n')
+                for part in parts[:-1]:
+                    if part:
+                        line.append((t, part))
+                    yield line
+                    del line[:]
+                if parts[-1]:
+                    line.append((t, parts[-1]))
+
+        while 1:
+            if line_stack is None and not line and text[pos - 1] == '\n':
+                line_stack = tuple(statestack)
+            for rexmatch, action, new_state, reach in statetokens:
+                m = rexmatch(text, pos)
+                if reach is not None:
+                    end = reach(text, pos)
+                    if end is not None:
+                        tries.append((rexmatch, pos, _regs(m), reach, end))
+                if m:
+                    if action is not None:
+                        if type(action) is _TokenType:
+                            tokens = [(pos, action, m.group())]
+                        else:
+                            tokens = action(lexer, m)
+                        for tokens_done in split(tokens):
+                            yield list(tokens_done), line_stack, done()
+                            line_stack = None
+                    pos = m.end()
+                    if new_state is not None:
+                        # state transition
+                        if isinstance(new_state, tuple):
+                            for state in new_state:
+                                if state == '#pop':
+                                    if len(statestack) > 1:
+                                        statestack.pop()
+                                elif state == '#push':
+                                    statestack.append(statestack[-1])
+                                else:
+                                    statestack.append(state)
+                        elif isinstance(new_state, int):
+                            # pop, but keep at least one state on the stack
+                            if abs(new_state) >= len(statestack):
+                                del statestack[1:]
+                            else:
+                                del statestack[new_state:]
+                        elif new_state == '#push':
+                            statestack.append(statestack[-1])
+                        else:
+                            assert False, "wrong state def: %r" % new_state
+                        statetokens = tokendefs[statestack[-1]]
+                    break
+            else:
+                try:
+                    if text[pos] == '\n':
+                        # at EOL, reset state to "root"
+                        statestack = ['root']
+                        statetokens = tokendefs['root']
+                        yield list(line), line_stack, done()
+                        del line[:]
+                        line_stack = None
+                        pos += 1
+                        continue
+                    for tokens_done in split([(pos, Error, text[pos])]):
+                        yield list(tokens_done), line_stack, done()
+                        line_stack = None
+                    pos += 1
+                except IndexError:
+                    break
+        yield line, line_stack, done()
+
+
 class IPythonPTLexer(Lexer):
     """
     Wrapper around PythonLexer and BashLexer.
     """
     def __init__(self):
         l = pygments_lexers
-        self.python_lexer = PygmentsLexer(l.Python3Lexer if PY3 else l.PythonLexer)
-        self.shell_lexer = PygmentsLexer(l.BashLexer)
+        self.python_lexer = IncrementalPygmentsLexer(
+            l.Python3Lexer if PY3 else l.PythonLexer)
+        self.shell_lexer = IncrementalPygmentsLexer(l.BashLexer)
 
         self.magic_lexers = {
-            'HTML': PygmentsLexer(l.HtmlLexer),
-            'html': PygmentsLexer(l.HtmlLexer),
-            'javascript': PygmentsLexer(l.JavascriptLexer),
-            'js': PygmentsLexer(l.JavascriptLexer),
-            'perl': PygmentsLexer(l.PerlLexer),
-            'ruby': PygmentsLexer(l.RubyLexer),
-            'latex': PygmentsLexer(l.TexLexer),
+            'HTML': IncrementalPygmentsLexer(l.HtmlLexer),
+            'html': IncrementalPygmentsLexer(l.HtmlLexer),
+            'javascript': IncrementalPygmentsLexer(l.JavascriptLexer),
+            'js': IncrementalPygmentsLexer(l.JavascriptLexer),
+            'perl': IncrementalPygmentsLexer(l.PerlLexer),
+            'ruby': IncrementalPygmentsLexer(l.RubyLexer),
+            'latex': IncrementalPygmentsLexer(l.TexLexer),
         }
 
     def lex_document(self, cli, document):
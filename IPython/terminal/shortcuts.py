@@ -91,7 +91,10 @@ def newline_or_execute(event):
             b.newline()
             return
 
-        status, indent = shell.input_splitter.check_complete(d.text + '\n')
+        # While lines are only added at the end, as when typing or pasting
+        # without bracketed paste, only the new lines are checked.
+        status, indent = shell.input_splitter.check_complete(d.text + '\n',
+                                                             incremental=True)
 
         if (status != 'incomplete') and b.accept_action.is_returnable:
             b.accept_action.validate_and_handle(event.cli, b)
@@ -0,0 +1,409 @@
+"""Idle cost and input latency of the prompt_toolkit GUI inputhooks.
+
+Not collected by the test suite, run with::
+
+    python -m IPython.terminal.tests.bench_inputhooks
+
+Each inputhook in IPython.terminal.pt_inputhooks is imported with fake
+toolkit modules, all built on one small select() based event loop. The hook
+runs while the shell is idle, then a key is pressed. The table shows the CPU
+time used per second of idling, the time from the keypress until the hook
+returns to the prompt, and how many times the hook woke up, either in the
+fake toolkit's loop or to poll for input. Posix only.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import print_function
+
+import importlib
+import os
+import resource
+import select
+import sys
+import threading
+import time
+import types
+
+
+class FakeContext(object):
+    """Stands in for prompt_toolkit's InputHookContext."""
+    def __init__(self):
+        self._r, self._w = os.pipe()
+        self.polls = 0
+
+    def fileno(self):
+        return self._r
+
+    def input_is_ready(self):
+        self.polls += 1
+        return bool(select.select([self._r], [], [], 0)[0])
+
+    def press_key(self):
+        os.write(self._w, b'x')
+
+    def close(self):
+        os.close(self._r)
+        os.close(self._w)
+
+
+class FakeLoop(object):
+    """A minimal toolkit event loop: file watchers, timers, and callbacks
+    posted from other threads."""
+    def __init__(self):
+        self.watchers = {}
+        self.timers = []
+        self.calls = []
+        self.wakeups = 0
+        self._lock = threading.Lock()
+        self._r, self._w = os.pipe()
+
+    def post(self, callback):
+        """Call `callback` from the loop. Safe to call from any thread."""
+        with self._lock:
+            self.calls.append(callback)
+        os.write(self._w, b'x')
+
+    def add_timer(self, interval, callback):
+        timer = [time.time() + interval, interval, callback]
+        self.timers.append(timer)
+        return timer
+
+    def remove_timer(self, timer):
+        if timer in self.timers:
+            self.timers.remove(timer)
+
+    def pending(self):
+        return bool(self.calls or self._ready(0)
+                    or any(t[0] <= time.time() for t in self.timers))
+
+    def _ready(self, timeout):
+        fds = list(self.watchers) + [self._r]
+        return select.select(fds, [], [], timeout)[0]
+
+    def process(self, block=True, timeout=None):
+        """Handle the events that are ready, waiting for one if `block`.
+
+        Returns whether anything was handled.
+        """
+        if not block:
+            timeout = 0
+        elif self.timers:
+            due = max(0, min(t[0] for t in self.timers) - time.time())
+            timeout = due if timeout is None else min(timeout, due)
+        ready = self._ready(timeout)
+        self.wakeups += 1
+        handled = False
+        if self._r in ready:
+            os.read(self._r, 1024)
+            with self._lock:
+                calls, self.calls = self.calls, []
+            for call in calls:
+                call()
+                handled = True
+        for fd in ready:
+            if fd in self.watchers:
+                self.watchers[fd]()
+                handled = True
+        now = time.time()
+        for timer in list(self.timers):
+            if timer[0] <= now:
+                timer[0] = now + timer[1]
+                timer[2]()
+                handled = True
+        return handled
+
+    def close(self):
+        os.close(self._r)
+        os.close(self._w)
+
+
+def _module(name, **attrs):
+    mod = types.ModuleType(name)
+    mod.__dict__.update(attrs)
+    return mod
+
+
+class _Signal(object):
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def emit(self, *args):
+        for slot in self.slots:
+            slot(*args)
+
+
+def fake_tk(loop, filehandler=True):
+    READABLE, DONT_WAIT, ALL_EVENTS = 2, 2, -3
+
+    class Root(object):
+        def dooneevent(self, flags=0):
+            return loop.process(block=not flags & DONT_WAIT)
+
+    class FileHandlerRoot(Root):
+        def createfilehandler(self, fd, mask, callback):
+            loop.watchers[fd] = lambda: callback(fd, mask)
+
+        def deletefilehandler(self, fd):
+            loop.watchers.pop(fd, None)
+
+    root = FileHandlerRoot() if filehandler else Root()
+    tkinter = _module('tkinter', _default_root=root)
+    return {'_tkinter': _module('_tkinter', READABLE=READABLE,
+                                DONT_WAIT=DONT_WAIT, ALL_EVENTS=ALL_EVENTS),
+            'tkinter': tkinter, 'Tkinter': tkinter}
+
+
+def fake_wx(loop):
+    class EventLoop(object):
+        running = False
+
+        def Run(self):
+            self.running = True
+            while self.running:
+                loop.process()
+
+        def Exit(self):
+            self.running = False
+
+        def IsRunning(self):
+            return self.running
+
+        def Pending(self):
+            return loop.pending()
+
+        def Dispatch(self):
+            loop.process(block=False)
+
+    class Timer(object):
+        _timer = None
+
+        def Start(self, ms):
+            self._timer = loop.add_timer(ms / 1000., self.Notify)
+
+        def Stop(self):
+            loop.remove_timer(self._timer)
+
+    class App(object):
+        def ProcessIdle(self):
+            pass
+
+    app = App()
+    return {'wx': _module('wx', GetApp=lambda: app, Thread_IsMain=lambda: True,
+                          EventLoop=EventLoop, Timer=Timer,
+                          EventLoopActivator=lambda loop: None,
+                          CallAfter=loop.post)}
+
+
+def fake_pyglet(loop):
+    class PlatformEventLoop(object):
+        def start(self):
+            pass
+
+        def step(self, timeout=None):
+            return loop.process(timeout=timeout)
+
+        def notify(self):
+            loop.post(lambda: None)
+
+    clock = _module('pyglet.clock', tick=lambda: None,
+                    get_sleep_time=lambda sleep_idle: None)
+    app = _module('pyglet.app', windows=[],
+                  platform_event_loop=PlatformEventLoop())
+    pyglet = _module('pyglet', clock=clock, app=app)
+    return {'pyglet': pyglet, 'pyglet.clock': clock, 'pyglet.app': app}
+
+
+def fake_qt(loop):
+    class QEventLoop(object):
+        def __init__(self, app):
+            self.running = False
+
+        def exec_(self):
+            self.running = True
+            while self.running:
+                loop.process()
+
+        def exit(self, code=0):
+            self.running = False
+
+        quit = exit
+
+    class QSocketNotifier(object):
+        Read = 0
+
+        def __init__(self, fd, kind):
+            self.activated = _Signal()
+            loop.watchers[fd] = lambda: self.activated.emit(fd)
+
+        def setEnabled(self, enabled):
+            pass
+
+    class QTimer(object):
+        _timer = None
+
+        def __init__(self):
+            self.timeout = _Signal()
+
+        def start(self, ms):
+            self._timer = loop.add_timer(ms / 1000., self.timeout.emit)
+
+        def stop(self):
+            loop.remove_timer(self._timer)
+
+    app = object()
+    QtCore = _module('QtCore', QEventLoop=QEventLoop, QTimer=QTimer,
+                     QSocketNotifier=QSocketNotifier,
+                     QCoreApplication=_module('QCoreApplication',
+                                              instance=lambda: app))
+    return {'IPython.external.qt_for_kernel':
+                _module('qt_for_kernel', QtCore=QtCore, QtGui=None)}
+
+
+def _fake_gtk_main(loop):
+    state = {'levels': []}
+
+    def main():
+        state['levels'].append(True)
+        while state['levels'][-1]:
+            loop.process()
+        state['levels'].pop()
+
+    def main_quit():
+        state['levels'][-1] = False
+
+    def io_add_watch(fd, condition, callback):
+        def watcher():
+            if not callback(fd, condition):
+                loop.watchers.pop(fd, None)
+        loop.watchers[fd] = watcher
+
+    return main, main_quit, io_add_watch
+
+
+def fake_gtk(loop):
+    main, main_quit, io_add_watch = _fake_gtk_main(loop)
+    gdk = _module('gtk.gdk', threads_init=lambda: None)
+    return {'gtk': _module('gtk', main=main, main_quit=main_quit, gdk=gdk),
+            'gobject': _module('gobject', io_add_watch=io_add_watch,
+                               IO_IN=1)}
+
+
+def fake_gtk3(loop):
+    main, main_quit, io_add_watch = _fake_gtk_main(loop)
+    Gtk = _module('Gtk', main=main, main_quit=main_quit)
+    GLib = _module('GLib', io_add_watch=io_add_watch, IO_IN=1)
+    repository = _module('gi.repository', Gtk=Gtk, GLib=GLib)
+    return {'gi': _module('gi', repository=repository),
+            'gi.repository': repository}
+
+
+def fake_glut(loop):
+    def noop(*args):
+        pass
+
+    GLUT = _module('OpenGL.GLUT', GLUT_DOUBLE=1, GLUT_RGBA=2, GLUT_DEPTH=4,
+                   GLUT_ACTION_ON_WINDOW_CLOSE=0,
+                   GLUT_ACTION_GLUTMAINLOOP_RETURNS=0, HAVE_FREEGLUT=True,
+                   glutMainLoopEvent=lambda: loop.process(block=False),
+                   glutGetWindow=lambda: 1)
+    for name in ('glutInit', 'glutInitDisplayMode', 'glutSetOption',
+                 'glutCreateWindow', 'glutReshapeWindow', 'glutHideWindow',
+                 'glutWMCloseFunc', 'glutDisplayFunc', 'glutIdleFunc',
+                 'glutSetWindow'):
+        setattr(GLUT, name, noop)
+    platform = _module('OpenGL.platform')
+    return {'OpenGL': _module('OpenGL', GLUT=GLUT, platform=platform),
+            'OpenGL.GLUT': GLUT, 'OpenGL.platform': platform}
+
+
+# (label, module, fake toolkit, fake options, inputhook function)
+BACKENDS = [
+    ('qt', 'qt', fake_qt, {}, 'inputhook'),
+    ('gtk', 'gtk', fake_gtk, {}, 'inputhook'),
+    ('gtk3', 'gtk3', fake_gtk3, {}, 'inputhook'),
+    ('tk', 'tk', fake_tk, {}, 'inputhook'),
+    ('tk, no filehandler', 'tk', fake_tk, {'filehandler': False},
+     'inputhook'),
+    ('wx', 'wx', fake_wx, {}, 'inputhook_wx4'),
+    ('wx, polling', 'wx', fake_wx, {}, 'inputhook_wx3'),
+    ('pyglet', 'pyglet', fake_pyglet, {}, 'inputhook_wait'),
+    ('pyglet, polling', 'pyglet', fake_pyglet, {}, 'inputhook_poll'),
+    ('glut', 'glut', fake_glut, {}, 'inputhook'),
+]
+
+
+def load_inputhook(module, fake_modules, name='inputhook'):
+    """Import an inputhook module using `fake_modules` for its toolkit."""
+    full_name = 'IPython.terminal.pt_inputhooks.' + module
+    saved = dict((m, sys.modules.get(m)) for m in fake_modules)
+    sys.modules.update(fake_modules)
+    sys.modules.pop(full_name, None)
+    try:
+        return getattr(importlib.import_module(full_name), name)
+    finally:
+        sys.modules.pop(full_name, None)
+        for m, mod in saved.items():
+            if mod is None:
+                del sys.modules[m]
+            else:
+                sys.modules[m] = mod
+
+
+def _cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def measure(backend, idle=0.5):
+    """Run one backend's inputhook for `idle` seconds, then press a key.
+
+    Returns (CPU seconds per second idle, seconds from the keypress until
+    the hook returned, number of wakeups).
+    """
+    label, module, fake, options, name = backend
+    loop, context = FakeLoop(), FakeContext()
+    try:
+        inputhook = load_inputhook(module, fake(loop, **options), name)
+        pressed = []
+
+        def press_key():
+            time.sleep(idle)
+            pressed.append(time.time())
+            context.press_key()
+
+        thread = threading.Thread(target=press_key)
+        thread.start()
+        cpu = _cpu_time()
+        inputhook(context)
+        returned = time.time()
+        cpu = _cpu_time() - cpu
+        thread.join()
+        return (cpu / idle, returned - pressed[0],
+                loop.wakeups + context.polls)
+    finally:
+        loop.close()
+        context.close()
+
+
+def main():
+    import signal
+    sigint = signal.getsignal(signal.SIGINT)
+    print('%-20s %10s %10s %8s' % ('backend', 'idle CPU', 'latency',
+                                   'wakeups'))
+    try:
+        for backend in BACKENDS:
+            cpu, latency, wakeups = measure(backend, idle=2)
+            print('%-20s %9.2f%% %8.2fms %8d' % (backend[0], 100 * cpu,
+                                                 1000 * latency, wakeups))
+    finally:
+        # glut's inputhook installs its own SIGINT handler
+        signal.signal(signal.SIGINT, sigint)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Benchmarks for highlighting a long cell while typing in it.
+
+Not collected by the test suite, run with::
+
+    python -m IPython.terminal.tests.bench_lexer
+
+Each keystroke makes a new document, and a screenful of lines around the
+cursor is highlighted, as the prompt does on every render. The 'pygments'
+column lexes each document from the start, as prompt_toolkit's PygmentsLexer
+does; 'incremental' re-lexes from the changed line.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import print_function
+
+import timeit
+
+from prompt_toolkit.document import Document
+from prompt_toolkit.layout.lexers import PygmentsLexer
+from pygments.lexers import BashLexer, PythonLexer
+
+from IPython.terminal.ptutils import IncrementalPygmentsLexer
+
+SCREEN = 40
+
+PYTHON = """\
+def f%d(a, b=None):
+    '''Docstring,
+    on two lines.'''
+    return [a, b, "%%s" %% a]  # comment
+"""
+
+BASH = """\
+for f in *.log; do
+    grep -c "error %d" "$f" | tee -a out.txt
+done
+"""
+
+
+def type_text(lexer, text, typed, at_end):
+    """Type `typed` into `text` one character at a time, highlighting a
+    screenful of lines around the cursor after each one."""
+    pos = len(text) if at_end else text.index('\n') + 1
+    for c in typed:
+        text = text[:pos] + c + text[pos:]
+        pos += 1
+        document = Document(text, pos)
+        get_line = lexer.lex_document(None, document)
+        row = document.cursor_position_row
+        for i in range(max(0, row - SCREEN + 1), row + 1):
+            get_line(i)
+
+
+def bench(cls, lexer_cls, text, at_end, number=3):
+    """Best time per keystroke, in milliseconds."""
+    typed = 'x = 1\n' * 5
+    lexer = cls(lexer_cls)
+    t = min(timeit.repeat(lambda: type_text(lexer, text, typed, at_end),
+                          number=1, repeat=number))
+    return 1000 * t / len(typed)
+
+
+def main():
+    print('%-7s %6s %-6s %12s %12s' % ('lexer', 'lines', 'typing', 'pygments',
+                                       'incremental'))
+    for name, lexer_cls, chunk in (('python', PythonLexer, PYTHON),
+                                   ('bash', BashLexer, BASH)):
+        for n in (100, 500, 2000):
+            text = ''.join(chunk % i for i in range(n // chunk.count('\n')))
+            for at_end in (True, False):
+                print('%-7s %6d %-6s %10.2fms %10.2fms' % (name, n,
+                    'end' if at_end else 'top',
+                    bench(PygmentsLexer, lexer_cls, text, at_end),
+                    bench(IncrementalPygmentsLexer, lexer_cls, text, at_end)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Benchmarks for pasting code into the prompt_toolkit shell.
+
+Not collected by the test suite, run with::
+
+    python -m IPython.terminal.tests.bench_paste
+
+The code is sent through a pipe to a prompt with IPython's key bindings,
+either wrapped in bracketed paste markers, as terminals do when bracketed
+paste is enabled, or raw, as if typed very fast. A bracketed paste is inserted
+as a single edit and checked for completeness once, when Enter is pressed. A
+raw paste goes through the Enter handler at every newline; the 'full' column
+checks the whole buffer there, as the shell did before the checks were made
+incremental.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import print_function
+
+import time
+
+from prompt_toolkit.input import PipeInput
+from prompt_toolkit.interface import CommandLineInterface
+from prompt_toolkit.key_binding.manager import KeyBindingManager
+from prompt_toolkit.output import DummyOutput
+from prompt_toolkit.shortcuts import create_prompt_application, create_eventloop
+
+from IPython.core.inputsplitter import IPythonInputSplitter
+from IPython.terminal.interactiveshell import TerminalInteractiveShell
+from IPython.terminal.shortcuts import register_ipython_shortcuts
+
+
+class FullCheckSplitter(IPythonInputSplitter):
+    """Checks the whole source every time."""
+    def check_complete(self, source, incremental=False):
+        return super(FullCheckSplitter, self).check_complete(source)
+
+
+def make_source(n):
+    """A class definition about n lines long."""
+    body = ["    def f%d(self, a):",
+            "        '''Docstring.'''",
+            "        return [a,",
+            "                %d]"]
+    lines = ["class C(object):"]
+    i = 0
+    while len(lines) < n:
+        lines.extend(l % i if '%d' in l else l for l in body)
+        i += 1
+    return '\n'.join(lines) + '\n'
+
+
+def paste(shell, source, bracketed):
+    """Time, in seconds, to paste `source` and press Enter."""
+    kbm = KeyBindingManager.for_prompt()
+    register_ipython_shortcuts(kbm.registry, shell)
+    app = create_prompt_application(key_bindings_registry=kbm.registry,
+                                    **shell._layout_options())
+    inp = PipeInput()
+    cli = CommandLineInterface(app, eventloop=create_eventloop(), input=inp,
+                               output=DummyOutput())
+    if bracketed:
+        inp.send_text('\x1b[200~' + source + '\x1b[201~\n')
+    else:
+        inp.send_text(source + '\n')
+    try:
+        start = time.time()
+        cli.run()
+        return time.time() - start
+    finally:
+        inp.close()
+
+
+def main():
+    shell = TerminalInteractiveShell.instance(simple_prompt=True)
+    incremental = shell.input_splitter
+    full = FullCheckSplitter()
+    print('%6s %-10s %10s %12s' % ('lines', 'paste', 'full', 'incremental'))
+    for n in (100, 500, 1000):
+        source = make_source(n)
+        for bracketed in (True, False):
+            times = []
+            for splitter in (full, incremental):
+                shell.input_splitter = splitter
+                times.append(paste(shell, source, bracketed))
+            print('%6d %-10s %9.3fs %11.3fs' % ((n,
+                'bracketed' if bracketed else 'raw') + tuple(times)))
+    shell.input_splitter = incremental
+
+
+if __name__ == '__main__':
+    main()
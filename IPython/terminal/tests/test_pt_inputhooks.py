@@ -0,0 +1,45 @@
+"""Tests for the prompt_toolkit GUI inputhooks, using fake toolkits."""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import signal
+
+import nose.tools as nt
+
+from IPython.testing import decorators as dec
+
+
+def _check_event_driven(backend):
+    from IPython.terminal.tests.bench_inputhooks import measure
+    sigint = signal.getsignal(signal.SIGINT)
+    try:
+        cpu, latency, wakeups = measure(backend, idle=0.2)
+    finally:
+        signal.signal(signal.SIGINT, sigint)
+    # The hook sleeps until the key is pressed, then returns straight away
+    nt.assert_less(wakeups, 5)
+    nt.assert_less(latency, 0.1)
+
+
+@dec.skip_win32
+def test_event_driven_inputhooks():
+    from IPython.terminal.tests.bench_inputhooks import BACKENDS
+    for backend in BACKENDS:
+        label = backend[0]
+        if 'polling' in label or 'no filehandler' in label or label == 'glut':
+            continue
+        yield _check_event_driven, backend
+
+
+@dec.skip_win32
+def test_glut_wakes_on_input():
+    from IPython.terminal.tests.bench_inputhooks import BACKENDS, measure
+    glut, = [b for b in BACKENDS if b[0] == 'glut']
+    sigint = signal.getsignal(signal.SIGINT)
+    try:
+        # After a second idle, glut waits for up to 50ms between events
+        cpu, latency, wakeups = measure(glut, idle=0.5)
+    finally:
+        signal.signal(signal.SIGINT, sigint)
+    nt.assert_less(latency, 0.02)
@@ -0,0 +1,71 @@
+"""Tests for the prompt_toolkit adaptors in IPython.terminal.ptutils."""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import nose.tools as nt
+
+from prompt_toolkit.document import Document
+from prompt_toolkit.layout.lexers import PygmentsLexer
+from pygments.lexers import BashLexer, PythonLexer, RubyLexer
+
+from IPython.terminal.ptutils import IncrementalPygmentsLexer
+
+
+def lex(lexer, text):
+    get_line = lexer.lex_document(None, Document(text))
+    return [[t for t in get_line(i) if t[1]]
+            for i in range(len(Document(text).lines))]
+
+
+def test_incremental_lexer():
+    texts = [
+        'def f(x):\n    return x\n\ny = f(1)',
+        'def f(x):\n    """Doc\n    return x\n\ny = f(1)',
+        'def f(x):\n    """Doc"""\n    return x\n\ny = f(1)',
+        'def f(x):\n    """Doc"""\n    return x\n\ny = f(1)\nz = 2',
+        'x = 1',
+        '',
+    ]
+    for cls in (PythonLexer, BashLexer):
+        lexer, reference = IncrementalPygmentsLexer(cls), PygmentsLexer(cls)
+        nt.assert_true(lexer.incremental)
+        for text in texts + texts[::-1]:
+            nt.assert_equal(lex(lexer, text), lex(reference, text))
+
+
+def test_incremental_lexer_earlier_lines():
+    # Closing a docstring at the end changes how the lines above it are
+    # lexed, as the pattern for docstrings looks ahead any number of lines.
+    doc = 'def f():\n    """doc\n    more\n    x = 1\n'
+    texts = [doc, doc + '    """\n', doc,
+             'cat <<EOF\nx\n', 'cat <<EOF\nx\nEOF\n']
+    for cls in (PythonLexer, BashLexer):
+        lexer, reference = IncrementalPygmentsLexer(cls), PygmentsLexer(cls)
+        for text in texts:
+            nt.assert_equal(lex(lexer, text), lex(reference, text))
+
+def test_incremental_lexer_keeps_lines():
+    lexer = IncrementalPygmentsLexer(PythonLexer)
+    lines = ['x%d = [%d,' % (i, i) for i in range(20)]
+    text = '\n'.join(lines)
+    lex(lexer, text)
+    before = list(lexer._lines)
+    lex(lexer, text + '\n1]')
+    # Lines before the last one of the old text are reused
+    for old, new in zip(before[:-1], lexer._lines):
+        nt.assert_is(old, new)
+    nt.assert_is_not(before[-1], lexer._lines[19])
+
+    # Getting lines of an older document lexes it again
+    get_line = lexer.lex_document(None, Document('"""\nx = 1'))
+    lexer.lex_document(None, Document('\nx = 1'))
+    nt.assert_equal({t for t, _ in get_line(1)},
+                    {t for t, _ in get_line(0)})
+
+
+def test_fallback_lexer():
+    lexer = IncrementalPygmentsLexer(RubyLexer)
+    nt.assert_false(lexer.incremental)
+    text = 'def f\n  "a#{1}"\nend'
+    nt.assert_equal(lex(lexer, text), lex(PygmentsLexer(RubyLexer), text))
@@ -145,7 +145,12 @@ def nopage(strng, start=0, screen_lines=0, pager_cmd=None):
            strng = strng.get('text/plain', '')
         print(strng)
     
+    def nopage_lines(lines, start=0, screen_lines=0, pager_cmd=None):
+        print(u'\n'.join(lines))
+
     page.orig_page = page.pager_page
     page.pager_page = nopage
+    page.orig_page_lines = page.pager_page_lines
+    page.pager_page_lines = nopage_lines
 
     return _ip
@@ -269,6 +269,43 @@ def format2(self, raw, out = None, scheme = ''):
             return (output, error)
         return (None, error)
 
+    def format_lines(self, lines, scheme = ''):
+        """ Colorize source given as an iterable of lines, a block at a time.
+
+        This is a generator of the colored text of successive blocks of
+        lines, without their final newline, for consumers like a pager that
+        shouldn't wait for the whole source. Blocks only end before a line
+        starting at column 0, where the source so far tokenizes cleanly, so
+        they are colored as they would be in the whole source. Lines may
+        have their newline or not.
+        """
+        block = []
+        # Blocks are at least this long, so that sources without many top
+        # level lines aren't tokenized again and again.
+        min_lines = 100
+        for line in lines:
+            line = line.rstrip('\r\n')
+            if len(block) >= min_lines and line[:1] not in ('', ' ', '\t'):
+                out, error = self._format_block(block, scheme)
+                if error:
+                    min_lines = 2 * len(block)
+                else:
+                    yield out
+                    block = []
+                    min_lines = 100
+            block.append(line)
+        if block:
+            yield self._format_block(block, scheme)[0]
+
+    def _format_block(self, block, scheme):
+        raw = '\n'.join(block)
+        if scheme == 'NoColor':
+            return raw, False
+        out, error = self.format2(raw, 'str', scheme)
+        # format2() drops trailing blank lines and adds a newline
+        blank = raw[len(raw.rstrip()):].count('\n')
+        return out[:-1] + '\n' * blank, error
+
     def __call__(self, toktype, toktext, start_pos, end_pos, line):
         """ Token handler, with syntax highlighting."""
         (srow,scol) = start_pos
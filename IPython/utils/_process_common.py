@@ -14,12 +14,20 @@
 #-----------------------------------------------------------------------------
 # Imports
 #-----------------------------------------------------------------------------
+import bisect
+import codecs
+import errno
+import itertools
 import subprocess
 import shlex
 import sys
 import os
+import tempfile
+import threading
 
 from IPython.utils import py3compat
+from IPython.utils.encoding import DEFAULT_ENCODING
+from IPython.utils.text import SList
 
 #-----------------------------------------------------------------------------
 # Function definitions
@@ -40,6 +48,27 @@ def read_no_interrupt(p):
             raise
 
 
+def _popen(cmd, stderr):
+    """Start `cmd` with pipes for its input and output, as process_handler()
+    does."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    # On win32, close_fds can't be true when using pipes for stdin/out/err
+    close_fds = sys.platform != 'win32'
+    # Determine if cmd should be run with system shell.
+    shell = isinstance(cmd, py3compat.string_types)
+    # On POSIX systems run shell commands with user-preferred shell.
+    executable = None
+    if shell and os.name == 'posix' and 'SHELL' in os.environ:
+        executable = os.environ['SHELL']
+    return subprocess.Popen(cmd, shell=shell,
+                            executable=executable,
+                            stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE,
+                            stderr=stderr,
+                            close_fds=close_fds)
+
+
 def process_handler(cmd, callback, stderr=subprocess.PIPE):
     """Open a command in a shell subprocess and execute a callback.
 
@@ -66,22 +95,7 @@ def process_handler(cmd, callback, stderr=subprocess.PIPE):
     -------
     The return value of the provided callback is returned.
     """
-    sys.stdout.flush()
-    sys.stderr.flush()
-    # On win32, close_fds can't be true when using pipes for stdin/out/err
-    close_fds = sys.platform != 'win32'
-    # Determine if cmd should be run with system shell.
-    shell = isinstance(cmd, py3compat.string_types)
-    # On POSIX systems run shell commands with user-preferred shell.
-    executable = None
-    if shell and os.name == 'posix' and 'SHELL' in os.environ:
-        executable = os.environ['SHELL']
-    p = subprocess.Popen(cmd, shell=shell,
-                         executable=executable,
-                         stdin=subprocess.PIPE,
-                         stdout=subprocess.PIPE,
-                         stderr=stderr,
-                         close_fds=close_fds)
+    p = _popen(cmd, stderr)
 
     try:
         out = callback(p)
@@ -133,6 +147,263 @@ def getoutput(cmd):
     return py3compat.bytes_to_str(out)
 
 
+class StreamingSList(object):
+    """The output lines of a running process, as they are produced.
+
+    This has the same interface as :class:`~IPython.utils.text.SList`, but
+    lines are read from the process by a thread. Iterating over it gives
+    each line as soon as it has been read, and only waits for the process
+    when it runs out of lines; ``grep()`` and ``fields()`` work through the
+    lines the same way. ``len()``, negative indices and the ``.l``, ``.n``,
+    ``.s`` and ``.p`` attributes wait for the process to exit.
+
+    Up to `limit` characters of lines are kept in memory. Lines after that
+    are kept in a temporary file, so that output of any size can be
+    captured. Interrupting a wait for more output terminates the process.
+    """
+    def __init__(self, process, limit=2**26):
+        self._process = process
+        self._limit = limit
+        self._lines = []
+        self._size = 0
+        # Lines past the limit, in a temporary file. Each block written to it
+        # is indexed by its first line and its offset.
+        self._spill = None
+        self._spill_end = 0
+        self._block_lines = []
+        self._block_offsets = []
+        self._count = 0
+        self._done = False
+        self._cond = threading.Condition()
+        self._reader = threading.Thread(target=self._read_output)
+        self._reader.daemon = True
+        self._reader.start()
+
+    def _read_output(self):
+        if py3compat.PY3:
+            # Reads may end in the middle of a character
+            decode = codecs.getincrementaldecoder(DEFAULT_ENCODING)(
+                'replace').decode
+        else:
+            decode = lambda data, final=False: data
+        fd = self._process.stdout.fileno()
+        pending = ''
+        try:
+            while True:
+                try:
+                    data = os.read(fd, 65536)
+                except OSError as err:
+                    if err.errno == errno.EINTR:
+                        continue
+                    raise
+                text = pending + decode(data, not data)
+                lines = text.splitlines()
+                pending = ''
+                # Keep an unfinished last line, or a '\r' that may turn out
+                # to be half of a '\r\n', for the next read
+                if data and text:
+                    if text[-1] == '\r':
+                        pending = lines.pop() + '\r'
+                    elif len((text[-1] + 'x').splitlines()) == 1:
+                        # The text doesn't end with a line break
+                        pending = lines.pop()
+                self._add(lines)
+                if not data:
+                    break
+            self._process.stdout.close()
+            self._process.wait()
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def _add(self, lines):
+        with self._cond:
+            self._count += len(lines)
+            if self._spill is None:
+                size = sum(len(line) for line in lines)
+                if self._size + size <= self._limit:
+                    self._lines.extend(lines)
+                    self._size += size
+                    lines = []
+                else:
+                    for i, line in enumerate(lines):
+                        self._size += len(line)
+                        if self._size > self._limit:
+                            break
+                    self._lines.extend(lines[:i])
+                    lines = lines[i:]
+                    self._spill = tempfile.TemporaryFile()
+            if lines:
+                data = py3compat.str_to_bytes('\n'.join(lines) + '\n',
+                                              'utf-8')
+                self._block_lines.append(self._count - len(lines)
+                                         - len(self._lines))
+                self._block_offsets.append(self._spill_end)
+                self._spill.seek(0, os.SEEK_END)
+                self._spill.write(data)
+                self._spill_end += len(data)
+            self._cond.notify_all()
+
+    def _wait(self, index=None):
+        """Wait until line `index` has been read, or the process has exited
+        if `index` is None. Returns whether line `index` exists."""
+        try:
+            with self._cond:
+                while not self._done and (index is None or
+                                          self._count <= index):
+                    # A timeout keeps the wait interruptible on Python 2
+                    self._cond.wait(1)
+        except KeyboardInterrupt:
+            self.terminate()
+            raise
+        return index is not None and index < self._count
+
+    def _get(self, start, n):
+        """Some of the lines read so far, from line `start`: up to `n` lines,
+        stopping at the end of the lines in memory or of a block in the
+        temporary file."""
+        with self._cond:
+            in_memory = len(self._lines)
+            if start < in_memory:
+                return self._lines[start:min(start + n, in_memory)]
+            if start >= self._count:
+                return []
+            index = start - in_memory
+            block = bisect.bisect_right(self._block_lines, index) - 1
+            begin = self._block_offsets[block]
+            if block + 1 < len(self._block_offsets):
+                end = self._block_offsets[block + 1]
+            else:
+                end = self._spill_end
+            self._spill.seek(begin)
+            data = self._spill.read(end - begin)
+        lines = py3compat.bytes_to_str(data, 'utf-8').split('\n')
+        first = index - self._block_lines[block]
+        return lines[first:min(first + n, len(lines) - 1)]
+
+    def terminate(self):
+        """Stop the process. The lines read so far are kept."""
+        if self._process.poll() is None:
+            try:
+                self._process.terminate()
+            except OSError:
+                pass
+
+    def __iter__(self):
+        index = 0
+        while self._wait(index):
+            lines = self._get(index, 100000)
+            for line in lines:
+                yield line
+            index += len(lines)
+
+    def __len__(self):
+        self._wait()
+        return self._count
+
+    def __bool__(self):
+        return self._wait(0)
+
+    __nonzero__ = __bool__ # Python 2
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if ((index.start or 0) >= 0 and (index.stop or 0) >= 0
+                    and (index.step or 1) > 0):
+                return SList(itertools.islice(self, index.start, index.stop,
+                                              index.step))
+            return SList(list(self)[index])
+        if index < 0:
+            index += len(self)
+        if index < 0 or not self._wait(index):
+            raise IndexError('list index out of range')
+        return self._get(index, 1)[0]
+
+    def __eq__(self, other):
+        return list(self) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.l)
+
+    def _repr_pretty_(self, p, cycle):
+        p.pretty(self.l)
+
+    def get_list(self):
+        return SList(self)
+
+    l = list = property(get_list)
+
+    def get_spstr(self):
+        return self.l.s
+
+    s = spstr = property(get_spstr)
+
+    def get_nlstr(self):
+        return self.l.n
+
+    n = nlstr = property(get_nlstr)
+
+    def get_paths(self):
+        return self.l.p
+
+    p = paths = property(get_paths)
+
+    def _chunks(self, size=10000):
+        lines = iter(self)
+        while True:
+            chunk = SList(itertools.islice(lines, size))
+            if not chunk:
+                return
+            yield chunk
+
+    def grep(self, pattern, prune=False, field=None):
+        """Like SList.grep, going through the lines as they are read."""
+        res = SList()
+        for chunk in self._chunks():
+            res.extend(chunk.grep(pattern, prune, field))
+        return res
+
+    def fields(self, *fields):
+        """Like SList.fields, going through the lines as they are read."""
+        res = SList() if fields else []
+        for chunk in self._chunks():
+            res.extend(chunk.fields(*fields))
+        return res
+
+    def sort(self, field=None, nums=False):
+        """Like SList.sort, once all the lines have been read."""
+        return self.l.sort(field, nums)
+
+
+def getoutput_stream(cmd, limit=2**26):
+    """Run a command, and return its combined stdout/stderr lines as they
+    are produced.
+
+    Parameters
+    ----------
+    cmd : str or list
+      A command to be executed in the system shell.
+    limit : int
+      Characters of output to keep in memory, beyond which lines are kept
+      in a temporary file.
+
+    Returns
+    -------
+    output : StreamingSList
+      The lines of output, as would be returned by
+      ``getoutput(cmd).splitlines()``, filled in while the command runs.
+    """
+    p = _popen(cmd, subprocess.STDOUT)
+    p.stdin.close()
+    return StreamingSList(p, limit)
+
+
 def getoutputerror(cmd):
     """Return (standard output, standard error) of executing cmd in a shell.
 
@@ -0,0 +1,64 @@
+"""Latency and peak memory of capturing command output with `x = !cmd`.
+
+Not collected by the test suite, run with::
+
+    python -m IPython.utils.tests.bench_getoutput
+
+'full' is getoutput() split into an SList, as `!cmd` captures by default;
+'streaming' is getoutput_stream(). The first table shows when the first line
+of a command that prints, then works for a second, can be used. The second
+shows the peak memory traced while grepping the output of a command printing
+2 million lines (about 15MB), with the in-memory part of the streamed output
+limited to 1MB. Posix, Python 3 only.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import print_function
+
+import time
+import tracemalloc
+
+from IPython.utils.process import getoutput, getoutput_stream
+from IPython.utils.text import SList
+
+SLOW = 'echo first; sleep 1; echo last'
+LARGE = 'seq 2000000'
+
+
+def full(cmd):
+    return SList(getoutput(cmd).splitlines())
+
+
+def streaming(cmd):
+    return getoutput_stream(cmd, limit=2**20)
+
+
+def first_line(func):
+    t = time.time()
+    func(SLOW)[0]
+    return time.time() - t
+
+
+def grep_memory(func):
+    tracemalloc.start()
+    t = time.time()
+    matches = func(LARGE).grep('^1999')
+    t = time.time() - t
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert len(matches) == 1111
+    return t, peak / 2.**20
+
+
+def main():
+    funcs = (full, streaming)
+    print('%-16s %16s %16s' % ('', 'full', 'streaming'))
+    print('%-16s' % 'first line', *('%15.3fs' % first_line(f) for f in funcs))
+    print('%-16s' % 'grep, 2M lines',
+          *('%6.2fs %7.1fMB' % grep_memory(f) for f in funcs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Time of SList.grep(), fields() and sort() on large command output.
+
+Not collected by the test suite, run with::
+
+    python -m IPython.utils.tests.bench_slist
+
+'per line' is SList as it was before the split fields were cached and grep()
+searched the joined lines; 'cached' is the current SList. Each operation is
+run twice on 1 million lines shaped like ``ls -l`` output: the first grep()
+or fields() on a list pays for splitting it, later ones reuse the fields.
+"""
+
+# Copyright (c) IPython Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import print_function
+
+import re
+import time
+
+from IPython.utils.text import SList
+
+
+class PerLineSList(SList):
+    """The previous grep(), fields() and sort()."""
+
+    def grep(self, pattern, prune = False, field = None):
+        def match_target(s):
+            if field is None:
+                return s
+            parts = s.split()
+            try:
+                return parts[field]
+            except IndexError:
+                return ""
+
+        if isinstance(pattern, str):
+            pred = lambda x : re.search(pattern, x, re.IGNORECASE)
+        else:
+            pred = pattern
+        if not prune:
+            return PerLineSList([el for el in self if pred(match_target(el))])
+        else:
+            return PerLineSList([el for el in self if not pred(match_target(el))])
+
+    def fields(self, *fields):
+        if len(fields) == 0:
+            return [el.split() for el in self]
+        res = SList()
+        for el in [f.split() for f in self]:
+            lineparts = []
+            for fd in fields:
+                try:
+                    lineparts.append(el[fd])
+                except IndexError:
+                    pass
+            if lineparts:
+                res.append(" ".join(lineparts))
+        return res
+
+    def sort(self,field= None,  nums = False):
+        if field is not None:
+            dsu = [[SList([line]).fields(field),  line] for line in self]
+        else:
+            dsu = [[line,  line] for line in self]
+        if nums:
+            for i in range(len(dsu)):
+                numstr = "".join([ch for ch in dsu[i][0] if ch.isdigit()])
+                try:
+                    n = int(numstr)
+                except ValueError:
+                    n = 0
+                dsu[i][0] = n
+        dsu.sort()
+        return SList([t[1] for t in dsu])
+
+
+LINES = ['-rw-r--r--  1 user staff %8d Oct %2d 12:00 file%d.%s'
+         % (i * 37 % 100000, i % 30 + 1, i, ('py', 'txt', 'log')[i % 3])
+         for i in range(1000000)]
+
+OPERATIONS = [
+    ('grep', lambda sl: sl.grep(r'\.log$')),
+    ('grep, prune', lambda sl: sl.grep('oct  1 ', prune=True)),
+    ('grep field', lambda sl: sl.grep('^file9', field=-1)),
+    ('fields(4)', lambda sl: sl.fields(4)),
+    ('fields(-1, 4)', lambda sl: sl.fields(-1, 4)),
+    ('sort(4, nums)', lambda sl: sl.sort(4, nums=True)),
+]
+
+
+def run(cls):
+    """Seconds for each operation, twice on the same list."""
+    sl = cls(LINES)
+    times = []
+    for label, op in OPERATIONS:
+        t = time.time()
+        first = op(sl)
+        t1 = time.time() - t
+        t = time.time()
+        op(sl)
+        times.append((t1, time.time() - t, first))
+    return times
+
+
+def main():
+    old, new = run(PerLineSList), run(SList)
+    print('%-16s %19s %19s' % ('', 'per line', 'cached'))
+    print('%-16s' % '1M lines', *('%9s' % h for h in ('first', 'again') * 2))
+    for (label, op), (o1, o2, ores), (n1, n2, nres) in zip(OPERATIONS, old, new):
+        assert ores == nres, label
+        print('%-16s %8.2fs %8.2fs %8.2fs %8.2fs' % (label, o1, o2, n1, n2))
+
+
+if __name__ == '__main__':
+    main()
@@ -16,13 +16,14 @@
 
 import sys
 import os
+import time
 from unittest import TestCase
 
 import nose.tools as nt
 
 from IPython.utils.process import (find_cmd, FindCmdError, arg_split,
                                    system, getoutput, getoutputerror,
-                                   get_output_error_code)
+                                   get_output_error_code, getoutput_stream)
 from IPython.testing import decorators as dec
 from IPython.testing import tools as tt
 
@@ -144,3 +145,37 @@ def test_get_output_error_code(self):
         self.assertEqual(out, 'on stdout')
         self.assertEqual(err, 'on stderr')
         self.assertEqual(code, 0)
+
+    def test_getoutput_stream(self):
+        out = getoutput_stream('%s "%s"' % (python, self.fname))
+        self.assertIn(list(out), [['on stderron stdout'],
+                                  ['on stdouton stderr']])
+
+    @dec.skip_win32
+    def test_getoutput_stream_lines(self):
+        cmd = "printf 'a\\r\\nb\\rc\\n\\nd  e\\n f'"
+        out = getoutput_stream(cmd)
+        self.assertEqual(out, getoutput(cmd).splitlines())
+        self.assertEqual(out[-1], ' f')
+        self.assertEqual(out[1:3], ['b', 'c'])
+        self.assertEqual(out.fields(0), ['a', 'b', 'c', 'd', 'f'])
+        self.assertEqual(out.grep('^[a-c]$'), ['a', 'b', 'c'])
+        self.assertEqual(out.s, 'a b c  d  e  f')
+
+    @dec.skip_win32
+    def test_getoutput_stream_spill(self):
+        out = getoutput_stream('seq 10000', limit=100)
+        self.assertEqual(len(out), 10000)
+        self.assertEqual(len(out._lines), 54)
+        self.assertGreater(len(out._block_lines), 0)
+        self.assertEqual(out, [str(i) for i in range(1, 10001)])
+        self.assertEqual(out[5000], '5001')
+        self.assertEqual(out.grep('^9999'), ['9999'])
+
+    @dec.skip_win32
+    def test_getoutput_stream_is_lazy(self):
+        start = time.time()
+        out = getoutput_stream('echo first; sleep 1; echo last')
+        self.assertEqual(out[0], 'first')
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(out, ['first', 'last'])
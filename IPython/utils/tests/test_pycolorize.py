@@ -23,6 +23,7 @@
 # our own
 from IPython.utils.PyColorize import Parser
 import io
+import re
 
 #-----------------------------------------------------------------------------
 # Test functions
@@ -76,3 +77,17 @@ def test_parse_error():
         yield test_unicode_colorize
         yield test_parse_sample
         yield test_parse_error
+
+
+def test_format_lines():
+    p = Parser()
+    block = u"def f(x):\n    '''Doc\n\n    '''\n    return [x,\n1]\n\n"
+    # A block can't end at line 100, which is inside a string
+    src = block * 14 + u"x = '''\n\nnot code\n'''\n" + block * 30
+    for scheme in ('Linux', 'NoColor'):
+        blocks = list(p.format_lines(src.splitlines(True), scheme))
+        nt.assert_greater(len(blocks), 1)
+        # Blank lines between blocks may lose empty color codes
+        plain = lambda text: re.sub(r'\x1b\[[0-9;]*m', '', text).rstrip()
+        nt.assert_equal(plain(u'\n'.join(blocks)),
+                        plain(p.format(src, 'str', scheme)))
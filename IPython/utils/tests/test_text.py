@@ -220,3 +220,48 @@ def test_SList():
     nt.assert_equal(sl.grep(lambda x: x.startswith('a')), text.SList(['a 11', 'a 2']))
     nt.assert_equal(sl.fields(0), text.SList(['a', 'b', 'a']))
     nt.assert_equal(sl.sort(field=1, nums=True), text.SList(['b 1', 'a 2', 'a 11']))
+
+def test_SList_grep():
+    sl = text.SList(['Foo 1', 'bar 22', 'foobar 3', 'baz'])
+    nt.assert_equal(sl.grep('^foo'), ['Foo 1', 'foobar 3'])
+    nt.assert_equal(sl.grep('^foo', prune=True), ['bar 22', 'baz'])
+    nt.assert_equal(sl.grep(r'\d$'), ['Foo 1', 'bar 22', 'foobar 3'])
+    nt.assert_equal(sl.grep('^2', field=1), ['bar 22'])
+    nt.assert_equal(sl.grep('^$', field=1), ['baz'])
+    # Matches spanning lines of the joined text don't count
+    nt.assert_equal(sl.grep(r'1\nbar'), [])
+    nt.assert_equal(sl.grep(r'\d\s'), [])
+    # Patterns searched line by line
+    nt.assert_equal(sl.grep(r'\Abar'), ['bar 22'])
+    nt.assert_equal(sl.grep(r'2\Z'), ['bar 22'])
+    nt.assert_equal(sl.grep(r'o(?!o)'), ['Foo 1', 'foobar 3'])
+    nt.assert_equal(text.SList(['', 'ab', '!']).grep(r'\B'), ['ab', '!'])
+    nt.assert_equal(text.SList(['x', '', 'y']).grep(r'^\B$'), [])
+    nt.assert_equal(text.SList(['a\nb', 'c']).grep('^b'), [])
+    nt.assert_equal(text.SList([]).grep('a'), [])
+    nt.assert_equal(sl.grep('^foo').fields(1), ['1', '3'])
+
+def test_SList_fields():
+    sl = text.SList(['a 1 x', 'b 2', 'c'])
+    nt.assert_equal(sl.fields(), [['a', '1', 'x'], ['b', '2'], ['c']])
+    sl.fields()[0].append('y')
+    nt.assert_equal(sl.fields(-1), ['x', '2', 'c'])
+    nt.assert_equal(sl.fields(2, 0), ['x a', 'b', 'c'])
+    nt.assert_equal(sl.fields(1, 2), ['1 x', '2'])
+    nt.assert_equal(sl.sort(1), ['c', 'a 1 x', 'b 2'])
+    nt.assert_equal(text.SList(['x10', 'y9', 'z']).sort(nums=True),
+                    ['z', 'y9', 'x10'])
+
+def test_SList_cache_cleared():
+    sl = text.SList(['a 1', 'b 2'])
+    nt.assert_equal(sl.fields(0), ['a', 'b'])
+    nt.assert_equal(sl.s, 'a 1 b 2')
+    sl.append('c 3')
+    nt.assert_equal(sl.fields(0), ['a', 'b', 'c'])
+    nt.assert_equal(sl.n, 'a 1\nb 2\nc 3')
+    sl[0] = 'd 4'
+    nt.assert_equal(sl.grep('^d'), ['d 4'])
+    sl += ['e 5']
+    nt.assert_equal(sl.s, 'd 4 b 2 c 3 e 5')
+    del sl[:2]
+    nt.assert_equal(sl.fields(1), ['3', '5'])
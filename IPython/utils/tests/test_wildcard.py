@@ -4,6 +4,7 @@
 # Library imports
 #-----------------------------------------------------------------------------
 # Stdlib
+import types
 import unittest
 
 # Our own
@@ -141,3 +142,36 @@ def __getattribute__(self, name):
         adict = wildcard.dict_dir(a)
         assert "a" not in adict # change to assertNotIn method in >= 2.7
         self.assertEqual(adict["b"], 2)
+
+    def test_module_index(self):
+        pkg = types.ModuleType('pkg')
+        pkg.Sub = obj_t
+        pkg.abc = 1
+        pkg._hidden = 2
+        sub = types.ModuleType('pkg.sub')
+        sub.func = lambda: None
+        sub.Func = 3
+        pkg.sub = sub
+        modules = {'pkg': pkg, 'pkg.sub': sub, 'missing': None}
+        index = wildcard.ModuleIndex(modules)
+
+        search = index.search
+        self.assertEqual(search('p*'), ['pkg'])
+        self.assertEqual([n for n in search('pkg.*') if '__' not in n],
+                         ['pkg.Sub', 'pkg.abc', 'pkg.sub'])
+        self.assertIn('pkg.__name__', search('pkg.*'))
+        self.assertEqual(search('pkg.*', 'module'), ['pkg.sub'])
+        self.assertEqual(search('pkg._h*'), [])
+        self.assertEqual(search('pkg._h*', show_all=True), ['pkg._hidden'])
+        self.assertEqual(search('*.*.f*'), ['pkg.sub.func'])
+        self.assertEqual(search('*.*.f*', ignore_case=True),
+                         ['pkg.sub.Func', 'pkg.sub.func'])
+        self.assertEqual(search('pkg.sub.*', 'function'), ['pkg.sub.func'])
+
+        # Incremental updates
+        pkg.new = 4
+        self.assertEqual(search('pkg.n*'), ['pkg.new'])
+        del modules['pkg.sub']
+        self.assertEqual(search('*.*.f*'), [])
+        modules['other'] = types.ModuleType('other')
+        self.assertEqual(search('o*'), ['other'])
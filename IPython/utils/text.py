@@ -9,6 +9,7 @@
 """
 from __future__ import absolute_import
 
+import itertools
 import os
 import re
 import sys
@@ -90,6 +91,54 @@ def get_paths(self):
 # print_lsstring = result_display.when_type(LSString)(print_lsstring)
 
 
+# Patterns which can't be searched for in the lines of an SList joined by
+# newlines, because they match differently next to a newline than at the
+# start or end of a string (\B matches between two newlines, but never in
+# an empty string).
+_line_anchored_re = re.compile(r'\\[ABZ]|\(\?<?!')
+
+def _grep_lines(pattern, lines, text):
+    """Return the indices of the strings in `lines` where the regex
+    `pattern` finds a case-insensitive match.
+
+    `text` is `lines` joined by newlines: the regex is run over it once,
+    instead of once per line, and lines where a match may depend on what
+    surrounds them are searched again on their own, so matches across lines
+    are ignored.
+    """
+    if (text.count('\n') != len(lines) - 1
+            or _line_anchored_re.search(pattern)):
+        search = re.compile(pattern, re.IGNORECASE).search
+        return [i for i, line in enumerate(lines) if search(line)]
+    search = re.compile(pattern, re.IGNORECASE | re.MULTILINE).search
+    # A match within one line holds for the line on its own, unless the
+    # pattern looks ahead or behind it.
+    lookaround = '(?=' in pattern or '(?<=' in pattern
+    found = []
+    pos = lineno = 0
+    while True:
+        m = search(text, pos)
+        if m is None:
+            break
+        start = m.start()
+        lineno += text.count('\n', pos, start)
+        pos = text.find('\n', start) + 1
+        crosses = 0 < pos <= m.end()
+        if not (crosses or lookaround) or search(lines[lineno]):
+            found.append(lineno)
+        if not pos:
+            break
+        lineno += 1
+    return found
+
+
+def _int_or_zero(s):
+    try:
+        return int(s)
+    except ValueError:
+        return 0
+
+
 class SList(list):
     """List derivative with a special access attributes.
 
@@ -101,7 +150,21 @@ class SList(list):
     * .p (or .paths): list of path objects (requires path.py package)
 
     Any values which require transformations are computed only once and
-    cached."""
+    cached, as are the whitespace-separated fields of each string used by
+    grep(), fields() and sort(). Changing the list clears the cache."""
+
+    def _cached(self, key, compute):
+        cache = self.__dict__.setdefault('_cache', {})
+        try:
+            return cache[key]
+        except KeyError:
+            value = cache[key] = compute()
+            return value
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_cache', None)
+        return state
 
     def get_list(self):
         return self
@@ -109,32 +172,42 @@ def get_list(self):
     l = list = property(get_list)
 
     def get_spstr(self):
-        try:
-            return self.__spstr
-        except AttributeError:
-            self.__spstr = ' '.join(self)
-            return self.__spstr
+        return self._cached('spstr', lambda: ' '.join(self))
 
     s = spstr = property(get_spstr)
 
     def get_nlstr(self):
-        try:
-            return self.__nlstr
-        except AttributeError:
-            self.__nlstr = '\n'.join(self)
-            return self.__nlstr
+        return self._cached('nlstr', lambda: '\n'.join(self))
 
     n = nlstr = property(get_nlstr)
 
     def get_paths(self):
-        try:
-            return self.__paths
-        except AttributeError:
-            self.__paths = [Path(p) for p in self if os.path.exists(p)]
-            return self.__paths
+        return self._cached('paths', lambda: [Path(p) for p in self
+                                              if os.path.exists(p)])
 
     p = paths = property(get_paths)
 
+    def _split(self):
+        """The whitespace-separated fields of each string."""
+        return self._cached('split', lambda: [el.split() for el in self])
+
+    def _column(self, field):
+        """Field `field` of each string, or None where it's missing."""
+        def compute():
+            n = field + 1 if field >= 0 else -field
+            return [parts[field] if len(parts) >= n else None
+                    for parts in self._split()]
+        return self._cached(('column', field), compute)
+
+    def _derived(self, items, keep=None):
+        """An SList of `items`, the strings selected by the mask `keep`,
+        which inherits their cached fields."""
+        res = SList(items)
+        if keep is not None and 'split' in self.__dict__.get('_cache', ()):
+            res._cache = {'split': list(itertools.compress(self._split(),
+                                                           keep))}
+        return res
+
     def grep(self, pattern, prune = False, field = None):
         """ Return all strings matching 'pattern' (a regex or callable)
 
@@ -150,25 +223,25 @@ def grep(self, pattern, prune = False, field = None):
             a.grep('Cha.*log', prune=1)
             a.grep('chm', field=-1)
         """
-
-        def match_target(s):
-            if field is None:
-                return s
-            parts = s.split()
-            try:
-                tgt = parts[field]
-                return tgt
-            except IndexError:
-                return ""
+        if field is None:
+            targets = self
+        else:
+            targets = [tgt or "" for tgt in self._column(field)]
 
         if isinstance(pattern, py3compat.string_types):
-            pred = lambda x : re.search(pattern, x, re.IGNORECASE)
-        else:
-            pred = pattern
-        if not prune:
-            return SList([el for el in self if pred(match_target(el))])
+            if field is None:
+                text = self.n
+            else:
+                text = self._cached(('nlcolumn', field),
+                                    lambda: '\n'.join(targets))
+            found = _grep_lines(pattern, targets, text)
         else:
-            return SList([el for el in self if not pred(match_target(el))])
+            found = [i for i, tgt in enumerate(targets) if pattern(tgt)]
+
+        keep = bytearray([1 if prune else 0]) * len(self)
+        for i in found:
+            keep[i] = not prune
+        return self._derived(itertools.compress(self, keep), keep)
 
     def fields(self, *fields):
         """ Collect whitespace-separated fields from string list
@@ -190,21 +263,17 @@ def fields(self, *fields):
         Without args, fields() just split()'s the strings.
         """
         if len(fields) == 0:
-            return [el.split() for el in self]
-
-        res = SList()
-        for el in [f.split() for f in self]:
-            lineparts = []
-
-            for fd in fields:
-                try:
-                    lineparts.append(el[fd])
-                except IndexError:
-                    pass
+            return [parts[:] for parts in self._split()]
+
+        columns = [self._column(fd) for fd in fields]
+        if len(columns) == 1:
+            return SList([part for part in columns[0] if part is not None])
+        res = []
+        for row in zip(*columns):
+            lineparts = [part for part in row if part is not None]
             if lineparts:
                 res.append(" ".join(lineparts))
-
-        return res
+        return SList(res)
 
     def sort(self,field= None,  nums = False):
         """ sort by specified fields (see fields())
@@ -216,24 +285,34 @@ def sort(self,field= None,  nums = False):
         Sorts a by second field, in numerical order (so that 21 > 3)
 
         """
-
-        #decorate, sort, undecorate
-        if field is not None:
-            dsu = [[SList([line]).fields(field),  line] for line in self]
+        if field is None:
+            if not nums:
+                return SList(sorted(self))
+            keys = [_int_or_zero("".join([ch for ch in line if ch.isdigit()]))
+                    for line in self]
+        elif nums:
+            keys = [_int_or_zero(part) if part and part.isdigit() else 0
+                    for part in self._column(field)]
         else:
-            dsu = [[line,  line] for line in self]
-        if nums:
-            for i in range(len(dsu)):
-                numstr = "".join([ch for ch in dsu[i][0] if ch.isdigit()])
-                try:
-                    n = int(numstr)
-                except ValueError:
-                    n = 0
-                dsu[i][0] = n
-
-
-        dsu.sort()
-        return SList([t[1] for t in dsu])
+            keys = [() if part is None else (part,)
+                    for part in self._column(field)]
+        return SList([line for key, line in sorted(zip(keys, self))])
+
+
+def _clears_cache(method):
+    def wrapper(self, *args, **kwargs):
+        self.__dict__.pop('_cache', None)
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+for _name in ['append', 'extend', 'insert', 'pop', 'remove', 'reverse',
+              'clear', '__setitem__', '__delitem__', '__iadd__', '__imul__',
+              '__setslice__', '__delslice__']: # the last two are Python 2's
+    if hasattr(list, _name):
+        setattr(SList, _name, _clears_cache(getattr(list, _name)))
+del _name
 
 
 # FIXME: We need to reimplement type specific displayhook and then add this
@@ -14,7 +14,9 @@
 #  the file COPYING, distributed as part of this software.
 #*****************************************************************************
 
+import bisect
 import re
+import sys
 import types
 
 from IPython.utils.dir2 import dir2
@@ -110,3 +112,132 @@ def list_namespace(namespace, type_pattern, filter, ignore_case=False, show_all=
             for inner_name, inner_obj in iteritems(ns):
                 results["%s.%s"%(name,inner_name)] = inner_obj
         return results
+
+
+class ModuleIndex(object):
+    """An index of the names defined at the top level of imported modules.
+
+    Names are indexed by qualified name (e.g. ``os.path.join``), together with
+    the types (from `typestr2type`) their object is an instance of.  The index
+    is built on the first search, then kept up to date incrementally: each
+    search only indexes the modules which were imported, or whose namespace
+    changed size, since the previous one.
+
+    Only the module namespaces are read; the objects themselves are not kept.
+    """
+
+    def __init__(self, modules=None):
+        # Defaults to sys.modules, looked up at search time
+        self._module_table = modules
+        # module name -> ((id(module), len(namespace)), [qualified names])
+        self._modules = {}
+        # qualified name -> (type names, hidden)
+        self._entries = {}
+        self._type_tags = {}
+        self._sorted = None
+
+    @property
+    def modules(self):
+        return sys.modules if self._module_table is None else self._module_table
+
+    def _tags(self, obj):
+        """The names in typestr2type of the types obj is an instance of."""
+        typ = type(obj)
+        try:
+            return self._type_tags[typ]
+        except KeyError:
+            tags = frozenset(name for name, t in iteritems(typestr2type)
+                             if isinstance(obj, t))
+            self._type_tags[typ] = tags
+            return tags
+
+    def _add(self, modname, module, ns, stamp):
+        names = []
+        prefix_hidden = not all(show_hidden(part) for part in modname.split('.'))
+        if '.' not in modname:
+            # Submodules are found as attributes of their package
+            names.append(modname)
+            self._entries[modname] = (self._tags(module), prefix_hidden)
+        for key, value in list(ns.items()):
+            if not isinstance(key, str):
+                continue
+            name = modname + '.' + key
+            names.append(name)
+            self._entries[name] = (self._tags(value),
+                                   prefix_hidden or not show_hidden(key))
+        self._modules[modname] = (stamp, names)
+
+    def _drop(self, modname):
+        for name in self._modules.pop(modname)[1]:
+            self._entries.pop(name, None)
+
+    def update(self):
+        """Index modules imported, changed or removed since the last update."""
+        modules = self.modules
+        changed = False
+        for modname in list(self._modules):
+            if modules.get(modname) is None:
+                self._drop(modname)
+                changed = True
+        for modname, module in list(modules.items()):
+            if not isinstance(module, types.ModuleType):
+                # e.g. None placeholders for failed relative imports on Python 2
+                continue
+            try:
+                ns = module.__dict__
+                stamp = (id(module), len(ns))
+            except Exception:
+                continue
+            old = self._modules.get(modname)
+            if old is not None:
+                if old[0] == stamp:
+                    continue
+                self._drop(modname)
+            self._add(modname, module, ns, stamp)
+            changed = True
+        if changed:
+            self._sorted = None
+
+    def _sorted_names(self, ignore_case):
+        """Sorted (key, name) lists, to bisect on the literal prefix."""
+        if self._sorted is None:
+            names = sorted(self._entries)
+            lower = sorted((name.lower(), name) for name in names)
+            self._sorted = (names, [n for n, _ in lower], [n for _, n in lower])
+        names, lower_keys, lower_names = self._sorted
+        if ignore_case:
+            return lower_keys, lower_names
+        return names, names
+
+    def search(self, name_pattern, type_pattern="all", ignore_case=False,
+               show_all=False):
+        """Return the sorted qualified names matching a wildcard pattern.
+
+        The pattern is matched against the whole qualified name; as with
+        `list_namespace`, wildcards don't match across dots.
+        """
+        self.update()
+        parts = [re.escape(part).replace(r"\*", "[^.]*").replace(r"\?", "[^.]")
+                 for part in name_pattern.split(".")]
+        reg = re.compile(r"\.".join(parts) + "$", re.I if ignore_case else 0)
+
+        prefix = re.split(r"[*?]", name_pattern, 1)[0]
+        keys, names = self._sorted_names(ignore_case)
+        if ignore_case:
+            prefix = prefix.lower()
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + u'\uffff') if prefix else len(keys)
+
+        results = []
+        for name in filter(reg.match, names[start:end]):
+            tags, hidden = self._entries[name]
+            if hidden and not show_all:
+                continue
+            if type_pattern == "all" or type_pattern in tags:
+                results.append(name)
+        if ignore_case:
+            results.sort()
+        return results
+
+#: The index shared by ``%psearch -m``
+module_index = ModuleIndex()